@@ -0,0 +1,192 @@
+"""CPU throughput autotuner for batch size, imgsz and torch thread counts.
+
+The fastest settings depend on the model and the machine, so they are
+measured: a short calibration runs the model on a sample of the user's own
+images and keeps the configuration with the best images/second that stays
+within the latency and memory ceilings. The search is coordinate-wise
+(threads, then batch size, then imgsz, then inter-op threads) so it takes a
+handful of trials rather than the whole grid.
+
+torch only accepts an inter-op thread count before its first parallel work,
+so those trials each run in a fresh process; the winner is applied at the
+next start, right after the ML stack is imported.
+"""
+import hashlib
+import multiprocessing
+import os
+import platform
+import time
+
+import ml_stack
+from prefetch import decode_image
+
+SAMPLE_SIZE = 16
+BATCH_CANDIDATES = (1, 2, 4, 8, 16)
+IMGSZ_CANDIDATES = (640, 512)
+DEFAULT_MAX_LATENCY_MS = 2000.0  # per batch
+DEFAULT_MAX_MEMORY_MB = None
+INTEROP_CANDIDATES = (1, 2)
+DEFAULT_INTEROP_THREADS = 1  # when inter-op threads aren't measured (no model path)
+
+
+def host_id():
+    return f"{platform.node()}-{os.cpu_count()}cpu"
+
+
+def settings_key(model_path):
+    """QSettings key for a tuned config, per (model, host)."""
+    digest = hashlib.blake2b(os.path.abspath(model_path).encode('utf-8'), digest_size=8).hexdigest()
+    return f"autotune/{host_id()}/{os.path.basename(model_path)}-{digest}"
+
+
+def thread_candidates(cpu_count=None):
+    cpu_count = cpu_count or os.cpu_count() or 1
+    candidates = {cpu_count, max(1, cpu_count // 2), max(1, cpu_count // 4), min(cpu_count, 4)}
+    return sorted(candidates, reverse=True)
+
+
+def describe(config):
+    return (f"batch {config['batch']}, imgsz {config['imgsz']}, {config['threads']} threads, "
+            f"{config['interop_threads']} inter-op ({config['images_per_sec']:.1f} img/s, "
+            f"{config['latency_ms']:.0f} ms/batch)")
+
+
+class Trial:
+    def __init__(self, batch, imgsz, threads, interop_threads=DEFAULT_INTEROP_THREADS):
+        self.batch = batch
+        self.imgsz = imgsz
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.images_per_sec = 0.0
+        self.latency_ms = 0.0
+        self.rss_mb = 0.0
+        self.ok = False
+
+    def as_config(self):
+        return {
+            'batch': self.batch,
+            'imgsz': self.imgsz,
+            'threads': self.threads,
+            'interop_threads': self.interop_threads,
+            'images_per_sec': self.images_per_sec,
+            'latency_ms': self.latency_ms,
+            'rss_mb': self.rss_mb,
+            'host': host_id(),
+        }
+
+
+def run_trial(model, images, trial, max_latency_ms, max_memory_mb):
+    import psutil
+
+    ml_stack.set_torch_threads(trial.threads)
+    batches = [images[i:i + trial.batch] for i in range(0, len(images), trial.batch)]
+    # One untimed batch so predictor setup for a new imgsz isn't measured
+    model.predict(source=batches[0], imgsz=trial.imgsz, save=False, verbose=False)
+
+    latencies = []
+    start = time.perf_counter()
+    for batch in batches:
+        batch_start = time.perf_counter()
+        model.predict(source=batch, imgsz=trial.imgsz, save=False, verbose=False)
+        latencies.append(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    trial.images_per_sec = len(images) / elapsed if elapsed > 0 else 0.0
+    trial.latency_ms = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    trial.rss_mb = psutil.Process().memory_info().rss / 1024 ** 2
+    trial.ok = (trial.latency_ms <= max_latency_ms
+                and (max_memory_mb is None or trial.rss_mb <= max_memory_mb))
+    return trial
+
+
+def _interop_trial(model_path, image_paths, batch, imgsz, threads, interop_threads, max_latency_ms, max_memory_mb):
+    """Worker process entry point: ``(images/sec, latency ms, rss MB, ok)`` with ``interop_threads``."""
+    ml_stack.set_torch_threads(threads, interop_threads)  # before the model does any work
+    from model_cache import ModelCache
+
+    model = ModelCache().get(model_path)
+    images = [im for im in (decode_image(p) for p in image_paths) if im is not None]
+    trial = run_trial(model, images, Trial(batch, imgsz, threads, interop_threads), max_latency_ms, max_memory_mb)
+    return trial.images_per_sec, trial.latency_ms, trial.rss_mb, trial.ok
+
+
+def measure_interop(model_path, sample_paths, trial, interop_threads, max_latency_ms, max_memory_mb):
+    """Re-run ``trial``'s settings in a fresh process with ``interop_threads`` inter-op threads."""
+    # spawn, not fork: the child must start without torch's thread pools
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        result = pool.apply(_interop_trial, (model_path, sample_paths, trial.batch, trial.imgsz, trial.threads,
+                                             interop_threads, max_latency_ms, max_memory_mb))
+    measured = Trial(trial.batch, trial.imgsz, trial.threads, interop_threads)
+    measured.images_per_sec, measured.latency_ms, measured.rss_mb, measured.ok = result
+    return measured
+
+
+def autotune(model, image_paths, sample_size=SAMPLE_SIZE, max_latency_ms=DEFAULT_MAX_LATENCY_MS,
+             max_memory_mb=DEFAULT_MAX_MEMORY_MB, imgsz_candidates=IMGSZ_CANDIDATES,
+             progress=None, cancel_event=None, model_path=None):
+    """Calibrate on a sample of ``image_paths`` and return the best config dict.
+
+    ``progress(message)`` is called after every trial. With ``model_path``
+    the inter-op thread count is measured too (a worker process per
+    candidate); otherwise it is left at ``DEFAULT_INTEROP_THREADS``. Returns
+    None if no configuration met the ceilings or the calibration was
+    cancelled.
+    """
+    step = max(1, len(image_paths) // sample_size)
+    sample_paths = image_paths[::step][:sample_size]
+    images = [im for im in (decode_image(p) for p in sample_paths) if im is not None]
+    if not images:
+        raise ValueError("None of the sampled images could be read")
+
+    import torch
+    original_threads = torch.get_num_threads()
+    trials = []
+
+    def measure(batch, imgsz, threads):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        for trial in trials:
+            if (trial.batch, trial.imgsz, trial.threads) == (batch, imgsz, threads):
+                return trial
+        trial = run_trial(model, images, Trial(batch, imgsz, threads), max_latency_ms, max_memory_mb)
+        trials.append(trial)
+        if progress is not None:
+            progress(f"batch {batch}, imgsz {imgsz}, {threads} threads: "
+                     f"{trial.images_per_sec:.1f} img/s, {trial.latency_ms:.0f} ms/batch, "
+                     f"{trial.rss_mb:.0f} MB" + ("" if trial.ok else " (over limit)"))
+        return trial
+
+    def best(candidates):
+        valid = [t for t in candidates if t is not None and t.ok]
+        return max(valid, key=lambda t: t.images_per_sec) if valid else None
+
+    try:
+        imgsz = imgsz_candidates[0]
+        current = best([measure(1, imgsz, threads) for threads in thread_candidates()])
+        if current is None:
+            return None
+        batches = [b for b in BATCH_CANDIDATES if b <= len(images)]
+        current = best([current] + [measure(b, imgsz, current.threads) for b in batches]) or current
+        current = best([current] + [measure(current.batch, size, current.threads)
+                                    for size in imgsz_candidates[1:]]) or current
+        if model_path is not None:
+            # Compared among themselves only: a fresh process doesn't run at the same speed as this one
+            interop_trials = []
+            for interop_threads in INTEROP_CANDIDATES:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                trial = measure_interop(model_path, sample_paths, current, interop_threads,
+                                        max_latency_ms, max_memory_mb)
+                interop_trials.append(trial)
+                if progress is not None:
+                    progress(f"{interop_threads} inter-op threads (separate process): "
+                             f"{trial.images_per_sec:.1f} img/s, {trial.latency_ms:.0f} ms/batch"
+                             + ("" if trial.ok else " (over limit)"))
+            current = best(interop_trials) or current
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        return current.as_config()
+    finally:
+        torch.set_num_threads(original_threads)
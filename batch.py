@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Headless batch detection (``modelgui-batch``).
+
+Runs the same pipeline as the GUI's "Run Detection" without Qt or an X
+server. Progress is printed to stdout as JSON lines, one object per event:
+
+    {"event": "progress", "done": 120, "total": 20000, "images_per_sec": 14.2, "eta_seconds": 1398.6}
+
+``--resume results/detection_<timestamp>`` continues an interrupted run in
+its own folder with the model, inputs and output options it started with.
+
+Exit status: 0 on success, 1 on error, 2 for bad arguments or no inputs,
+3 if the run finished but some images could not be read, 130 if interrupted.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from export import EXPORT_FORMATS
+from model_cache import ModelCache
+from optimize import artifact_imgsz
+from pipeline import RESULTS_ROOT, DetectionJob, build_options, new_results_dir, resume_arguments
+from result_cache import ResultCache
+from scanner import DirectoryIndex, MEDIA_EXTENSIONS, scan_folder
+from video import FrameSampling
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_UNREADABLE = 3
+EXIT_INTERRUPTED = 130
+
+
+def emit(event, **fields):
+    print(json.dumps({"event": event, "time": round(time.time(), 3), **fields}), flush=True)
+
+
+def collect_inputs(inputs, list_files=(), extensions=MEDIA_EXTENSIONS):
+    """Expand files, folders (recursively) and glob patterns into a de-duplicated list."""
+    extensions = tuple(ext.lower() for ext in extensions)
+    index = DirectoryIndex()
+    seen = set()
+    paths = []
+
+    def add(path):
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            paths.append(path)
+
+    for list_file in list_files:
+        with open(list_file, 'r', encoding='utf-8') as f:
+            inputs = list(inputs) + [line.strip() for line in f if line.strip()]
+
+    for item in inputs:
+        if os.path.isdir(item):
+            for chunk in scan_folder(item, extensions, index):
+                for path in chunk:
+                    add(path)
+        elif glob.has_magic(item):
+            for path in sorted(glob.glob(item, recursive=True)):
+                if path.lower().endswith(extensions) and os.path.isfile(path):
+                    add(path)
+        elif os.path.isfile(item):
+            add(item)
+        else:
+            emit("warning", message=f"No such file or directory: {item}")
+    try:
+        index.save()
+    except OSError:
+        pass
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='modelgui-batch',
+        description="Run YOLO detection on images without the GUI, printing JSON lines progress.")
+    parser.add_argument('model', nargs='?',
+                        help="Path to the model weights (.pt) or an exported model from Optimize Model")
+    parser.add_argument('inputs', nargs='*', help="Image or video files, folders or glob patterns")
+    parser.add_argument('--list', dest='list_files', action='append', default=[],
+                        help="Text file with one input path per line (repeatable)")
+    parser.add_argument('--results-root', default=RESULTS_ROOT,
+                        help="Where the detection_<timestamp> folder is created (default: results)")
+    parser.add_argument('--resume', metavar='RESULTS_DIR',
+                        help="Continue the interrupted run in RESULTS_DIR, skipping the inputs it finished; "
+                             "the model, inputs and output options come from its journal")
+    parser.add_argument('--no-save-txt', dest='save_txt', action='store_false', help="Don't save YOLO label files")
+    parser.add_argument('--save-conf', action='store_true', help="Save confidence scores in labels")
+    parser.add_argument('--save-crop', action='store_true', help="Save cropped images of detections")
+    parser.add_argument('--pack', action='store_true',
+                        help="Write labels and crops into tar shards under packed/ instead of single files")
+    parser.add_argument('--save-plots', action='store_true', help="Save distribution plots")
+    parser.add_argument('--hide-labels', action='store_true', help="Hide labels in detection images")
+    parser.add_argument('--hide-conf', action='store_true', help="Hide confidence scores in detection images")
+    parser.add_argument('--export', choices=sorted(EXPORT_FORMATS.values()),
+                        help="Also stream every detection into one table")
+    parser.add_argument('--every', type=int, default=1, help="Infer every Nth frame of videos (default: 1)")
+    parser.add_argument('--start', type=float, help="Skip video frames before this many seconds")
+    parser.add_argument('--end', type=float, help="Stop each video at this many seconds")
+    parser.add_argument('--imgsz', type=int, help="Inference image size")
+    parser.add_argument('--tile', type=int,
+                        help="Infer large images in tiles of this many pixels and merge the boxes")
+    parser.add_argument('--tile-overlap', type=float, default=0.2,
+                        help="Fraction of a tile shared with its neighbours (default: 0.2)")
+    parser.add_argument('--batch', type=int, default=4, help="Images per inference batch (default: 4)")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes (default: 1)")
+    parser.add_argument('--threads', type=int, help="torch intra-op threads for single-process runs")
+    parser.add_argument('--writers', type=int,
+                        help="Threads writing images, labels and crops (default: up to 4; 0 writes inline)")
+    parser.add_argument('--trace', action='store_true',
+                        help="Also write trace.json (Chrome trace events) into the results folder")
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help="Don't reuse or store results in the result cache")
+    parser.add_argument('--progress-interval', type=float, default=1.0,
+                        help="Seconds between progress lines (default: 1)")
+    parser.add_argument('--verbose', action='store_true', help="Also print per-image detection lines")
+    args = parser.parse_args(argv)
+    if args.model is None and args.resume is None:
+        parser.error("a model is required unless --resume is given")
+    return args
+
+
+def run_arguments(args):
+    """``DetectionJob`` arguments for a new run from the command line; None if there are no inputs."""
+    image_paths = collect_inputs(args.inputs, args.list_files)
+    if not image_paths:
+        return None
+    results_dir = new_results_dir(args.results_root)
+    options = build_options(results_dir, save_txt=args.save_txt, save_conf=args.save_conf,
+                            save_crop=args.save_crop, show_labels=not args.hide_labels,
+                            show_conf=not args.hide_conf, imgsz=args.imgsz or artifact_imgsz(args.model),
+                            pack=args.pack, tile=args.tile, tile_overlap=args.tile_overlap)
+    return {
+        'model_name': args.model,
+        'image_paths': image_paths,
+        'options': options,
+        'results_dir': results_dir,
+        'export_format': args.export,
+        'save_plots': args.save_plots,
+        'frame_sampling': FrameSampling(args.every, args.start, args.end),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.resume:
+        try:
+            arguments = resume_arguments(args.resume)
+        except (OSError, ValueError) as e:
+            emit("error", message=f"Cannot resume: {e}")
+            return EXIT_USAGE
+    else:
+        if not os.path.exists(args.model):
+            emit("error", message=f"Model not found: {args.model}")
+            return EXIT_USAGE
+        arguments = run_arguments(args)
+        if arguments is None:
+            emit("error", message="No input images found")
+            return EXIT_USAGE
+    model = arguments['model_name']
+    results_dir = arguments['results_dir']
+    if not os.path.exists(model):
+        emit("error", message=f"Model not found: {model}")
+        return EXIT_USAGE
+
+    result_cache = ResultCache() if args.use_cache else None
+    last_progress = [0.0]
+
+    def on_log(message):
+        if args.verbose or not message.startswith("Found in "):
+            emit("log", message=message)
+
+    def on_progress(done, total, rate, eta):
+        now = time.perf_counter()
+        if done == total or now - last_progress[0] >= args.progress_interval:
+            last_progress[0] = now
+            emit("progress", done=done, total=total, images_per_sec=round(rate, 3),
+                 eta_seconds=round(eta, 1))
+
+    job = DetectionJob(ModelCache(), result_cache=result_cache,
+                       batch_size=args.batch, processes=args.processes, trace=args.trace,
+                       writer_threads=args.writers,
+                       torch_threads=(args.threads, None) if args.threads else None,
+                       on_log=on_log, on_status=lambda message: emit("status", message=message),
+                       on_progress=on_progress, **arguments)
+    emit("started", model=model, images=len(job.image_paths), videos=len(job.video_paths),
+         results_dir=results_dir, resumed=job.resuming)
+    start_time = time.perf_counter()
+    try:
+        stats = job.run()
+    except KeyboardInterrupt:
+        emit("cancelled", results_dir=results_dir)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        emit("error", message=str(e), results_dir=results_dir)
+        return EXIT_ERROR
+    finally:
+        if result_cache is not None:
+            result_cache.close()
+
+    elapsed = time.perf_counter() - start_time
+    snapshot = job.timings.snapshot()
+    emit("timings", images_per_sec=round(snapshot["images_per_sec"], 3),
+         stages={stage: {"p50_ms": round(p50, 3), "p95_ms": round(p95, 3)}
+                 for stage, (p50, p95) in snapshot["stages"].items()})
+    emit("completed", results_dir=results_dir, images=stats.images, detections=stats.detections,
+         unreadable=job.unreadable, seconds=round(elapsed, 2),
+         images_per_sec=round(stats.images / elapsed, 3) if elapsed > 0 else None,
+         class_counts=dict(stats.class_distribution()))
+    return EXIT_UNREADABLE if job.unreadable else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Run-wide detection statistics, accumulated one image at a time.
+
+Each image's boxes are folded in as whole arrays (``bincount`` for the class
+histogram, running sums for confidence), so the cost per image doesn't depend
+on converting every box to Python objects. The console summary and the plots
+are both produced from these accumulators; no per-detection list is kept, so
+memory stays fixed however many detections a run produces.
+"""
+import numpy as np
+
+CONF_BINS = 20
+
+
+def format_counts(names, counts):
+    """'2 persons, 1 bus' for the non-zero entries of a per-class count array."""
+    return ", ".join(
+        f"{count} {names.get(cls_id, str(cls_id))}{'s' if count > 1 else ''}"
+        for cls_id, count in ((int(i), int(counts[i])) for i in np.flatnonzero(counts))
+    )
+
+
+class DetectionStats:
+    def __init__(self, names, conf_bins=CONF_BINS):
+        self.names = dict(names)
+        num_classes = max(self.names) + 1 if self.names else 0
+        self.class_counts = np.zeros(num_classes, dtype=np.int64)
+        self.conf_bins = conf_bins
+        self.conf_hist = np.zeros(conf_bins, dtype=np.int64)  # fixed bins over [0, 1]
+        self.class_conf_hist = np.zeros((num_classes, conf_bins), dtype=np.int64)  # the same bins per class
+        self.per_image_counts = np.zeros(1, dtype=np.int64)  # images by number of detections
+        self.images = 0
+        self.images_with_detections = 0
+        self.detections = 0
+        self.conf_sum = 0.0
+        self.conf_min = 1.0
+        self.conf_max = 0.0
+
+    def update(self, detections):
+        """Fold in one image's ``Detections``; returns its per-class counts."""
+        self.images += 1
+        n = len(detections)
+        if n >= len(self.per_image_counts):
+            self.per_image_counts = np.concatenate(
+                [self.per_image_counts, np.zeros(n + 1 - len(self.per_image_counts), dtype=np.int64)])
+        self.per_image_counts[n] += 1
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        counts = np.bincount(detections.cls, minlength=len(self.class_counts))
+        if len(counts) > len(self.class_counts):
+            self._grow_classes(len(counts))
+        self.class_counts[:len(counts)] += counts
+
+        conf = detections.conf
+        bins = np.minimum((conf * self.conf_bins).astype(np.int64), self.conf_bins - 1)
+        self.conf_hist += np.bincount(bins, minlength=self.conf_bins)
+        self.class_conf_hist += np.bincount(detections.cls * self.conf_bins + bins,
+                                            minlength=self.class_conf_hist.size).reshape(self.class_conf_hist.shape)
+        self.conf_sum += float(conf.sum())
+        self.conf_min = min(self.conf_min, float(conf.min()))
+        self.conf_max = max(self.conf_max, float(conf.max()))
+        self.detections += n
+        self.images_with_detections += 1
+        return counts
+
+    def _grow_classes(self, num_classes):
+        # Class ids beyond model.names, e.g. from results cached with another model
+        grown = np.zeros(num_classes, dtype=np.int64)
+        grown[:len(self.class_counts)] = self.class_counts
+        self.class_counts = grown
+        grown = np.zeros((num_classes, self.conf_bins), dtype=np.int64)
+        grown[:len(self.class_conf_hist)] = self.class_conf_hist
+        self.class_conf_hist = grown
+
+    @property
+    def conf_mean(self):
+        return self.conf_sum / self.detections if self.detections else 0.0
+
+    def class_distribution(self):
+        """``[(class name, count), ...]`` most frequent first, zero counts omitted."""
+        order = np.argsort(-self.class_counts, kind='stable')
+        return [(self.names.get(int(i), str(int(i))), int(self.class_counts[i]))
+                for i in order if self.class_counts[i]]
+
+    def conf_bin_edges(self):
+        return np.linspace(0.0, 1.0, self.conf_bins + 1)
+
+    def summary(self):
+        if not self.detections:
+            return f"No detections in {self.images} images"
+        return (f"{self.detections} detections in {self.images_with_detections}/{self.images} images "
+                f"(confidence mean {self.conf_mean:.2f}, min {self.conf_min:.2f}, max {self.conf_max:.2f}): "
+                f"{format_counts(self.names, self.class_counts)}")
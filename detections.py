@@ -0,0 +1,72 @@
+"""Lightweight, picklable detections for one image.
+
+Ultralytics ``Results`` objects hold the decoded image and torch tensors.
+``Detections`` keeps only the boxes as numpy arrays, so it can be cached,
+sent between processes and aggregated cheaply, and can be turned back into a
+``Results`` when an image has to be drawn or cropped.
+"""
+import numpy as np
+
+
+class Detections:
+    __slots__ = ('path', 'xyxy', 'conf', 'cls', 'orig_shape', 'speed')
+
+    def __init__(self, path, xyxy, conf, cls, orig_shape, speed=None):
+        self.path = path
+        self.xyxy = xyxy  # (N, 4) float32, pixels in the original image
+        self.conf = conf  # (N,) float32
+        self.cls = cls  # (N,) int64
+        self.orig_shape = orig_shape  # (height, width)
+        self.speed = speed or {}  # stage timings in ms: ultralytics' plus read/decode/write
+
+    def __len__(self):
+        return len(self.cls)
+
+    @classmethod
+    def empty(cls, path, orig_shape, speed=None):
+        return cls(path, np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                   np.zeros(0, np.int64), orig_shape, speed)
+
+    @classmethod
+    def from_result(cls, result, path=None):
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(path or result.path, tuple(result.orig_shape), dict(result.speed))
+        data = boxes.data.cpu().numpy()
+        return cls(
+            path or result.path,
+            data[:, :4].astype(np.float32),
+            data[:, 4].astype(np.float32),
+            data[:, 5].astype(np.int64),
+            tuple(result.orig_shape),
+            dict(result.speed),
+        )
+
+    def to_array(self):
+        """Boxes as an (N, 6) float32 array: x1, y1, x2, y2, conf, cls."""
+        return np.hstack([
+            self.xyxy.reshape(-1, 4),
+            self.conf.reshape(-1, 1),
+            self.cls.reshape(-1, 1).astype(np.float32),
+        ]).astype(np.float32)
+
+    @classmethod
+    def from_array(cls, path, array, orig_shape, speed=None):
+        array = np.asarray(array, dtype=np.float32).reshape(-1, 6)
+        return cls(path, array[:, :4].copy(), array[:, 4].copy(),
+                   array[:, 5].astype(np.int64), tuple(orig_shape), speed)
+
+    def to_bytes(self):
+        return self.to_array().tobytes()
+
+    @classmethod
+    def from_bytes(cls, path, blob, orig_shape):
+        return cls.from_array(path, np.frombuffer(blob, dtype=np.float32), orig_shape)
+
+    def to_result(self, orig_img, names):
+        """Rebuild an ultralytics ``Results`` for drawing, labels and crops."""
+        import torch
+        from ultralytics.engine.results import Results
+
+        return Results(orig_img, path=self.path, names=names,
+                       boxes=torch.from_numpy(self.to_array()))
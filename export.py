@@ -0,0 +1,209 @@
+"""Streaming export of detections to CSV, JSON Lines or Parquet.
+
+Rows are appended as each image's result arrives and flushed in groups, so
+memory stays flat however long the run is, and downstream tools can read one
+table instead of parsing thousands of label files. One row per detection:
+
+    image, class_id, class_name, conf, x1, y1, x2, y2, inference_ms
+"""
+import csv
+import json
+import os
+
+EXPORT_FORMATS = {
+    'CSV': 'csv',
+    'JSONL': 'jsonl',
+    'Parquet': 'parquet',
+}
+COLUMNS = ['image', 'class_id', 'class_name', 'conf', 'x1', 'y1', 'x2', 'y2', 'inference_ms']
+ROW_GROUP_SIZE = 65536
+
+
+class DetectionSink:
+    """Base class; subclasses implement ``_write_rows`` and ``_flush``."""
+
+    def __init__(self, path, names, row_group_size=ROW_GROUP_SIZE):
+        self.path = path
+        self.names = dict(names)
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self._pending = 0
+
+    def write(self, detections):
+        n = len(detections)
+        if n == 0:
+            return
+        image = detections.path
+        inference_ms = detections.speed.get('inference')
+        cls_ids = detections.cls.tolist()
+        columns = {
+            'image': [image] * n,
+            'class_id': cls_ids,
+            'class_name': [self.names.get(c, str(c)) for c in cls_ids],
+            'conf': detections.conf.tolist(),
+            'inference_ms': [inference_ms] * n,
+        }
+        xyxy = detections.xyxy.T.tolist()
+        for name, values in zip(('x1', 'y1', 'x2', 'y2'), xyxy):
+            columns[name] = values
+        self._write_rows(columns, n)
+
+        self.rows_written += n
+        self._pending += n
+        if self._pending >= self.row_group_size:
+            self._flush()
+            self._pending = 0
+
+    def close(self):
+        self._flush()
+        self._close()
+
+    def _write_rows(self, columns, n):
+        raise NotImplementedError
+
+    def _flush(self):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvSink(DetectionSink):
+    def __init__(self, path, names, row_group_size=ROW_GROUP_SIZE):
+        super().__init__(path, names, row_group_size)
+        self._file = open(path, 'w', newline='', encoding='utf-8', buffering=1024 * 1024)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def _write_rows(self, columns, n):
+        self._writer.writerows(zip(*(columns[c] for c in COLUMNS)))
+
+    def _flush(self):
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlSink(DetectionSink):
+    def __init__(self, path, names, row_group_size=ROW_GROUP_SIZE):
+        super().__init__(path, names, row_group_size)
+        self._file = open(path, 'w', encoding='utf-8', buffering=1024 * 1024)
+
+    def _write_rows(self, columns, n):
+        self._file.writelines(json.dumps(dict(zip(COLUMNS, row))) + '\n'
+                              for row in zip(*(columns[c] for c in COLUMNS)))
+
+    def _flush(self):
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetSink(DetectionSink):
+    """Buffers one row group of columns at a time and hands it to pyarrow."""
+
+    def __init__(self, path, names, row_group_size=ROW_GROUP_SIZE):
+        super().__init__(path, names, row_group_size)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._schema = pa.schema([
+            ('image', pa.dictionary(pa.int32(), pa.string())),
+            ('class_id', pa.int32()),
+            ('class_name', pa.dictionary(pa.int32(), pa.string())),
+            ('conf', pa.float32()),
+            ('x1', pa.float32()),
+            ('y1', pa.float32()),
+            ('x2', pa.float32()),
+            ('y2', pa.float32()),
+            ('inference_ms', pa.float32()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._buffer = {c: [] for c in COLUMNS}
+
+    def _write_rows(self, columns, n):
+        for name in COLUMNS:
+            self._buffer[name].extend(columns[name])
+
+    def _flush(self):
+        if not self._buffer['image']:
+            return
+        pa = self._pa
+        arrays = []
+        for field in self._schema:
+            values = self._buffer[field.name]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self._buffer = {c: [] for c in COLUMNS}
+
+    def _close(self):
+        self._writer.close()
+
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+}
+
+
+def open_sink(fmt, results_dir, names, basename='detections'):
+    """Create a sink writing ``<results_dir>/<basename>.<fmt>``."""
+    path = os.path.join(results_dir, f"{basename}.{fmt}")
+    return SINKS[fmt](path, names)
+
+
+def existing_exports(results_dir, fmt):
+    """Export files of format ``fmt`` already in ``results_dir``: ``detections.<fmt>``, ``detections.resume<N>.<fmt>``."""
+    names = sorted(name for name in os.listdir(results_dir)
+                   if name.startswith('detections.') and name.endswith(f".{fmt}"))
+    return [os.path.join(results_dir, name) for name in names]
+
+
+def drop_rows(path, keep):
+    """Rewrite the export at ``path`` with only the rows whose image ``keep(image)`` accepts; returns rows dropped."""
+    fmt = os.path.splitext(path)[1][1:]
+    dropped = 0
+    temp = path + '.tmp'
+    if fmt == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        source = pq.ParquetFile(path)
+        with pq.ParquetWriter(temp, source.schema_arrow) as writer:
+            for batch in source.iter_batches(batch_size=ROW_GROUP_SIZE):
+                mask = [keep(image) for image in batch.column('image').to_pylist()]
+                dropped += mask.count(False)
+                writer.write_table(pa.Table.from_batches([batch.filter(pa.array(mask))]))
+    else:
+        with open(path, 'r', newline='', encoding='utf-8') as source, \
+                open(temp, 'w', newline='', encoding='utf-8') as target:
+            if fmt == 'csv':
+                reader = csv.reader(source)
+                writer = csv.writer(target)
+                writer.writerow(next(reader, COLUMNS))
+                for row in reader:
+                    if len(row) == len(COLUMNS) and keep(row[0]):  # not a row cut short by a crash
+                        writer.writerow(row)
+                    else:
+                        dropped += 1
+            else:
+                for line in source:
+                    try:
+                        image = json.loads(line)['image']
+                    except (ValueError, KeyError):
+                        image = None  # a line cut short by a crash
+                    if image is not None and keep(image):
+                        target.write(line)
+                    else:
+                        dropped += 1
+    os.replace(temp, path)
+    return dropped
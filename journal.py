@@ -0,0 +1,154 @@
+"""Crash-safe run journal, so an interrupted run can be resumed in place.
+
+Every run keeps ``journal.jsonl`` in its results folder: a first line with
+the run configuration (model path and weights hash, options, video sampling,
+export format), then one line per input whose outputs are on disk, and a
+last line once the run has finished. The full input list is written to
+``inputs.txt`` next to it (one path per line, usable with ``batch.py
+--list``). After a crash, reboot or closed window ``read_journal`` recovers
+all of it and the run can continue into the same folder, skipping the inputs
+that are done.
+
+``RunJournal.complete`` only appends a line to a list in memory; a
+background thread writes and fsyncs them once a second, so the inference
+loop does no journal I/O at all and a crash loses at most the last second of
+entries, whose inputs are done again. A line cut short by the crash is
+ignored when reading. Inputs that aren't journaled as done may have left
+outputs behind (the last second's images, a video cut off halfway), so a
+resumed run first removes their labels, crops, packed members and export
+rows (``outputs.clear_outputs``, ``export.drop_rows``) before redoing them.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+JOURNAL_FILE = 'journal.jsonl'
+INPUTS_FILE = 'inputs.txt'
+JOURNAL_VERSION = 1
+SYNC_INTERVAL = 1.0  # seconds between journal writes
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def has_journal(results_dir):
+    return os.path.isfile(os.path.join(results_dir, JOURNAL_FILE))
+
+
+class JournalState:
+    """What a run's journal says: its configuration, inputs and finished inputs."""
+
+    def __init__(self, config, inputs, completed, finished, resumes):
+        self.config = config
+        self.inputs = inputs
+        self.completed = completed  # set of input paths
+        self.finished = finished  # ran to the end (not cancelled or killed)
+        self.resumes = resumes  # times the run has been resumed before
+
+
+def read_journal(results_dir):
+    """``JournalState`` of the run in ``results_dir``; ValueError if it has no usable journal."""
+    path = os.path.join(results_dir, JOURNAL_FILE)
+    if not os.path.isfile(path):
+        raise ValueError(f"No {JOURNAL_FILE} in {results_dir}; only runs started with a journal can be resumed")
+    config = None
+    completed = set()
+    finished = False
+    resumes = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if 'done' in entry:
+                completed.add(entry['done'])
+            elif 'config' in entry:
+                config = entry['config']
+            elif 'resumed' in entry:
+                resumes += 1
+                finished = False
+            elif 'finished' in entry:
+                finished = True
+    if config is None:
+        raise ValueError(f"{path} has no run configuration")
+    with open(os.path.join(results_dir, INPUTS_FILE), 'r', encoding='utf-8') as f:
+        inputs = [line.rstrip('\n') for line in f if line.strip()]
+    return JournalState(config, inputs, completed, finished, resumes)
+
+
+class RunJournal:
+    """Appends to a run's journal; ``complete`` is cheap and safe to call from any thread."""
+
+    def __init__(self, results_dir, sync_interval=SYNC_INTERVAL):
+        self.path = os.path.join(results_dir, JOURNAL_FILE)
+        self.sync_interval = sync_interval
+        self.completed = 0  # inputs recorded by this session
+        self._lines = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sync_loop, name='journal', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def start(cls, results_dir, config, inputs):
+        """Journal a new run: write its input list and configuration."""
+        with open(os.path.join(results_dir, INPUTS_FILE), 'w', encoding='utf-8') as f:
+            f.writelines(f"{path}\n" for path in inputs)
+            f.flush()
+            os.fsync(f.fileno())
+        journal = cls(results_dir)
+        journal._append({"config": config, "version": JOURNAL_VERSION, "started": _now()})
+        journal.sync()
+        return journal
+
+    @classmethod
+    def reopen(cls, results_dir):
+        """Continue the journal of an interrupted run."""
+        journal = cls(results_dir)
+        journal._append({"resumed": _now()})
+        journal.sync()
+        return journal
+
+    def complete(self, path):
+        """Record that ``path`` is done and its outputs are written."""
+        line = json.dumps({"done": path}) + "\n"
+        with self._lock:
+            self._lines.append(line)
+            self.completed += 1
+
+    def finish(self, **summary):
+        self._append({"finished": _now(), **summary})
+
+    def sync(self):
+        """Write and fsync the entries recorded so far."""
+        with self._write_lock:
+            with self._lock:
+                lines, self._lines = self._lines, []
+            if lines and self._file is not None:
+                self._file.writelines(lines)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.sync()
+        with self._write_lock:
+            self._file.close()
+            self._file = None
+
+    def _append(self, entry):
+        with self._lock:
+            self._lines.append(json.dumps(entry) + "\n")
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except OSError:
+                pass  # e.g. the disk filled up; retried on the next tick and in close()
@@ -0,0 +1,49 @@
+"""Thread-safe buffered log sink.
+
+Log lines can be written from any thread at any rate. They are held in a
+bounded buffer until the GUI drains them on a timer and appends them to the
+console in one batch; lines beyond the bound are dropped from the console
+only. While a run is active the full log is also spilled, unbounded, to a
+file in its results folder.
+"""
+import threading
+from collections import deque
+
+DEFAULT_MAX_PENDING = 5000
+
+
+class LogSink:
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING):
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        self._file = None
+        self.dropped = 0  # lines that never reached the console
+
+    def write(self, line):
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(line)
+            if self._file is not None:
+                self._file.write(line + "\n")
+
+    def drain(self):
+        """Return and clear the lines written since the last call."""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        return lines
+
+    def open_file(self, path):
+        """Also append every line to ``path`` until ``close_file``."""
+        handle = open(path, 'a', encoding='utf-8', buffering=64 * 1024)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = handle
+
+    def close_file(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
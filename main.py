@@ -1,36 +1,316 @@
+import time
+_STARTUP_TIME = time.perf_counter()
+
 import sys
 import os
-from datetime import datetime
-import time
+import multiprocessing
+import threading
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QPushButton, QFileDialog, QLabel, QComboBox,
                            QProgressBar, QMessageBox, QHBoxLayout, QFrame,
-                           QStyle, QSplitter, QListWidget, QCheckBox, QTextEdit,
-                           QGridLayout)
-from PyQt6.QtCore import Qt, QSettings, QSize
+                           QStyle, QSplitter, QListView, QCheckBox, QPlainTextEdit,
+                           QGridLayout, QSpinBox, QDoubleSpinBox, QInputDialog)
+from PyQt6.QtCore import Qt, QSettings, QSize, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon, QPalette, QColor
-from ultralytics import YOLO
-import glob
-from PIL import Image
 import subprocess
 
+# Nothing imported here may pull in torch/ultralytics; see ml_stack
+import json
+
+import autotune
+import ml_stack
+import optimize
+import quantize
+from file_list import FileListModel
+from log_sink import LogSink
+from export import EXPORT_FORMATS
+from model_cache import ModelCache
+from pipeline import RESULTS_ROOT, DetectionJob, build_options, new_results_dir, resume_arguments
+from result_cache import ResultCache
+from scanner import DirectoryIndex, IMAGE_EXTENSIONS, MEDIA_EXTENSIONS, VIDEO_EXTENSIONS, ScanStats, scan_folder
+from thumbnails import ThumbnailLoader
+from timings import STAGES
+from video import FrameSampling, is_video
+
+_QT_IMPORT_TIME = time.perf_counter() - _STARTUP_TIME
+
+CONSOLE_MAX_LINES = 5000  # older lines are dropped from the console (run.log keeps them)
+LOG_FLUSH_INTERVAL_MS = 100
+
+
+def format_duration(seconds):
+    """Format a number of seconds as a short human readable duration."""
+    seconds = int(max(seconds, 0))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+class DetectionWorker(QThread):
+    """Runs a ``pipeline.DetectionJob`` off the GUI thread.
+
+    The job's log/status/progress callbacks are forwarded as signals, so the
+    GUI gets per-image progress while inference streams along.
+    """
+    log = pyqtSignal(str)
+    status = pyqtSignal(str)
+    progress = pyqtSignal(int, int, float, float)  # done, total, images/sec, eta seconds
+    completed = pyqtSignal(str, object)  # results dir, DetectionStats
+    failed = pyqtSignal(str)
+    timings = pyqtSignal(object)  # StageTimings.snapshot()
+
+    def __init__(self, model_cache, model_name, image_paths, options, results_dir, parent=None,
+                 log_sink=None, **job_options):
+        super().__init__(parent)
+        # A thread-safe sink takes log lines directly, without a queued signal per line
+        self.job = DetectionJob(model_cache, model_name, image_paths, options, results_dir,
+                                on_log=log_sink.write if log_sink is not None else self.log.emit,
+                                on_status=self.status.emit,
+                                on_progress=self.progress.emit, on_timings=self.timings.emit, **job_options)
+
+    def cancel(self):
+        self.job.cancel()
+
+    def pause(self):
+        self.job.pause()
+
+    def resume(self):
+        self.job.resume()
+
+    def is_paused(self):
+        return self.job.is_paused()
+
+    def is_cancelled(self):
+        return self.job.is_cancelled()
+
+    def run(self):
+        try:
+            stats = self.job.run()
+            self.completed.emit(self.job.results_dir, stats)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class MLStackLoader(QThread):
+    """Imports torch/ultralytics in the background after the window is shown."""
+    loaded = pyqtSignal(object)  # [(module, seconds), ...]
+    failed = pyqtSignal(str)
+
+    def __init__(self, interop_threads=None, parent=None):
+        super().__init__(parent)
+        self.interop_threads = interop_threads
+
+    def run(self):
+        try:
+            timings = ml_stack.import_ml_stack()
+            # Only possible before torch does any parallel work
+            if self.interop_threads:
+                ml_stack.set_torch_threads(inter_op=self.interop_threads)
+            self.loaded.emit(timings)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class AutoTuneWorker(QThread):
+    """Runs the throughput calibration for one model off the GUI thread."""
+    progress = pyqtSignal(str)
+    completed = pyqtSignal(str, object)  # model path, config dict or None
+    failed = pyqtSignal(str)
+
+    def __init__(self, model_cache, model_name, image_paths, parent=None):
+        super().__init__(parent)
+        self.model_cache = model_cache
+        self.model_name = model_name
+        self.image_paths = image_paths
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            self.progress.emit(f"Auto-tune: loading {os.path.basename(self.model_name)}")
+            model = self.model_cache.get(self.model_name)
+            config = autotune.autotune(model, self.image_paths, progress=self.progress.emit,
+                                       cancel_event=self._cancelled, model_path=self.model_name)
+            self.completed.emit(self.model_name, config)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class OptimizeWorker(QThread):
+    """Exports a model to another backend and compares it against the original."""
+    progress = pyqtSignal(str)
+    completed = pyqtSignal(str, str, object)  # model path, artifact path, comparison report
+    failed = pyqtSignal(str)
+
+    def __init__(self, model_cache, model_name, digest, fmt, imgsz, image_paths, parent=None):
+        super().__init__(parent)
+        self.model_cache = model_cache
+        self.model_name = model_name
+        self.digest = digest
+        self.fmt = fmt
+        self.imgsz = imgsz
+        self.image_paths = image_paths
+
+    def run(self):
+        try:
+            from prefetch import decode_image
+
+            label = optimize.BACKENDS[self.fmt][0]
+            quantized = self.fmt == 'onnx_int8'
+            sample_size = quantize.CALIBRATION_SIZE if quantized else optimize.COMPARE_SAMPLE_SIZE
+            step = max(1, len(self.image_paths) // sample_size)
+            sample = self.image_paths[::step][:sample_size]
+            images = [im for im in (decode_image(p) for p in sample) if im is not None]
+            if not images:
+                raise ValueError("None of the sampled images could be read")
+            self.progress.emit(f"Optimize: exporting {os.path.basename(self.model_name)} to {label} "
+                               f"(imgsz {self.imgsz})")
+            if quantized:
+                # Drift is measured on the calibration images themselves
+                artifact = quantize.quantize_model(self.model_name, self.imgsz, self.digest, images,
+                                                   progress=lambda message: self.progress.emit(f"Optimize: {message}"))
+            else:
+                artifact = optimize.export_model(self.model_name, self.fmt, self.imgsz, self.digest)
+            self.progress.emit(f"Optimize: comparing {label} against PyTorch")
+            report = optimize.compare_backends(self.model_cache.get(self.model_name),
+                                               self.model_cache.get(artifact), images, self.imgsz)
+            self.completed.emit(self.model_name, artifact, report)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class ModelPreloader(QThread):
+    """Loads the selected model into the cache in the background.
+
+    Only the most recently requested model is loaded; requests made while a
+    load is in progress replace each other.
+    """
+    loaded = pyqtSignal(str, float)  # path, seconds
+    failed = pyqtSignal(str, str)  # path, error
+
+    def __init__(self, model_cache, parent=None):
+        super().__init__(parent)
+        self.model_cache = model_cache
+        self._pending = None
+        self._stopping = False
+        self._condition = threading.Condition()
+
+    def request(self, path):
+        with self._condition:
+            self._pending = path
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                path, self._pending = self._pending, None
+            
+            if self.model_cache.is_loaded(path):
+                continue
+            try:
+                start_time = time.perf_counter()
+                self.model_cache.get(path)
+                self.loaded.emit(path, time.perf_counter() - start_time)
+            except Exception as e:
+                self.failed.emit(path, str(e))
+
+
+class FolderScanWorker(QThread):
+    """Walks a folder off the GUI thread, streaming matches in chunks."""
+    found = pyqtSignal(object)  # list of paths
+    completed = pyqtSignal(str, object, float)  # folder, ScanStats, seconds
+
+    def __init__(self, folder_path, index, parent=None):
+        super().__init__(parent)
+        self.folder_path = folder_path
+        self.index = index
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def run(self):
+        stats = ScanStats()
+        start_time = time.perf_counter()
+        try:
+            for chunk in scan_folder(self.folder_path, MEDIA_EXTENSIONS, self.index,
+                                     self._cancelled, stats):
+                self.found.emit(chunk)
+        finally:
+            try:
+                self.index.save()
+            except OSError:
+                pass
+            self.completed.emit(self.folder_path, stats, time.perf_counter() - start_time)
+
+
 class ModelGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.settings = QSettings('ModelGUI', 'YOLO')
         self.last_directory = self.settings.value('last_directory', '')
         self.last_model_directory = self.settings.value('last_model_directory', '')
+        self.preload_enabled = self.settings.value('preload_model', True, type=bool)
+        self.result_cache = ResultCache()
+        
+        # Log lines are buffered and appended to the console in batches
+        self.log_sink = LogSink(CONSOLE_MAX_LINES)
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flushLog)
+        self.log_timer.start()
+        
+        # Loaded models are kept warm between runs
+        self.model_cache = ModelCache()
+        self.preloader = ModelPreloader(self.model_cache, self)
+        self.preloader.loaded.connect(self.onModelPreloaded)
+        self.preloader.failed.connect(self.onModelPreloadFailed)
+        self.ml_loader = MLStackLoader(self.settings.value('autotune/interop_threads', None, type=int), self)
+        self.ml_loader.loaded.connect(self.onMLStackLoaded)
+        self.ml_loader.failed.connect(self.onMLStackFailed)
         
         # Initialize labels as class members
         self.model_name_label = None
         self.model_path_label = None
         self.model_combo = None
+        self.backend_combo = None
+        self.optimize_btn = None
+        self.optimize_worker = None
         self.file_list = None
+        self.thumbnail_loader = None  # created when thumbnails are first shown
+        self.file_model = None
         self.status_label = None
         self.progress_bar = None
         self.console_output = None
+        self.stage_labels = {}
+        self.rate_label = None
         self.run_btn = None
         self.auto_open = None
+        self.pause_btn = None
+        self.cancel_btn = None
+        self.worker = None
+        self.tune_worker = None
+        self.tuned_label = None
+        self.scan_worker = None
+        self.dir_index = DirectoryIndex()
         
         self.initUI()
 
@@ -88,9 +368,26 @@ class ModelGUI(QMainWindow):
         model_layout.addWidget(self.model_combo, stretch=1)
         model_layout.addWidget(browse_model_btn)
         
+        # Runtime backend: the .pt itself or one of its exported versions
+        backend_layout = QHBoxLayout()
+        self.backend_combo = QComboBox()
+        self.backend_combo.setToolTip("Run detection with the original PyTorch weights or an optimized export")
+        self.backend_combo.currentIndexChanged.connect(self.onBackendChanged)
+        
+        self.optimize_btn = QPushButton("Optimize Model")
+        self.optimize_btn.setFixedWidth(120)
+        self.optimize_btn.setToolTip("Export the model to a faster CPU backend and compare it with PyTorch")
+        self.optimize_btn.clicked.connect(self.optimizeModel)
+        self.optimize_btn.setObjectName("browseModelBtn")
+        
+        backend_layout.addWidget(QLabel("Backend:"))
+        backend_layout.addWidget(self.backend_combo, stretch=1)
+        backend_layout.addWidget(self.optimize_btn)
+        
         top_layout.addWidget(model_label)
         top_layout.addWidget(self.model_name_label)
         top_layout.addLayout(model_layout)
+        top_layout.addLayout(backend_layout)
         top_layout.addWidget(self.model_path_label)
         
         # Initialize the display after all widgets are created
@@ -117,17 +414,21 @@ class ModelGUI(QMainWindow):
         add_files_btn.setObjectName("addFilesBtn")
         
         # Add Folder button with icon
-        add_folder_btn = QPushButton()
-        add_folder_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon))
-        add_folder_btn.setText("Add Folder")
-        add_folder_btn.setFixedWidth(120)
-        add_folder_btn.clicked.connect(self.browseFolder)
-        add_folder_btn.setObjectName("addFolderBtn")
+        self.add_folder_btn = QPushButton()
+        self.add_folder_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon))
+        self.add_folder_btn.setText("Add Folder")
+        self.add_folder_btn.setFixedWidth(120)
+        self.add_folder_btn.clicked.connect(self.browseFolder)
+        self.add_folder_btn.setObjectName("addFolderBtn")
         
         file_controls.addWidget(add_files_btn)
-        file_controls.addWidget(add_folder_btn)
+        file_controls.addWidget(self.add_folder_btn)
         file_controls.addStretch()
         
+        self.show_thumbnails = QCheckBox("Thumbnails")
+        self.show_thumbnails.setToolTip("Show previews in the file list (made in the background and cached on disk)")
+        file_controls.addWidget(self.show_thumbnails)
+        
         # Clear button with icon
         clear_btn = QPushButton()
         clear_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_DialogDiscardButton))
@@ -139,10 +440,16 @@ class ModelGUI(QMainWindow):
         
         file_layout.addLayout(file_controls)
         
-        # File list widget
-        self.file_list = QListWidget()
+        # File list view, backed by a model so only visible rows are rendered
+        self.file_model = FileListModel(self)
+        self.file_list = QListView()
+        self.file_list.setModel(self.file_model)
+        self.file_list.setUniformItemSizes(True)
         self.file_list.setObjectName("fileList")
+        self.file_model.thumbnailsChanged.connect(self.file_list.viewport().update)
         file_layout.addWidget(self.file_list)
+        self.show_thumbnails.toggled.connect(self.setThumbnailsEnabled)
+        self.show_thumbnails.setChecked(self.settings.value('show_thumbnails', True, type=bool))
         
         layout.addWidget(file_frame)
         
@@ -171,8 +478,22 @@ class ModelGUI(QMainWindow):
         self.save_crop.setToolTip("Save cropped images of detections")
         options_grid.addWidget(self.save_crop, 0, 2)
         
+        export_layout = QHBoxLayout()
+        export_layout.addWidget(QLabel("Export:"))
+        self.export_format = QComboBox()
+        self.export_format.addItem("None", None)
+        for label, fmt in EXPORT_FORMATS.items():
+            self.export_format.addItem(label, fmt)
+        self.export_format.setToolTip("Stream every detection into one table in the results folder")
+        index = self.export_format.findData(self.settings.value('export_format'))
+        self.export_format.setCurrentIndex(max(index, 0))
+        self.export_format.currentIndexChanged.connect(
+            lambda: self.settings.setValue('export_format', self.export_format.currentData()))
+        export_layout.addWidget(self.export_format, stretch=1)
+        options_grid.addLayout(export_layout, 0, 3)
+        
         self.save_plots = QCheckBox("Save Plots")
-        self.save_plots.setToolTip("Save detection plots (confusion matrix, results.png)")
+        self.save_plots.setToolTip("Save confidence, class, per-class confidence and detections-per-image plots")
         options_grid.addWidget(self.save_plots, 1, 0)
         
         self.hide_labels = QCheckBox("Hide Labels")
@@ -183,6 +504,115 @@ class ModelGUI(QMainWindow):
         self.hide_conf.setToolTip("Hide confidence scores in detection images")
         options_grid.addWidget(self.hide_conf, 1, 2)
         
+        self.preload_model = QCheckBox("Preload Model")
+        self.preload_model.setChecked(self.preload_enabled)
+        self.preload_model.setToolTip("Load the selected model in the background so detection starts immediately")
+        self.preload_model.toggled.connect(self.setPreloadEnabled)
+        options_grid.addWidget(self.preload_model, 2, 0)
+        
+        self.use_result_cache = QCheckBox("Reuse Cached Results")
+        self.use_result_cache.setChecked(self.settings.value('use_result_cache', True, type=bool))
+        self.use_result_cache.setToolTip("Skip images this model already processed with the same options")
+        self.use_result_cache.toggled.connect(lambda checked: self.settings.setValue('use_result_cache', checked))
+        options_grid.addWidget(self.use_result_cache, 2, 1)
+        
+        clear_cache_btn = QPushButton("Clear Cached Results")
+        clear_cache_btn.setToolTip("Forget cached detections for the selected model")
+        clear_cache_btn.clicked.connect(self.clearResultCache)
+        options_grid.addWidget(clear_cache_btn, 2, 2)
+        
+        batch_layout = QHBoxLayout()
+        batch_layout.addWidget(QLabel("Batch size:"))
+        self.batch_size = QSpinBox()
+        self.batch_size.setRange(1, 64)
+        self.batch_size.setValue(self.settings.value('batch_size', 4, type=int))
+        self.batch_size.setToolTip("Images decoded ahead and sent to the model together")
+        self.batch_size.valueChanged.connect(lambda value: self.settings.setValue('batch_size', value))
+        batch_layout.addWidget(self.batch_size, stretch=1)
+        options_grid.addLayout(batch_layout, 1, 3)
+        
+        processes_layout = QHBoxLayout()
+        processes_layout.addWidget(QLabel("Processes:"))
+        self.processes = QSpinBox()
+        self.processes.setRange(1, os.cpu_count() or 1)
+        self.processes.setValue(min(self.settings.value('processes', 1, type=int), os.cpu_count() or 1))
+        self.processes.setToolTip("Worker processes for inference; each loads the model once "
+                                  "and the CPU cores are split between them")
+        self.processes.valueChanged.connect(lambda value: self.settings.setValue('processes', value))
+        processes_layout.addWidget(self.processes, stretch=1)
+        options_grid.addLayout(processes_layout, 2, 3)
+        
+        self.auto_tune_btn = QPushButton("Auto-tune")
+        self.auto_tune_btn.setToolTip("Measure the fastest batch size, image size and thread count "
+                                      "for the selected model on this machine")
+        self.auto_tune_btn.clicked.connect(self.runAutoTune)
+        options_grid.addWidget(self.auto_tune_btn, 3, 0)
+        
+        self.tuned_label = QLabel()
+        self.tuned_label.setObjectName("pathLabel")
+        options_grid.addWidget(self.tuned_label, 3, 1, 1, 3)
+        self.updateTunedDisplay()
+        
+        self.export_trace = QCheckBox("Export Trace")
+        self.export_trace.setChecked(self.settings.value('export_trace', False, type=bool))
+        self.export_trace.setToolTip("Write trace.json with every stage of the run, for chrome://tracing or Perfetto")
+        self.export_trace.toggled.connect(lambda checked: self.settings.setValue('export_trace', checked))
+        options_grid.addWidget(self.export_trace, 4, 0)
+        
+        self.pack_outputs = QCheckBox("Pack Labels/Crops")
+        self.pack_outputs.setChecked(self.settings.value('pack_outputs', False, type=bool))
+        self.pack_outputs.setToolTip("Write labels and crops into a few tar shards with an index "
+                                     "instead of one small file each")
+        self.pack_outputs.toggled.connect(lambda checked: self.settings.setValue('pack_outputs', checked))
+        options_grid.addWidget(self.pack_outputs, 4, 1)
+        
+        video_layout = QHBoxLayout()
+        video_layout.addWidget(QLabel("Video: every"))
+        self.frame_step = QSpinBox()
+        self.frame_step.setRange(1, 10000)
+        self.frame_step.setValue(self.settings.value('frame_step', 1, type=int))
+        self.frame_step.setSuffix(" frames")
+        self.frame_step.setToolTip("Run the model on every Nth frame of video files")
+        self.frame_step.valueChanged.connect(lambda value: self.settings.setValue('frame_step', value))
+        video_layout.addWidget(self.frame_step)
+        video_layout.addWidget(QLabel("from"))
+        self.video_start = QDoubleSpinBox()
+        self.video_start.setRange(0, 24 * 3600)
+        self.video_start.setSuffix(" s")
+        self.video_start.setToolTip("Skip video frames before this time")
+        video_layout.addWidget(self.video_start)
+        video_layout.addWidget(QLabel("to"))
+        self.video_end = QDoubleSpinBox()
+        self.video_end.setRange(0, 24 * 3600)
+        self.video_end.setSuffix(" s")
+        self.video_end.setSpecialValueText("end")
+        self.video_end.setToolTip("Stop at this time in each video (end: the whole video)")
+        video_layout.addWidget(self.video_end)
+        options_grid.addLayout(video_layout, 4, 2, 1, 2)
+        
+        tile_layout = QHBoxLayout()
+        tile_layout.addWidget(QLabel("Tiles:"))
+        self.tile_size = QSpinBox()
+        self.tile_size.setRange(0, 8192)
+        self.tile_size.setSingleStep(64)
+        self.tile_size.setSpecialValueText("off")
+        self.tile_size.setSuffix(" px")
+        self.tile_size.setValue(self.settings.value('tile_size', 0, type=int))
+        self.tile_size.setToolTip("Infer large images tile by tile at full resolution and merge the boxes "
+                                  "(off: the whole image is resized to the model input)")
+        self.tile_size.valueChanged.connect(lambda value: self.settings.setValue('tile_size', value))
+        tile_layout.addWidget(self.tile_size, stretch=1)
+        tile_layout.addWidget(QLabel("overlap"))
+        self.tile_overlap = QSpinBox()
+        self.tile_overlap.setRange(0, 50)
+        self.tile_overlap.setSuffix(" %")
+        self.tile_overlap.setValue(self.settings.value('tile_overlap', 20, type=int))
+        self.tile_overlap.setToolTip("How much neighbouring tiles overlap; objects smaller than the overlap "
+                                     "always appear whole in some tile")
+        self.tile_overlap.valueChanged.connect(lambda value: self.settings.setValue('tile_overlap', value))
+        tile_layout.addWidget(self.tile_overlap)
+        options_grid.addLayout(tile_layout, 5, 0, 1, 2)
+        
         options_layout.addLayout(options_grid)
         layout.addWidget(options_frame)
         
@@ -194,12 +624,37 @@ class ModelGUI(QMainWindow):
         # Add console output
         console_label = QLabel("Console Output:")
         console_label.setFont(QFont("Segoe UI", 10))
-        self.console_output = QTextEdit()
+        self.console_output = QPlainTextEdit()
         self.console_output.setReadOnly(True)
+        self.console_output.setMaximumBlockCount(CONSOLE_MAX_LINES)
         self.console_output.setObjectName("consoleOutput")
         self.console_output.setMinimumHeight(100)
         self.console_output.setMaximumHeight(200)
         
+        # Live per-stage timings beside the console
+        stats_frame = QFrame()
+        stats_frame.setObjectName("statsFrame")
+        stats_grid = QGridLayout(stats_frame)
+        stats_grid.setContentsMargins(8, 4, 8, 4)
+        stats_grid.setVerticalSpacing(2)
+        for column, heading in enumerate(("Stage", "p50 ms", "p95 ms")):
+            label = QLabel(heading)
+            label.setObjectName("pathLabel")
+            stats_grid.addWidget(label, 0, column)
+        for row, stage in enumerate(STAGES, start=1):
+            stats_grid.addWidget(QLabel(stage), row, 0)
+            p50_label, p95_label = QLabel("-"), QLabel("-")
+            for column, label in enumerate((p50_label, p95_label), start=1):
+                label.setAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                stats_grid.addWidget(label, row, column)
+            self.stage_labels[stage] = (p50_label, p95_label)
+        self.rate_label = QLabel("- img/s")
+        stats_grid.addWidget(self.rate_label, len(STAGES) + 1, 0, 1, 3)
+        
+        console_layout = QHBoxLayout()
+        console_layout.addWidget(self.console_output, stretch=1)
+        console_layout.addWidget(stats_frame)
+        
         # Progress and status
         progress_layout = QVBoxLayout()
         self.status_label = QLabel("Ready")
@@ -221,10 +676,37 @@ class ModelGUI(QMainWindow):
         self.run_btn.setObjectName("runButton")
         self.run_btn.setMinimumWidth(150)
         
+        self.resume_run_btn = QPushButton()
+        self.resume_run_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_BrowserReload))
+        self.resume_run_btn.setText("Resume Run")
+        self.resume_run_btn.setToolTip("Continue an interrupted run in its results folder, skipping what it finished")
+        self.resume_run_btn.clicked.connect(self.resumeRun)
+        self.resume_run_btn.setObjectName("resumeRunButton")
+        
+        self.pause_btn = QPushButton()
+        self.pause_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPause))
+        self.pause_btn.setText("Pause")
+        self.pause_btn.clicked.connect(self.togglePause)
+        self.pause_btn.setObjectName("pauseButton")
+        self.pause_btn.setEnabled(False)
+        
+        self.cancel_btn = QPushButton()
+        self.cancel_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaStop))
+        self.cancel_btn.setText("Cancel")
+        self.cancel_btn.clicked.connect(self.cancelDetection)
+        self.cancel_btn.setObjectName("cancelButton")
+        self.cancel_btn.setEnabled(False)
+        
         self.auto_open = QCheckBox("Auto-open results")
         self.auto_open.setChecked(True)
         
-        run_button_layout.addWidget(self.run_btn)
+        run_controls = QHBoxLayout()
+        run_controls.addWidget(self.run_btn)
+        run_controls.addWidget(self.resume_run_btn)
+        run_controls.addWidget(self.pause_btn)
+        run_controls.addWidget(self.cancel_btn)
+        
+        run_button_layout.addLayout(run_controls)
         run_button_layout.addWidget(self.auto_open)
         run_button_layout.setAlignment(self.auto_open, Qt.AlignmentFlag.AlignCenter)
         
@@ -233,7 +715,7 @@ class ModelGUI(QMainWindow):
         run_layout.addStretch()
         
         bottom_layout.addWidget(console_label)
-        bottom_layout.addWidget(self.console_output)
+        bottom_layout.addLayout(console_layout)
         bottom_layout.addLayout(progress_layout)
         bottom_layout.addLayout(run_layout)
         
@@ -284,10 +766,212 @@ class ModelGUI(QMainWindow):
                 self.model_name_label.setText(model_name)
                 self.model_path_label.setText(f"Path: {model_path}")
                 self.settings.setValue('last_model', model_path)
+                self.updateBackendList()
+                if self.preload_enabled and os.path.exists(self.selectedModelPath()):
+                    self.preloader.request(self.selectedModelPath())
+                self.updateTunedDisplay()
             else:
                 self.model_name_label.setText("No model selected")
                 self.model_path_label.setText("No model selected")
 
+    def selectedModelPath(self):
+        """Weights that detection runs with: the selected model, or its chosen export."""
+        if self.backend_combo is not None and self.backend_combo.currentData():
+            return self.backend_combo.currentData()
+        return self.model_combo.currentText()
+
+    def modelDigest(self, model_path):
+        try:
+            return self.result_cache.file_digest(model_path)
+        except OSError:
+            return None
+
+    def updateBackendList(self):
+        if self.backend_combo is None:
+            return
+        model_path = self.model_combo.currentText()
+        digest = self.modelDigest(model_path) if model_path else None
+        self.backend_combo.blockSignals(True)
+        self.backend_combo.clear()
+        self.backend_combo.addItem("PyTorch (.pt)", None)
+        if digest is not None:
+            for fmt, imgsz, path in optimize.find_artifacts(model_path, digest):
+                self.backend_combo.addItem(f"{optimize.BACKENDS[fmt][0]} (imgsz {imgsz})", path)
+        index = self.backend_combo.findData(self.settings.value('last_backend'))
+        self.backend_combo.setCurrentIndex(max(0, index))
+        self.backend_combo.blockSignals(False)
+
+    def onBackendChanged(self):
+        self.settings.setValue('last_backend', self.backend_combo.currentData() or '')
+        model_path = self.selectedModelPath()
+        if model_path and self.preload_enabled and os.path.exists(model_path):
+            self.preloader.request(model_path)
+
+    def stillImagePaths(self):
+        """The queued files that aren't videos, for calibration samples."""
+        return [path for path in self.file_model.paths() if not is_video(path)]
+
+    def optimizeModel(self):
+        # Not next to Auto-tune: both would drive the same cached model, and tuning changes the thread count
+        if self.optimize_worker is not None or self.tune_worker is not None or self.worker is not None:
+            return
+        model_path = self.model_combo.currentText()
+        image_paths = self.stillImagePaths()
+        if not model_path or not image_paths:
+            QMessageBox.warning(self, "Optimize Model", "Select a model and add some images to compare on first.",
+                              QMessageBox.StandardButton.Ok)
+            return
+        backends = optimize.available_backends()
+        labels = [optimize.BACKENDS[fmt][0] for fmt in backends]
+        label, ok = QInputDialog.getItem(self, "Optimize Model", "Export to:", labels, 0, False)
+        if not ok:
+            return
+        digest = self.modelDigest(model_path)
+        if digest is None:
+            return
+        tuned = self.tunedConfig(model_path)
+        imgsz = tuned['imgsz'] if tuned else optimize.DEFAULT_IMGSZ
+        
+        self.status_label.setText("Optimizing model...")
+        self.optimize_btn.setEnabled(False)
+        self.auto_tune_btn.setEnabled(False)
+        self.run_btn.setEnabled(False)
+        self.resume_run_btn.setEnabled(False)
+        self.optimize_worker = OptimizeWorker(self.model_cache, model_path, digest, backends[labels.index(label)],
+                                              imgsz, image_paths, self)
+        self.optimize_worker.progress.connect(self.log_output)
+        self.optimize_worker.completed.connect(self.onOptimizeCompleted)
+        self.optimize_worker.failed.connect(lambda message: self.log_output(f"Optimize failed: {message}"))
+        self.optimize_worker.finished.connect(self.onOptimizeFinished)
+        self.optimize_worker.start()
+
+    def onOptimizeCompleted(self, model_path, artifact, report):
+        label = optimize.BACKENDS[self.optimize_worker.fmt][0]
+        summary = optimize.describe_comparison(report, label)
+        for line in summary.splitlines():
+            self.log_output(f"Optimize: {line}")
+        if model_path != self.model_combo.currentText():
+            return
+        self.updateBackendList()
+        answer = QMessageBox.question(self, "Optimize Model", f"{summary}\n\nRun detection with {label}?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.backend_combo.setCurrentIndex(max(0, self.backend_combo.findData(artifact)))
+
+    def onOptimizeFinished(self):
+        self.optimize_worker.deleteLater()
+        self.optimize_worker = None
+        self.optimize_btn.setEnabled(self.worker is None)
+        self.auto_tune_btn.setEnabled(self.worker is None)
+        self.run_btn.setEnabled(self.worker is None)
+        self.resume_run_btn.setEnabled(self.worker is None)
+        self.updateStatus()
+
+    def tunedConfig(self, model_path):
+        """Auto-tune result stored for this model on this host, if any."""
+        value = self.settings.value(autotune.settings_key(model_path))
+        if not value:
+            return None
+        try:
+            return json.loads(value)
+        except ValueError:
+            return None
+
+    def updateTunedDisplay(self):
+        if self.tuned_label is None:
+            return
+        model_path = self.model_combo.currentText()
+        config = self.tunedConfig(model_path) if model_path else None
+        if config is None:
+            self.tuned_label.setText("Not tuned for this machine (ultralytics defaults)")
+            return
+        self.tuned_label.setText(f"Tuned: {autotune.describe(config)}")
+        self.batch_size.setValue(config['batch'])
+
+    def runAutoTune(self):
+        if self.tune_worker is not None:
+            self.tune_worker.cancel()
+            return
+        if self.worker is not None or self.optimize_worker is not None:
+            return
+        model_path = self.model_combo.currentText()
+        image_paths = self.stillImagePaths()
+        if not model_path or not image_paths:
+            QMessageBox.warning(self, "Auto-tune", "Select a model and add some images to calibrate on first.",
+                              QMessageBox.StandardButton.Ok)
+            return
+        
+        self.log_output(f"Auto-tuning {os.path.basename(model_path)} on {autotune.host_id()}...")
+        self.status_label.setText("Auto-tuning...")
+        self.run_btn.setEnabled(False)
+        self.resume_run_btn.setEnabled(False)
+        self.optimize_btn.setEnabled(False)
+        self.auto_tune_btn.setText("Stop Tuning")
+        self.tune_worker = AutoTuneWorker(self.model_cache, model_path, image_paths, self)
+        self.tune_worker.progress.connect(self.log_output)
+        self.tune_worker.completed.connect(self.onAutoTuneCompleted)
+        self.tune_worker.failed.connect(lambda message: self.log_output(f"Auto-tune failed: {message}"))
+        self.tune_worker.finished.connect(self.onAutoTuneFinished)
+        self.tune_worker.start()
+
+    def onAutoTuneCompleted(self, model_path, config):
+        if config is None:
+            self.log_output("Auto-tune: no configuration met the limits, keeping current settings")
+            return
+        self.log_output(f"Auto-tune: best is {autotune.describe(config)}")
+        message = f"Use these settings for {os.path.basename(model_path)} on this machine?\n\n{autotune.describe(config)}"
+        if config['imgsz'] < autotune.IMGSZ_CANDIDATES[0]:
+            message += "\n\nA smaller image size is faster but can miss small objects."
+        answer = QMessageBox.question(self, "Auto-tune", message)
+        if answer == QMessageBox.StandardButton.Yes:
+            self.settings.setValue(autotune.settings_key(model_path), json.dumps(config))
+            self.settings.setValue('autotune/interop_threads', config['interop_threads'])
+            self.updateTunedDisplay()
+
+    def onAutoTuneFinished(self):
+        self.tune_worker.deleteLater()
+        self.tune_worker = None
+        self.auto_tune_btn.setText("Auto-tune")
+        self.optimize_btn.setEnabled(self.worker is None)
+        self.run_btn.setEnabled(self.worker is None)
+        self.resume_run_btn.setEnabled(self.worker is None)
+        self.updateStatus()
+
+    def startBackgroundLoading(self):
+        """Called once the window is visible, so heavy imports never delay the first paint."""
+        startup = time.perf_counter() - _STARTUP_TIME
+        self.log_output(f"Startup: window shown in {startup:.2f}s (Qt import {_QT_IMPORT_TIME:.2f}s)")
+        self.ml_loader.start()
+        self.preloader.start()
+
+    def onMLStackLoaded(self, timings):
+        self.log_output(f"ML stack loaded in background: {ml_stack.format_timings(timings)}")
+
+    def onMLStackFailed(self, message):
+        self.log_output(f"Error: Could not import the ML stack: {message}")
+        self.status_label.setText("ML libraries unavailable")
+
+    def setPreloadEnabled(self, enabled):
+        self.preload_enabled = enabled
+        self.settings.setValue('preload_model', enabled)
+        if enabled:
+            self.updateModelDisplay()
+
+    def onModelPreloaded(self, path, seconds):
+        self.log_output(f"Model ready: {os.path.basename(path)} (loaded in {seconds:.1f}s)")
+
+    def onModelPreloadFailed(self, path, message):
+        self.log_output(f"Warning: Could not preload {os.path.basename(path)}: {message}")
+
+    def clearResultCache(self):
+        model_path = self.selectedModelPath()
+        if not model_path or not os.path.exists(model_path):
+            return
+        try:
+            removed = self.result_cache.invalidate_model(optimize.weights_file(model_path))
+            self.log_output(f"Removed {removed} cached results for {os.path.basename(model_path)}")
+        except Exception as e:
+            self.log_output(f"Warning: Could not clear the result cache: {str(e)}")
+
     def browseModel(self):
         dialog = QFileDialog(self)
         dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
@@ -306,59 +990,90 @@ class ModelGUI(QMainWindow):
                     self.model_combo.addItem(model_path)
                 self.model_combo.setCurrentText(model_path)
 
+    def setThumbnailsEnabled(self, enabled):
+        self.settings.setValue('show_thumbnails', enabled)
+        if enabled and self.thumbnail_loader is None:
+            self.thumbnail_loader = ThumbnailLoader(self.file_model.deliver_thumbnail)
+        self.file_model.set_thumbnails(self.thumbnail_loader if enabled else None)
+        size = self.thumbnail_loader.size if enabled else 16
+        self.file_list.setIconSize(QSize(size, size))
+
     def browseFiles(self):
         dialog = QFileDialog(self)
         dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
-        dialog.setNameFilter("Images (*.jpg *.jpeg *.png *.bmp)")
+        image_filter = " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS)
+        video_filter = " ".join(f"*{ext}" for ext in VIDEO_EXTENSIONS)
+        dialog.setNameFilters([f"Images and videos ({image_filter} {video_filter})",
+                               f"Images ({image_filter})", f"Videos ({video_filter})"])
         dialog.setDirectory(self.settings.value('last_directory', ''))
         
         if dialog.exec():
             selected_paths = dialog.selectedFiles()
-            for path in selected_paths:
-                if self.file_list.findItems(path, Qt.MatchFlag.MatchExactly) == []:
-                    self.file_list.addItem(path)
+            self.file_model.add_paths(selected_paths)
             
             if selected_paths:
                 self.settings.setValue('last_directory', os.path.dirname(selected_paths[0]))
             self.updateStatus()
 
     def browseFolder(self):
+        # The button doubles as "Stop Scan" while a scan is running
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+            return
+        
         dialog = QFileDialog(self)
         dialog.setFileMode(QFileDialog.FileMode.Directory)
         dialog.setDirectory(self.settings.value('last_directory', ''))
         
         if dialog.exec():
             folder_path = dialog.selectedFiles()[0]
-            image_files = []
-            for ext in ['*.jpg', '*.jpeg', '*.png', '*.bmp']:
-                image_files.extend(glob.glob(os.path.join(folder_path, ext)))
-                image_files.extend(glob.glob(os.path.join(folder_path, '**', ext), recursive=True))
-            
-            # Remove duplicates and sort
-            image_files = sorted(set(image_files))
-            
-            if not image_files:
-                QMessageBox.warning(self, "No Images Found", 
-                                  f"No image files found in the selected folder:\n{folder_path}",
-                                  QMessageBox.StandardButton.Ok)
-                return
             
             # Save the last used directory
             self.settings.setValue('last_directory', folder_path)
             
-            # Add files to list if not already present
-            for file_path in image_files:
-                if self.file_list.findItems(file_path, Qt.MatchFlag.MatchExactly) == []:
-                    self.file_list.addItem(file_path)
-            
-            self.updateStatus()
+            self.status_label.setText(f"Scanning {folder_path}...")
+            self.add_folder_btn.setText("Stop Scan")
+            self.add_folder_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_BrowserStop))
+            self.scan_worker = FolderScanWorker(folder_path, self.dir_index, self)
+            self.scan_worker.found.connect(self.onFilesFound)
+            self.scan_worker.completed.connect(self.onScanCompleted)
+            self.scan_worker.finished.connect(self.onScanFinished)
+            self.scan_worker.start()
+
+    def onFilesFound(self, paths):
+        # Add files to list if not already present
+        self.file_model.add_paths(paths)
+        self.status_label.setText(f"Scanning... {self.file_model.count()} images queued")
+
+    def onScanCompleted(self, folder_path, stats, seconds):
+        cancelled = self.scan_worker is not None and self.scan_worker.is_cancelled()
+        self.log_output(
+            f"Scanned {folder_path} in {seconds:.1f}s: {stats.files} images, "
+            f"{stats.dirs_listed} directories listed, {stats.dirs_cached} unchanged"
+            + (" (stopped)" if cancelled else "")
+        )
+        if not stats.files and not cancelled:
+            QMessageBox.warning(self, "No Images Found", 
+                              f"No image files found in the selected folder:\n{folder_path}",
+                              QMessageBox.StandardButton.Ok)
+        self.updateStatus()
+
+    def onScanFinished(self):
+        self.scan_worker.deleteLater()
+        self.scan_worker = None
+        self.add_folder_btn.setText("Add Folder")
+        self.add_folder_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_DirIcon))
             
     def clearFileList(self):
-        self.file_list.clear()
+        if self.scan_worker is not None:
+            # Drop chunks that are already queued as well
+            self.scan_worker.found.disconnect(self.onFilesFound)
+            self.scan_worker.cancel()
+        self.file_model.clear()
         self.updateStatus()
 
     def updateStatus(self):
-        total_files = self.file_list.count()
+        total_files = self.file_model.count()
         if total_files > 0:
             self.status_label.setText(f"Ready to process {total_files} image{'s' if total_files > 1 else ''}")
         else:
@@ -406,14 +1121,19 @@ class ModelGUI(QMainWindow):
             #addFilesBtn:hover, #addFolderBtn:hover, #browseModelBtn:hover {
                 background-color: #3b67a7;
             }
-            /* Red for clear button */
-            #clearBtn {
+            /* Red for clear and cancel buttons */
+            #clearBtn, #cancelButton {
                 background-color: #8a2d2d;
                 border-color: #9a3d3d;
             }
-            #clearBtn:hover {
+            #clearBtn:hover, #cancelButton:hover {
                 background-color: #9a3d3d;
             }
+            QPushButton:disabled {
+                background-color: #2d2d2d;
+                border-color: #3d3d3d;
+                color: #777777;
+            }
             /* Green for run button */
             #runButton {
                 background-color: #1e7145;
@@ -437,7 +1157,7 @@ class ModelGUI(QMainWindow):
             QComboBox::down-arrow {
                 image: url(down_arrow.png);
             }
-            QListWidget {
+            QListView {
                 background-color: #252526;
                 color: white;
                 border: 1px solid #3d3d3d;
@@ -453,7 +1173,7 @@ class ModelGUI(QMainWindow):
                 background-color: #2b5797;
                 border-radius: 2px;
             }
-            #consoleOutput {
+            #consoleOutput, #statsFrame {
                 background-color: #252526;
                 color: #ffffff;
                 border: 1px solid #3d3d3d;
@@ -482,15 +1202,24 @@ class ModelGUI(QMainWindow):
         """)
 
     def log_output(self, text):
-        self.console_output.append(text)
-        # Ensure the latest output is visible
-        self.console_output.verticalScrollBar().setValue(
-            self.console_output.verticalScrollBar().maximum()
-        )
-        QApplication.processEvents()
+        self.log_sink.write(text)
+
+    def flushLog(self):
+        lines = self.log_sink.drain()
+        if not lines:
+            return
+        scrollbar = self.console_output.verticalScrollBar()
+        # Only follow the output if the user hasn't scrolled up to read something
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+        self.console_output.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
 
     def run_detection(self):
-        if not self.file_list.count():
+        if self.worker is not None or self.tune_worker is not None or self.optimize_worker is not None:
+            return
+        
+        if not self.file_model.count():
             QMessageBox.warning(self, "No Files", "Please add some files for detection first.", 
                               QMessageBox.StandardButton.Ok)
             return
@@ -500,153 +1229,216 @@ class ModelGUI(QMainWindow):
                               QMessageBox.StandardButton.Ok)
             return
         
+        model_name = self.selectedModelPath()
+        
+        # Create results directory with timestamp
+        results_dir = new_results_dir()
         try:
-            # Load model
-            model_name = self.model_combo.currentText()
-            self.log_output(f"Loading model: {os.path.basename(model_name)}")
-            self.status_label.setText(f"Loading model: {os.path.basename(model_name)}")
-            self.model = YOLO(model_name)
-            
-            # Create results directory with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            results_dir = os.path.join("results", f"detection_{timestamp}")
-            os.makedirs(results_dir, exist_ok=True)
-            
-            # Collect all image paths
-            image_paths = [self.file_list.item(i).text() for i in range(self.file_list.count())]
-            
-            # Set detection options
-            options = {
-                "save": True,  # Always save results
-                "save_txt": self.save_txt.isChecked(),
-                "save_conf": self.save_conf.isChecked(),
-                "save_crop": self.save_crop.isChecked(),
-                "project": "results",
-                "name": f"detection_{timestamp}",
-                "exist_ok": True,  # Overwrite existing results
-                "show_labels": not self.hide_labels.isChecked(),  # Inverse of hide_labels
-                "show_conf": not self.hide_conf.isChecked()  # Inverse of hide_conf
-            }
-            
-            # Run batch detection
-            self.log_output("Starting detection with options:")
-            for key, value in options.items():
-                if value:  # Only log enabled options
-                    self.log_output(f"- {key}: {value}")
-            
-            # Process files with progress updates
-            total_files = len(image_paths)
-            self.progress_bar.setMaximum(total_files)
-            
-            results = self.model.predict(
-                source=image_paths,
-                **options
-            )
-            
-            # Update progress bar for each processed image
-            for i, r in enumerate(results):
-                self.progress_bar.setValue(i + 1)
-                
-                # Log detections for this image
-                boxes = r.boxes
-                class_counts = {}
-                for box in boxes:
-                    class_name = r.names[int(box.cls)]
-                    class_counts[class_name] = class_counts.get(class_name, 0) + 1
-                
-                # Format detection summary
-                if class_counts:
-                    detections = ", ".join([f"{count} {name}{'s' if count > 1 else ''}" 
-                                          for name, count in class_counts.items()])
-                    self.log_output(f"Found in {os.path.basename(image_paths[i])}: {detections}")
-                
-                QApplication.processEvents()
-            
-            # Generate and save plots if requested
-            if self.save_plots.isChecked():
-                try:
-                    self.log_output("Generating result plots...")
-                    plots_dir = os.path.join(results_dir, "plots")
-                    os.makedirs(plots_dir, exist_ok=True)
-                    
-                    # Save confusion matrix if available
-                    if hasattr(results[0], 'save_conf_matrix'):
-                        results[0].save_conf_matrix(file=os.path.join(plots_dir, "confusion_matrix.png"))
-                    
-                    # Save results plot
-                    try:
-                        import pandas as pd
-                        import matplotlib.pyplot as plt
-                        
-                        # Collect detection data
-                        data = []
-                        for i, r in enumerate(results):
-                            for box in r.boxes:
-                                confidence = float(box.conf)
-                                class_name = r.names[int(box.cls)]
-                                data.append({
-                                    'Image': os.path.basename(image_paths[i]),
-                                    'Class': class_name,
-                                    'Confidence': confidence
-                                })
-                        
-                        if data:
-                            df = pd.DataFrame(data)
-                            
-                            # Create confidence distribution plot
-                            plt.figure(figsize=(10, 6))
-                            plt.hist(df['Confidence'], bins=20, edgecolor='black')
-                            plt.title('Detection Confidence Distribution')
-                            plt.xlabel('Confidence Score')
-                            plt.ylabel('Count')
-                            plt.savefig(os.path.join(plots_dir, 'confidence_distribution.png'))
-                            plt.close()
-                            
-                            # Create class distribution plot
-                            plt.figure(figsize=(10, 6))
-                            df['Class'].value_counts().plot(kind='bar')
-                            plt.title('Detected Classes Distribution')
-                            plt.xlabel('Class')
-                            plt.ylabel('Count')
-                            plt.xticks(rotation=45)
-                            plt.tight_layout()
-                            plt.savefig(os.path.join(plots_dir, 'class_distribution.png'))
-                            plt.close()
-                            
-                            self.log_output("Generated distribution plots")
-                    except Exception as e:
-                        self.log_output(f"Warning: Could not generate distribution plots: {str(e)}")
-                        
-                except Exception as e:
-                    self.log_output(f"Warning: Could not generate some plots: {str(e)}")
-            
-            completion_msg = f"Detection completed! Results saved in: {results_dir}"
-            self.log_output(completion_msg)
-            self.status_label.setText("Detection completed!")
-            
-            # Open results folder if auto-open is checked
-            if self.auto_open.isChecked():
-                self.log_output("Opening results folder...")
-                if sys.platform == 'win32':
-                    os.startfile(results_dir)
-                elif sys.platform == 'darwin':
-                    subprocess.run(['open', results_dir])
-                else:
-                    subprocess.run(['xdg-open', results_dir])
-                
-        except Exception as e:
-            error_msg = f"An error occurred: {str(e)}"
-            self.log_output(error_msg)
-            QMessageBox.critical(self, "Error", error_msg)
-            self.status_label.setText("Error during detection")
-        finally:
-            self.progress_bar.setValue(0)
+            self.log_sink.open_file(os.path.join(results_dir, 'run.log'))
+        except OSError as e:
+            self.log_output(f"Warning: Could not create run.log: {str(e)}")
+        
+        # Collect all image paths
+        image_paths = self.file_model.paths()
+        
+        # Settings measured by Auto-tune for this model on this machine
+        tuned = self.tunedConfig(self.model_combo.currentText())
+        torch_threads = (tuned['threads'], tuned['interop_threads']) if tuned else None
+        # Exported models only accept the input size they were built for
+        imgsz = optimize.artifact_imgsz(model_name) or (tuned['imgsz'] if tuned else None)
+        
+        # Set detection options
+        options = build_options(
+            results_dir,
+            save_txt=self.save_txt.isChecked(),
+            save_conf=self.save_conf.isChecked(),
+            save_crop=self.save_crop.isChecked(),
+            show_labels=not self.hide_labels.isChecked(),
+            show_conf=not self.hide_conf.isChecked(),
+            imgsz=imgsz,
+            pack=self.pack_outputs.isChecked(),
+            tile=self.tile_size.value(),
+            tile_overlap=self.tile_overlap.value() / 100,
+        )
+        
+        self.log_output("Starting detection with options:")
+        for key, value in options.items():
+            if value:  # Only log enabled options
+                self.log_output(f"- {key}: {value}")
+        
+        self.startDetection(torch_threads, model_name=model_name, image_paths=image_paths, options=options,
+                            results_dir=results_dir, export_format=self.export_format.currentData(),
+                            save_plots=self.save_plots.isChecked(),
+                            frame_sampling=FrameSampling(self.frame_step.value(), self.video_start.value(),
+                                                         self.video_end.value()))
+
+    def resumeRun(self):
+        if self.worker is not None or self.tune_worker is not None or self.optimize_worker is not None:
+            return
+        
+        results_dir = QFileDialog.getExistingDirectory(
+            self, "Select the results folder of an interrupted run",
+            self.settings.value('last_resume_directory', RESULTS_ROOT))
+        if not results_dir:
+            return
+        self.settings.setValue('last_resume_directory', os.path.dirname(results_dir))
+        
+        try:
+            arguments = resume_arguments(results_dir)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Cannot Resume", str(e), QMessageBox.StandardButton.Ok)
+            return
+        model_name = arguments['model_name']
+        if not os.path.exists(model_name):
+            QMessageBox.warning(self, "Cannot Resume", f"The run's model is missing: {model_name}",
+                                QMessageBox.StandardButton.Ok)
+            return
+        
+        try:
+            self.log_sink.open_file(os.path.join(results_dir, 'run.log'))
+        except OSError as e:
+            self.log_output(f"Warning: Could not open run.log: {str(e)}")
+        # Output options come from the run's journal; speed settings from the current ones
+        self.log_output(f"Resuming the run in {results_dir} with {os.path.basename(model_name)}")
+        tuned = self.tunedConfig(model_name)
+        torch_threads = (tuned['threads'], tuned['interop_threads']) if tuned else None
+        self.startDetection(torch_threads, **arguments)
+
+    def startDetection(self, torch_threads, **job_arguments):
+        """Start a ``DetectionWorker`` for a new or resumed run with the current speed settings."""
+        self.progress_bar.setMaximum(len(job_arguments['image_paths']))
+        self.progress_bar.setValue(0)
+        self.onTimingsUpdated({"images": 0, "images_per_sec": 0.0, "stages": {}})
+        
+        self.worker = DetectionWorker(self.model_cache,
+                                      result_cache=self.result_cache if self.use_result_cache.isChecked() else None,
+                                      batch_size=self.batch_size.value(),
+                                      torch_threads=torch_threads,
+                                      processes=self.processes.value(),
+                                      trace=self.export_trace.isChecked(),
+                                      log_sink=self.log_sink,
+                                      parent=self,
+                                      **job_arguments)
+        self.worker.status.connect(self.status_label.setText)
+        self.worker.progress.connect(self.onDetectionProgress)
+        self.worker.timings.connect(self.onTimingsUpdated)
+        self.worker.completed.connect(self.onDetectionCompleted)
+        self.worker.failed.connect(self.onDetectionFailed)
+        self.worker.finished.connect(self.onWorkerFinished)
+        self.setRunning(True)
+        self.worker.start()
+
+    def setRunning(self, running):
+        self.run_btn.setEnabled(not running)
+        self.resume_run_btn.setEnabled(not running)
+        self.auto_tune_btn.setEnabled(not running)
+        self.optimize_btn.setEnabled(not running)
+        self.pause_btn.setEnabled(running)
+        self.cancel_btn.setEnabled(running)
+        self.pause_btn.setText("Pause")
+        self.pause_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPause))
+
+    def togglePause(self):
+        if self.worker is None:
+            return
+        if self.worker.is_paused():
+            self.worker.resume()
+            self.pause_btn.setText("Pause")
+            self.pause_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPause))
+            self.log_output("Detection resumed")
+        else:
+            self.worker.pause()
+            self.pause_btn.setText("Resume")
+            self.pause_btn.setIcon(self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay))
+            self.log_output("Pausing detection...")
+
+    def cancelDetection(self):
+        if self.worker is None:
+            return
+        self.log_output("Cancelling detection...")
+        self.status_label.setText("Cancelling...")
+        self.cancel_btn.setEnabled(False)
+        self.pause_btn.setEnabled(False)
+        self.worker.cancel()
+
+    def onDetectionProgress(self, done, total, rate, eta):
+        # Videos are counted in frames, known once the run has probed them
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+        self.status_label.setText(
+            f"Processing {done}/{total} - {rate:.1f} img/s - ETA {format_duration(eta)}"
+        )
+
+    def onTimingsUpdated(self, snapshot):
+        for stage, (p50_label, p95_label) in self.stage_labels.items():
+            p50, p95 = snapshot["stages"].get(stage, (None, None))
+            p50_label.setText("-" if p50 is None else f"{p50:.1f}")
+            p95_label.setText("-" if p95 is None else f"{p95:.1f}")
+        self.rate_label.setText(f"{snapshot['images_per_sec']:.1f} img/s ({snapshot['images']} images)")
+
+    def onDetectionCompleted(self, results_dir, stats):
+        if self.worker is not None and self.worker.is_cancelled():
+            self.status_label.setText("Detection cancelled")
+            self.log_output(f"Partial results saved in: {results_dir} (Resume Run continues from here)")
+            return
+        
+        completion_msg = f"Detection completed! Results saved in: {results_dir}"
+        self.log_output(completion_msg)
+        self.status_label.setText("Detection completed!")
+        
+        # Open results folder if auto-open is checked
+        if self.auto_open.isChecked():
+            self.log_output("Opening results folder...")
+            if sys.platform == 'win32':
+                os.startfile(results_dir)
+            elif sys.platform == 'darwin':
+                subprocess.run(['open', results_dir])
+            else:
+                subprocess.run(['xdg-open', results_dir])
+
+    def onDetectionFailed(self, message):
+        error_msg = f"An error occurred: {message}"
+        self.log_output(error_msg)
+        QMessageBox.critical(self, "Error", error_msg)
+        self.status_label.setText("Error during detection")
+
+    def onWorkerFinished(self):
+        self.log_sink.close_file()
+        self.worker.deleteLater()
+        self.worker = None
+        self.progress_bar.setValue(0)
+        self.setRunning(False)
+
+    def closeEvent(self, event):
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+            self.scan_worker.wait()
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        if self.tune_worker is not None:
+            self.tune_worker.cancel()
+            self.tune_worker.wait()
+        if self.optimize_worker is not None:
+            self.optimize_worker.wait()
+        self.preloader.stop()
+        self.preloader.wait()
+        self.ml_loader.wait()
+        self.result_cache.close()
+        if self.thumbnail_loader is not None:
+            self.thumbnail_loader.close()
+        self.log_sink.close_file()
+        super().closeEvent(event)
 
 def main():
+    # Needed for the sharded inference worker processes in frozen builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # Use Fusion style for better dark theme support
     window = ModelGUI()
     window.show()
+    # Deferred until the event loop has painted the window
+    QTimer.singleShot(0, window.startBackgroundLoading)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
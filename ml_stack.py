@@ -0,0 +1,78 @@
+"""Lazy import of the heavy ML stack (numpy, cv2, torch, ultralytics).
+
+Importing ultralytics pulls in torch and OpenCV, which takes seconds. The GUI
+imports nothing from here at startup; the stack is loaded on first use or by
+a background thread once the window is visible, and the time spent on each
+module is recorded so startup regressions can be tracked.
+"""
+import importlib
+import sys
+import threading
+import time
+
+# Imported in dependency order so each timing only covers that module
+IMPORT_ORDER = ['numpy', 'PIL.Image', 'cv2', 'torch', 'torchvision', 'ultralytics']
+REQUIRED = {'numpy', 'torch', 'ultralytics'}
+
+_lock = threading.Lock()
+_timings = None
+
+
+def import_ml_stack():
+    """Import the ML stack once and return ``[(module, seconds), ...]``.
+
+    Safe to call from any thread; concurrent callers wait for the first one.
+    """
+    global _timings
+    with _lock:
+        if _timings is not None:
+            return _timings
+        timings = []
+        for name in IMPORT_ORDER:
+            already_loaded = name in sys.modules
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                if name in REQUIRED:
+                    raise
+                continue
+            if not already_loaded:
+                timings.append((name, time.perf_counter() - start))
+        _timings = timings
+        return _timings
+
+
+def is_loaded():
+    return _timings is not None
+
+
+def get_yolo():
+    """Return the ultralytics ``YOLO`` class, importing the stack if needed."""
+    import_ml_stack()
+    from ultralytics import YOLO
+    return YOLO
+
+
+def format_timings(timings):
+    total = sum(seconds for _, seconds in timings)
+    parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings)
+    return f"{total:.2f}s ({parts})" if parts else f"{total:.2f}s"
+
+
+def set_torch_threads(intra_op=None, inter_op=None):
+    """Apply torch thread counts; returns False if ``inter_op`` couldn't be applied.
+
+    torch only accepts a new inter-op thread count before its first parallel
+    work, so that part is best effort once a model has run.
+    """
+    import torch
+
+    if intra_op:
+        torch.set_num_threads(int(intra_op))
+    if inter_op and torch.get_num_interop_threads() != int(inter_op):
+        try:
+            torch.set_num_interop_threads(int(inter_op))
+        except RuntimeError:
+            return False
+    return True
@@ -0,0 +1,128 @@
+"""In-memory registry of loaded YOLO models.
+
+Loading a ``.pt`` file means reading the weights from disk, building the
+network and fusing its layers, which takes seconds. Models are kept warm here
+keyed by path + mtime + size so switching back to a model that was already
+used is instant, while a file replaced on disk is picked up again.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import ml_stack
+from optimize import artifact_imgsz
+
+DEFAULT_MAX_MODELS = 4
+DEFAULT_MEMORY_LIMIT = 2 * 1024 ** 3  # 2 GB of weights
+WARMUP_IMGSZ = 640
+
+
+def model_key(path):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def estimate_model_bytes(model, path):
+    """Size of the model's tensors in memory, falling back to the file size."""
+    try:
+        module = model.model
+        total = sum(t.numel() * t.element_size() for t in module.parameters())
+        total += sum(t.numel() * t.element_size() for t in module.buffers())
+        return total
+    except Exception:
+        return os.path.getsize(path)
+
+
+def warmup_model(model, imgsz=WARMUP_IMGSZ):
+    """Run one dummy inference so the first real image isn't penalized.
+
+    The first predict call creates the predictor and fuses Conv+BN layers;
+    doing it here moves that cost out of the user's run.
+    """
+    import numpy as np
+
+    blank = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    model.predict(source=blank, imgsz=imgsz, save=False, verbose=False)
+
+
+class ModelCache:
+    """Thread-safe LRU cache of loaded models with a memory cap."""
+
+    def __init__(self, max_models=DEFAULT_MAX_MODELS, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.max_models = max_models
+        self.memory_limit = memory_limit
+        self._models = OrderedDict()  # key -> (model, nbytes)
+        self._loading = {}  # key -> lock held while that model loads
+        self._lock = threading.Lock()
+
+    def is_loaded(self, path):
+        try:
+            key = model_key(path)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._models
+
+    def get(self, path, warmup=True):
+        """Return the model for ``path``, loading (and warming it up) if needed.
+
+        Concurrent callers asking for the same model wait for a single load
+        instead of loading it twice.
+        """
+        key = model_key(path)
+        with self._lock:
+            model = self._lookup(key)
+            if model is not None:
+                return model
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._lookup(key)
+                if model is not None:
+                    return model
+
+            model = ml_stack.get_yolo()(path)
+            if warmup:
+                # Exported backends only take the input size they were built for
+                warmup_model(model, artifact_imgsz(path) or WARMUP_IMGSZ)
+            nbytes = estimate_model_bytes(model, path)
+
+            with self._lock:
+                # Older versions of the same file are never going to be hit again
+                for stale in [k for k in self._models if k[0] == key[0]]:
+                    del self._models[stale]
+                self._models[key] = (model, nbytes)
+                self._loading.pop(key, None)
+                self._evict()
+        return model
+
+    def invalidate(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self._models if k[0] == path]:
+                del self._models[key]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def memory_used(self):
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._models.values())
+
+    def _lookup(self, key):
+        entry = self._models.get(key)
+        if entry is None:
+            return None
+        self._models.move_to_end(key)
+        return entry[0]
+
+    def _evict(self):
+        # Always keep the most recently used model, even if it alone is over the cap
+        while len(self._models) > 1:
+            total = sum(nbytes for _, nbytes in self._models.values())
+            if len(self._models) <= self.max_models and total <= self.memory_limit:
+                break
+            self._models.popitem(last=False)
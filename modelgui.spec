@@ -13,12 +13,15 @@ a = Analysis(
         'PyQt6.QtWidgets',
         'PyQt6.QtCore',
         'PyQt6.QtGui',
+        # Imported lazily by ml_stack, so PyInstaller can't see them
         'ultralytics',
         'PIL',
         'matplotlib',
         'matplotlib.pyplot',
         'pandas',
         'torch',
+        'torchvision',
+        'numpy',
         'yaml',
         'cv2',
     ],
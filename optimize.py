@@ -0,0 +1,199 @@
+"""Export ``.pt`` weights to faster CPU runtime backends.
+
+PyTorch eager mode is rarely the fastest way to run a model on a CPU.
+Ultralytics can export the same network to ONNX, OpenVINO or TorchScript;
+the exported artifacts are cached next to the original weights, in
+``<stem>_optimized/<weights hash>-<imgsz>/``, so they are only rebuilt when
+the weights change. Exported models have a fixed input size, which is why
+``imgsz`` is part of the key.
+
+``compare_backends`` runs the original and the exported model on the same
+images so the speedup and any change in the detections can be checked before
+switching to the new backend.
+"""
+import importlib.util
+import os
+import shutil
+import time
+
+# format -> (label, artifact suffix, required modules, extra export arguments)
+BACKENDS = {
+    'onnx': ('ONNX', '.onnx', ('onnx', 'onnxruntime'), {'dynamic': True}),
+    'openvino': ('OpenVINO', '_openvino_model', ('openvino',), {'dynamic': True}),
+    'torchscript': ('TorchScript', '.torchscript', (), {}),
+    # Not an ultralytics export format: built by quantize.quantize_model from the ONNX export
+    'onnx_int8': ('ONNX INT8', '.int8.onnx', ('onnx', 'onnxruntime'), None),
+}
+DEFAULT_IMGSZ = 640
+COMPARE_SAMPLE_SIZE = 8
+MATCH_IOU = 0.5
+
+
+def available_backends():
+    """Formats whose runtime is installed, so exporting won't try to download packages."""
+    return [fmt for fmt, (_, _, modules, _) in BACKENDS.items()
+            if all(importlib.util.find_spec(m) is not None for m in modules)]
+
+
+def cache_dir(model_path):
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(model_path)), f"{stem}_optimized")
+
+
+def artifact_path(model_path, fmt, imgsz, digest):
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    suffix = BACKENDS[fmt][1]
+    return os.path.join(cache_dir(model_path), f"{digest[:16]}-{imgsz}", stem + suffix)
+
+
+def artifact_imgsz(path):
+    """Input size an exported artifact was built for, or None for ordinary weights."""
+    key_dir = os.path.dirname(os.path.abspath(path))
+    if not os.path.dirname(key_dir).endswith('_optimized'):
+        return None
+    imgsz = os.path.basename(key_dir).rpartition('-')[2]
+    return int(imgsz) if imgsz.isdigit() else None
+
+
+def weights_file(path):
+    """A single file standing for the model, for hashing (OpenVINO models are a directory)."""
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.xml'):
+                return os.path.join(path, name)
+    return path
+
+
+def find_artifacts(model_path, digest):
+    """Exported backends built from the current weights: ``[(fmt, imgsz, path), ...]``."""
+    root = cache_dir(model_path)
+    if not os.path.isdir(root):
+        return []
+    found = []
+    for key in sorted(os.listdir(root)):
+        key_digest, _, imgsz = key.rpartition('-')
+        if key_digest != digest[:16] or not imgsz.isdigit():
+            continue
+        for fmt in BACKENDS:
+            path = artifact_path(model_path, fmt, int(imgsz), digest)
+            if os.path.exists(path):
+                found.append((fmt, int(imgsz), path))
+    return found
+
+
+def export_model(model_path, fmt, imgsz, digest):
+    """Export ``model_path`` (if not cached yet) and return the artifact path."""
+    target = artifact_path(model_path, fmt, imgsz, digest)
+    if os.path.exists(target):
+        return target
+    if BACKENDS[fmt][3] is None:
+        raise ValueError(f"{BACKENDS[fmt][0]} is not an export format")
+    import ml_stack
+
+    # Export from a link to the weights inside the cache directory: ultralytics
+    # writes the artifact next to the weights and must not touch the user's files
+    work_dir = os.path.dirname(target)
+    os.makedirs(work_dir, exist_ok=True)
+    local_weights = os.path.join(work_dir, os.path.basename(model_path))
+    if not os.path.exists(local_weights):
+        try:
+            os.link(os.path.abspath(model_path), local_weights)
+        except OSError:
+            shutil.copy2(model_path, local_weights)
+    try:
+        model = ml_stack.get_yolo()(local_weights)
+        exported = model.export(format=fmt, imgsz=imgsz, verbose=False, **BACKENDS[fmt][3])
+        exported = os.path.join(work_dir, os.path.basename(str(exported).rstrip('/\\')))
+        if exported != target:
+            os.replace(exported, target)
+    finally:
+        os.remove(local_weights)
+    return target
+
+
+def _iou_matrix(a, b):
+    import numpy as np
+
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_detections(reference, candidate, iou=MATCH_IOU):
+    """Greedily pair same-class boxes; returns ``(matched, [conf differences])``."""
+    if not len(reference) or not len(candidate):
+        return 0, []
+    overlaps = _iou_matrix(reference.xyxy, candidate.xyxy)
+    overlaps[reference.cls[:, None] != candidate.cls[None, :]] = 0
+    matched = 0
+    deltas = []
+    while True:
+        i, j = divmod(int(overlaps.argmax()), overlaps.shape[1])
+        if overlaps[i, j] < iou:
+            break
+        matched += 1
+        deltas.append(abs(float(reference.conf[i]) - float(candidate.conf[j])))
+        overlaps[i, :] = 0
+        overlaps[:, j] = 0
+    return matched, deltas
+
+
+def _timed_detections(model, images, imgsz):
+    from detections import Detections
+
+    model.predict(source=images[0], imgsz=imgsz, verbose=False)  # predictor setup isn't measured
+    detections = []
+    start = time.perf_counter()
+    for image in images:
+        result = model.predict(source=image, imgsz=imgsz, verbose=False)[0]
+        detections.append(Detections.from_result(result, path=''))
+    return detections, (time.perf_counter() - start) * 1000 / len(images)
+
+
+def compare_backends(baseline, candidate, images, imgsz):
+    """Latency and detection agreement of ``candidate`` against ``baseline`` on ``images``."""
+    reference, baseline_ms = _timed_detections(baseline, images, imgsz)
+    found, candidate_ms = _timed_detections(candidate, images, imgsz)
+    matched = 0
+    deltas = []
+    for a, b in zip(reference, found):
+        m, d = match_detections(a, b)
+        matched += m
+        deltas.extend(d)
+    reference_total = sum(len(d) for d in reference)
+    candidate_total = sum(len(d) for d in found)
+    reference_conf = sum(float(d.conf.sum()) for d in reference)
+    candidate_conf = sum(float(d.conf.sum()) for d in found)
+    return {
+        'images': len(images),
+        'imgsz': imgsz,
+        'baseline_ms': baseline_ms,
+        'candidate_ms': candidate_ms,
+        'speedup': baseline_ms / candidate_ms if candidate_ms > 0 else 0.0,
+        'baseline_detections': reference_total,
+        'candidate_detections': candidate_total,
+        'matched': matched,
+        'baseline_conf_mean': reference_conf / reference_total if reference_total else 0.0,
+        'candidate_conf_mean': candidate_conf / candidate_total if candidate_total else 0.0,
+        # Share of detections found by both; 1.0 when neither model found anything
+        'agreement': 2 * matched / (reference_total + candidate_total) if reference_total + candidate_total else 1.0,
+        'max_conf_delta': max(deltas) if deltas else 0.0,
+        'mean_conf_delta': sum(deltas) / len(deltas) if deltas else 0.0,
+    }
+
+
+def describe_comparison(report, label):
+    baseline = report['baseline_detections']
+    count_drift = (report['candidate_detections'] - baseline) / baseline if baseline else 0.0
+    return (f"On {report['images']} images at imgsz {report['imgsz']}:\n"
+            f"PyTorch: {report['baseline_ms']:.1f} ms/image, {report['baseline_detections']} detections\n"
+            f"{label}: {report['candidate_ms']:.1f} ms/image, {report['candidate_detections']} detections\n"
+            f"Speedup: {report['speedup']:.2f}x\n"
+            f"Detection count drift: {count_drift:+.1%}, mean confidence "
+            f"{report['baseline_conf_mean']:.3f} -> {report['candidate_conf_mean']:.3f}\n"
+            f"Matching detections: {report['agreement']:.1%} "
+            f"(confidence differs by {report['mean_conf_delta']:.4f} on average, "
+            f"{report['max_conf_delta']:.4f} at most)")
@@ -0,0 +1,300 @@
+"""Writing annotated images, labels and crops for a result.
+
+Files are laid out the same way ultralytics' predictor does it, so results
+produced here (for example from the result cache) sit next to the ones
+ultralytics wrote itself:
+
+    <save_dir>/<image name>              annotated image
+    <save_dir>/labels/<stem>.txt         YOLO format labels
+    <save_dir>/crops/<class>/<stem>.jpg  cropped detections
+
+With the ``pack`` option, labels and crops go into a few tar shards under
+``<save_dir>/packed`` instead (see ``shards.py``), under the same names.
+
+``OutputWriter`` does the same writes on background threads, so encoding and
+slow disks overlap with inference instead of stalling it.
+"""
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+# predict() options handled here rather than by ultralytics
+OUTPUT_OPTIONS = ('save', 'save_txt', 'save_conf', 'save_crop', 'project', 'name', 'exist_ok', 'pack')
+
+
+def saves_anything(options):
+    return any(options.get(k) for k in ('save', 'save_txt', 'save_crop'))
+
+
+def label_text(boxes, save_conf=False):
+    """The YOLO label file ``Results.save_txt`` would write for ``boxes``, as a string."""
+    boxes = boxes.cpu()
+    lines = []
+    for cls, xywhn, conf in zip(boxes.cls.tolist(), boxes.xywhn.tolist(), boxes.conf.tolist()):
+        line = (int(cls), *xywhn) + ((conf,) if save_conf else ())
+        lines.append(("%g " * len(line)).rstrip() % line)
+    return "".join(line + "\n" for line in lines)
+
+
+def pack_result(result, packer, options, stem):
+    """Add the labels and crops enabled in ``options`` to a ``shards.ShardWriter``."""
+    if options.get('save_txt') and len(result.boxes):
+        packer.add(f"labels/{stem}.txt", label_text(result.boxes, options.get('save_conf', False)).encode())
+
+    if options.get('save_crop') and len(result.boxes):
+        import cv2
+        from ultralytics.utils.plotting import save_one_box
+
+        for i, box in enumerate(result.boxes.cpu()):
+            crop = save_one_box(box.xyxy, result.orig_img, BGR=True, save=False)
+            ok, encoded = cv2.imencode('.jpg', crop)
+            if ok:
+                packer.add(f"crops/{result.names[int(box.cls.item())]}/{stem}_{i}.jpg", encoded.tobytes())
+
+
+def save_result(result, save_dir, options, name=None, packer=None):
+    """Save the outputs enabled in ``options`` for one ultralytics ``Results``.
+
+    With a ``packer``, labels and crops are added to its shards instead of
+    written as files.
+    """
+    name = name or os.path.basename(result.path)
+    stem = os.path.splitext(name)[0]
+
+    if packer is not None:
+        pack_result(result, packer, options, stem)
+    elif options.get('save_txt'):
+        labels_dir = os.path.join(save_dir, 'labels')
+        os.makedirs(labels_dir, exist_ok=True)
+        result.save_txt(os.path.join(labels_dir, f"{stem}.txt"), save_conf=options.get('save_conf', False))
+
+    if packer is None and options.get('save_crop') and len(result.boxes):
+        result.save_crop(save_dir=os.path.join(save_dir, 'crops'), file_name=Path(stem))
+
+    if options.get('save'):
+        import cv2
+
+        annotated = result.plot(conf=options.get('show_conf', True), labels=options.get('show_labels', True))
+        cv2.imwrite(os.path.join(save_dir, name), annotated)
+
+
+def save_tiled(detections, source, names, save_dir, options, name=None, packer=None):
+    """``save_result`` for a tiled image, without ever holding it in full.
+
+    Labels only need the boxes, each crop is read as its own window of
+    ``source`` (see ``tiling.py``), and the annotated image is drawn on a
+    preview no larger than ``tiling.PREVIEW_SIZE`` read in strips.
+    """
+    import torch
+    from ultralytics.engine.results import Boxes, Results
+    from ultralytics.utils.plotting import save_one_box
+
+    from tiling import crop_window, read_preview
+
+    name = name or os.path.basename(detections.path)
+    stem = os.path.splitext(name)[0]
+    array = detections.to_array()
+    boxes = Boxes(torch.from_numpy(array), detections.orig_shape)
+    save_conf = options.get('save_conf', False)
+
+    if options.get('save_txt') and len(boxes):
+        text = label_text(boxes, save_conf)
+        if packer is not None:
+            packer.add(f"labels/{stem}.txt", text.encode())
+        else:
+            labels_dir = os.path.join(save_dir, 'labels')
+            os.makedirs(labels_dir, exist_ok=True)
+            with open(os.path.join(labels_dir, f"{stem}.txt"), 'a', encoding='utf-8') as f:
+                f.write(text)
+
+    if options.get('save_crop') and len(boxes):
+        import cv2
+
+        for i, (xyxy, cls) in enumerate(zip(detections.xyxy, detections.cls)):
+            window = source.read(*crop_window(xyxy, source.width, source.height))
+            if not window.size:
+                continue
+            whole = torch.tensor([0, 0, window.shape[1], window.shape[0]])
+            if packer is not None:
+                ok, encoded = cv2.imencode('.jpg', window)
+                if ok:
+                    packer.add(f"crops/{names[int(cls)]}/{stem}_{i}.jpg", encoded.tobytes())
+            else:
+                # The window already has save_one_box's margin, so it is saved whole
+                save_one_box(whole, window, file=Path(save_dir) / 'crops' / names[int(cls)] / f"{stem}.jpg",
+                             gain=1.0, pad=0, BGR=True)
+
+    if options.get('save'):
+        import cv2
+
+        preview, scale = read_preview(source)
+        array[:, :4] *= scale
+        result = Results(preview, path=detections.path, names=names, boxes=torch.from_numpy(array))
+        annotated = result.plot(conf=options.get('show_conf', True), labels=options.get('show_labels', True))
+        cv2.imwrite(os.path.join(save_dir, name), annotated)
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def clear_outputs(save_dir, redone, finished):
+    """Remove the labels and crops that inputs about to be redone left behind; returns how many.
+
+    Label files are appended to and crops numbered, so an input redone after
+    an interruption would otherwise have its outputs twice. ``redone`` and
+    ``finished`` are input paths; unpacked files and packed members both go.
+    Crops are matched by name the way ``save_one_box`` numbers them
+    (``<stem>.jpg``, ``<stem>2.jpg``, ...), the closest finished stem winning
+    when names are ambiguous.
+    """
+    from shards import PACKED_DIR, drop_members
+    from video import is_video
+
+    stems = {_stem(path) for path in redone if not is_video(path)}
+    videos = {_stem(path) for path in redone if is_video(path)}
+    kept = {_stem(path) for path in finished if not is_video(path)}
+    if not stems and not videos:
+        return 0
+
+    def owned(stem):
+        if stem in kept:
+            return False
+        if stem in stems:
+            return True
+        video, _, index = stem.rpartition('_')
+        if video in videos and index.isdigit():
+            return True  # a video frame, <video>_<frame>, or one of its numbered crops
+        end = len(stem)
+        while end > 1 and stem[end - 1].isdigit():
+            end -= 1
+            if stem[:end] in kept:
+                return False
+            if stem[:end] in stems:
+                return True  # numbered crop
+            if stem[end - 1] == '_' and owned(stem[:end - 1]):
+                return True  # packed crop, <stem>_<n>
+        return False
+
+    removed = 0
+    labels_dir = os.path.join(save_dir, 'labels')
+    crop_dirs = []
+    crops_dir = os.path.join(save_dir, 'crops')
+    if os.path.isdir(crops_dir):
+        crop_dirs = [entry.path for entry in os.scandir(crops_dir) if entry.is_dir()]
+    for directory in ([labels_dir] if os.path.isdir(labels_dir) else []) + crop_dirs:
+        for entry in os.scandir(directory):
+            if entry.is_file() and owned(os.path.splitext(entry.name)[0]):
+                os.remove(entry.path)
+                removed += 1
+    packed_dir = os.path.join(save_dir, PACKED_DIR)
+    if os.path.isdir(packed_dir):
+        removed += drop_members(packed_dir, lambda name: owned(_stem(name)))
+    return removed
+
+
+def default_writer_threads():
+    # At least two even on small machines: on network shares the writers mostly wait on I/O
+    return max(2, min(4, os.cpu_count() or 2))
+
+
+class OutputWriter:
+    """Writes outputs on a pool of threads while inference carries on.
+
+    ``submit`` hands a result over and returns immediately unless
+    ``max_pending`` results are already waiting, which blocks the producer
+    (backpressure) so a slow disk can't pile up decoded images in memory.
+    Each thread takes one result at a time, so at most ``max_pending``
+    results wait in the queue plus one per thread being written, and a big
+    annotated image never holds up the results queued behind it. ``drain``
+    and ``close`` wait for everything submitted to be written.
+    """
+
+    def __init__(self, save_dir, options, threads=None, max_pending=32, timings=None, packer=None):
+        self.save_dir = save_dir
+        self.options = options
+        self.packer = packer
+        self.threads = threads or default_writer_threads()
+        self.timings = timings
+        self.written = 0
+        self.failed = 0
+        self.first_error = None
+        self.write_time = 0.0  # summed over writer threads
+        self.stall_time = 0.0  # time submit() blocked on a full queue
+        self.drain_time = 0.0  # time drain() and close() waited for the queue to empty
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._lock = threading.Lock()
+        self._first_submit = None
+        self._last_done = None
+        self._workers = [threading.Thread(target=self._work, name=f'writer-{i}', daemon=True)
+                         for i in range(self.threads)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, result, name, on_done=None):
+        """Queue ``result`` for writing; ``on_done()`` is called on a writer thread once it's written."""
+        if self._first_submit is None:
+            self._first_submit = time.perf_counter()
+        try:
+            self._queue.put_nowait((result, name, on_done))
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put((result, name, on_done))
+            self.stall_time += time.perf_counter() - start
+
+    def drain(self):
+        """Wait until everything submitted so far is written."""
+        start = time.perf_counter()
+        self._queue.join()
+        self.drain_time += time.perf_counter() - start
+
+    def close(self):
+        start = time.perf_counter()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self.drain_time += time.perf_counter() - start
+
+    def summary(self):
+        elapsed = (self._last_done - self._first_submit) if self._last_done is not None else 0.0
+        rate = self.written / elapsed if elapsed > 0 else 0.0
+        text = (f"Outputs: wrote {self.written} images on {self.threads} threads ({rate:.1f} img/s, "
+                f"{self.write_time:.1f}s of writer time); inference waited {self.stall_time:.1f}s on a full "
+                f"write queue and {self.drain_time:.1f}s for writes to finish")
+        if self.failed:
+            text += f"; {self.failed} failed, first error: {self.first_error}"
+        return text
+
+    def _work(self):
+        track = threading.current_thread().name
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            result, name, on_done = item
+            start = time.perf_counter()
+            try:
+                save_result(result, self.save_dir, self.options, name=name, packer=self.packer)
+                ok = True
+            except Exception as e:
+                ok = False
+                with self._lock:
+                    self.failed += 1
+                    if self.first_error is None:
+                        self.first_error = f"{name}: {e}"
+            end = time.perf_counter()
+            elapsed = end - start
+            with self._lock:
+                self.write_time += elapsed
+                self.written += ok
+                self._last_done = max(end, self._last_done or end)
+            if self.timings is not None:
+                self.timings.add('write', elapsed * 1000)
+                self.timings.span('write', track, start, elapsed, image=name)
+            if ok and on_done is not None:
+                on_done()
+            self._queue.task_done()
@@ -0,0 +1,15 @@
+"""Where ModelGUI keeps its caches and results, whatever the working directory.
+
+Both live in the project folder (next to the executable in frozen builds),
+so the GUI, ``batch.py`` started from any directory and the tools share one
+result cache, directory index and thumbnail cache, and one results folder.
+Paths given on the command line stay relative to the caller's directory.
+"""
+import os
+import sys
+
+if getattr(sys, 'frozen', False):
+    PROJECT_ROOT = os.path.dirname(os.path.abspath(sys.executable))
+else:
+    PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache')
@@ -0,0 +1,646 @@
+"""Qt-free detection pipeline shared by the GUI and the headless batch CLI.
+
+``DetectionJob`` runs one detection job end to end: model load, result
+cache lookup, batched inference (in-process or sharded across worker
+processes), video frames, output writing, aggregation, export and plots. Progress, logging and
+status are reported through plain callbacks, so the GUI can forward them as
+Qt signals and ``batch.py`` can print them as JSON lines.
+
+Each run journals its configuration and finished inputs (see ``journal.py``);
+``resume_arguments`` turns the journal of an interrupted run back into a job
+that continues it in the same results folder.
+"""
+import contextlib
+import os
+import threading
+import time
+from datetime import datetime
+
+import ml_stack
+from journal import RunJournal, read_journal
+from optimize import weights_file
+from paths import PROJECT_ROOT
+from result_cache import entry_key, hash_file, options_key
+from tiling import TILE_OPTIONS
+from video import FRAME_MARKER, FrameSampling, is_video
+
+RESULTS_ROOT = os.path.join(PROJECT_ROOT, 'results')
+TIMINGS_INTERVAL = 0.5  # seconds between live timing snapshots
+
+
+def new_results_dir(root=RESULTS_ROOT):
+    """Create and return ``<root>/detection_<timestamp>``."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_dir = os.path.join(root, f"detection_{timestamp}")
+    os.makedirs(results_dir, exist_ok=True)
+    return results_dir
+
+
+def build_options(results_dir, save_txt=True, save_conf=False, save_crop=False,
+                  show_labels=True, show_conf=True, imgsz=None, pack=False, tile=None, tile_overlap=None):
+    """predict() options for a run writing into ``results_dir``."""
+    options = {
+        "save": True,  # Always save results
+        "save_txt": save_txt,
+        "save_conf": save_conf,
+        "save_crop": save_crop,
+        "project": os.path.abspath(os.path.dirname(results_dir)),
+        "name": os.path.basename(results_dir),
+        "exist_ok": True,  # Overwrite existing results
+        "show_labels": show_labels,
+        "show_conf": show_conf,
+        "pack": pack,  # labels and crops into tar shards instead of single files
+    }
+    if imgsz:
+        options["imgsz"] = imgsz
+    if tile:
+        options["tile"] = tile  # tiled inference, see tiling.py
+        if tile_overlap is not None:
+            options["tile_overlap"] = tile_overlap
+    return options
+
+
+def predict_options(options):
+    """The run options that ``model.predict`` itself understands."""
+    from outputs import OUTPUT_OPTIONS
+
+    return {k: v for k, v in options.items() if k not in OUTPUT_OPTIONS and k not in TILE_OPTIONS}
+
+
+def resume_arguments(results_dir):
+    """``DetectionJob`` keyword arguments that continue the interrupted run in ``results_dir``.
+
+    Everything that decides what the outputs look like comes from the
+    journal; speed settings (batch size, processes, threads) are up to the
+    caller. Raises ValueError if there is nothing to resume.
+    """
+    state = read_journal(results_dir)
+    if state.finished:
+        raise ValueError(f"The run in {results_dir} has already finished")
+    config = state.config
+    sampling = config.get('frame_sampling') or {}
+    # The folder may have been moved since
+    options = dict(config['options'], project=os.path.abspath(os.path.dirname(results_dir)),
+                   name=os.path.basename(results_dir))
+    return {
+        'model_name': config['model'],
+        'image_paths': state.inputs,
+        'options': options,
+        'results_dir': results_dir,
+        'export_format': config.get('export_format'),
+        'save_plots': config.get('save_plots', False),
+        'frame_sampling': FrameSampling(sampling.get('every', 1), sampling.get('start'), sampling.get('end')),
+        'resume': True,
+    }
+
+
+def _ignore(*args):
+    pass
+
+
+class DetectionJob:
+    """One detection run; call ``run()`` from whichever thread should do the work."""
+
+    def __init__(self, model_cache, model_name, image_paths, options, results_dir,
+                 result_cache=None, export_format=None, batch_size=4, torch_threads=None,
+                 processes=1, trace=False, writer_threads=None, save_plots=False, frame_sampling=None,
+                 resume=False, on_log=None, on_status=None, on_progress=None, on_timings=None):
+        self.model_cache = model_cache
+        self.model_name = model_name
+        self.inputs = list(image_paths)
+        self.image_paths = [path for path in image_paths if not is_video(path)]
+        self.video_paths = [path for path in image_paths if is_video(path)]
+        self.frame_sampling = frame_sampling or FrameSampling()
+        self.options = options
+        self.results_dir = results_dir
+        self.result_cache = result_cache
+        self.export_format = export_format
+        self.batch_size = batch_size
+        self.torch_threads = torch_threads  # (intra-op, inter-op) from auto-tune
+        self.processes = processes
+        self.trace = trace
+        self.writer_threads = writer_threads  # None: default pool size, 0: write on the inference thread
+        self.save_plots = save_plots
+        self.resuming = resume  # continue the journaled run in results_dir
+        self.completed = set()  # inputs finished before the run was resumed
+        self.skipped = 0  # of those, the ones left out of this run's results: videos, uncached images
+        self.journal = None  # RunJournal of the current run
+        self.timings = None  # StageTimings of the current run
+        self.writer = None  # OutputWriter of the current run
+        self.packer = None  # shards.ShardWriter of the current run, with the pack option
+        self.log = on_log or _ignore
+        self.status = on_status or _ignore
+        self.progress = on_progress or _ignore  # (done, total, images/sec, eta seconds)
+        self.report_timings = on_timings or _ignore  # StageTimings.snapshot() dicts
+        self.unreadable = 0
+        self.total = 0  # images plus sampled video frames; corrected when a video's length was misreported
+        self.planned_frames = {}  # video path -> frames it should yield
+        self._cancelled = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._resume.set()  # Wake up a paused run so it can exit
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def is_paused(self):
+        return not self._resume.is_set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def lookup_cached(self):
+        """Split the images into cached detections and paths that still need inference."""
+        model_digest = self.result_cache.file_digest(weights_file(self.model_name))
+        opts_key = options_key(self.options)
+        cached = []
+        to_infer = []
+        keys = {}
+        for i, path in enumerate(self.image_paths):
+            if self._cancelled.is_set():
+                break
+            if i % 500 == 0:
+                self.status(f"Checking result cache {i}/{len(self.image_paths)}")
+            try:
+                key = entry_key(self.result_cache.file_digest(path), model_digest, opts_key)
+                detections = self.result_cache.get(key, path)
+            except OSError:
+                key = detections = None
+            if detections is not None:
+                cached.append(detections)
+            elif path in self.completed:
+                self.skipped += 1  # outputs written before the resume, results no longer cached
+            else:
+                if key is not None:
+                    keys[path] = key
+                to_infer.append(path)
+        return cached, to_infer, keys, model_digest
+
+    def write_output(self, result, detections, name, inline=False, journal=True):
+        """Save the outputs for one result, on the writer pool if there is one and not ``inline``.
+
+        With ``journal`` the image is marked done in the journal once its outputs are written.
+        """
+        from outputs import save_result
+
+        path = detections.path
+        if self.writer is not None and not inline:
+            self.writer.submit(result, name, on_done=(lambda: self.journal.complete(path)) if journal else None)
+            return
+        start = time.perf_counter()
+        save_result(result, self.results_dir, self.options, name=name, packer=self.packer)
+        elapsed = time.perf_counter() - start
+        detections.speed['write'] = elapsed * 1000
+        self.timings.span('write', 'pipeline', start, elapsed)
+        if journal:
+            self.journal.complete(path)
+
+    def iter_detections(self, model, cached, to_infer, keys, model_digest):
+        """Yield ``(Detections, from_cache)``: cached images, inferred images, then video frames."""
+        yield from self.iter_images(model, cached, to_infer, keys, model_digest)
+        yield from self.iter_videos(model)
+
+    def iter_images(self, model, cached, to_infer, keys, model_digest):
+        """Yield ``(Detections, from_cache)`` for cached images first, then inferred ones."""
+        # Imported here so numpy/cv2 stay out of application startup
+        from detections import Detections
+        from outputs import saves_anything
+        from prefetch import Prefetcher
+
+        timings = self.timings
+        saving = saves_anything(self.options)
+
+        if self.completed:
+            # Finished before the run was resumed: the outputs are on disk, only the results are needed
+            for detections in cached:
+                if detections.path in self.completed:
+                    yield detections, True
+            cached = [d for d in cached if d.path not in self.completed]
+        if cached and not saving:
+            for detections in cached:
+                self.journal.complete(detections.path)
+                yield detections, True
+        elif cached:
+            # Materialize the outputs without running the model
+            with Prefetcher([d.path for d in cached], self.batch_size, timings=timings) as prefetcher:
+                position = 0
+                for _, images in prefetcher:
+                    for image in images:
+                        detections = cached[position]
+                        position += 1
+                        detections.speed.update(prefetcher.stage_ms(detections.path))
+                        if image is not None:
+                            self.write_output(detections.to_result(image, model.names), detections,
+                                              os.path.basename(detections.path))
+                        yield detections, True
+
+        if not to_infer:
+            return
+        if self.options.get('tile'):
+            yield from self.iter_tiled(model, to_infer, keys, model_digest)
+            return
+        if self.processes > 1:
+            yield from self.iter_sharded(to_infer, keys, model_digest)
+            return
+        # We save outputs ourselves: ultralytics would name in-memory images image0.jpg, image1.jpg...
+        options = predict_options(self.options)
+        with Prefetcher(to_infer, self.batch_size, timings=timings) as prefetcher:
+            for batch_paths, images in prefetcher:
+                batch = [(path, image) for path, image in zip(batch_paths, images) if image is not None]
+                for path, image in zip(batch_paths, images):
+                    if image is None:
+                        prefetcher.stage_ms(path)
+                        self.unreadable += 1
+                        self.log(f"Warning: Could not read {path}")
+                if not batch:
+                    continue
+                start = time.perf_counter()
+                results = model.predict(source=[image for _, image in batch], verbose=False, **options)
+                if timings.tracing:
+                    self.trace_predict(start, results)
+                for (path, _), r in zip(batch, results):
+                    detections = Detections.from_result(r, path=path)
+                    detections.speed.update(prefetcher.stage_ms(path))
+                    if saving:
+                        self.write_output(r, detections, os.path.basename(path))
+                    else:
+                        self.journal.complete(path)
+                    key = keys.get(path)
+                    if key is not None:
+                        self.result_cache.put(key, model_digest, detections)
+                    yield detections, False
+            self.log(f"Input pipeline: {prefetcher.summary()}")
+
+    def plan_videos(self):
+        """Count the frames each video will yield; returns the total."""
+        from video import probe
+
+        total = 0
+        for video in self.video_paths:
+            try:
+                frame_count, fps = probe(video)
+            except Exception:
+                continue  # reported when the video is read
+            planned = self.frame_sampling.count(frame_count, fps)
+            self.planned_frames[video] = planned
+            total += planned
+            self.log(f"Video {os.path.basename(video)}: {frame_count or 'unknown number of'} frames at {fps:.2f} fps, "
+                     f"inferring {planned or 'all sampled'} frames ({self.frame_sampling.describe()})")
+        return total
+
+    def iter_videos(self, model):
+        """Yield ``(Detections, False)`` for the sampled frames of each video, in order."""
+        if not self.video_paths:
+            return
+        from detections import Detections
+        from outputs import saves_anything
+        from video import FrameLog, FrameReader, frame_name, frame_path
+
+        saving = saves_anything(self.options)
+        options = predict_options(self.options)
+        if self.processes > 1:
+            self.log("Note: videos are decoded and inferred in this process, not in the worker processes")
+        for video in self.video_paths:
+            if self._cancelled.is_set():
+                return
+            planned = self.planned_frames.get(video, 0)
+            try:
+                reader = FrameReader(video, self.batch_size, self.frame_sampling, timings=self.timings)
+            except Exception as e:
+                self.unreadable += 1
+                self.total -= planned
+                self.log(f"Warning: Could not read {video}: {e}")
+                continue
+            self.status(f"Processing {os.path.basename(video)}")
+            produced = 0
+            with reader, FrameLog(self.results_dir, video, model.names) as frame_log:
+                for frames in reader:
+                    start = time.perf_counter()
+                    results = model.predict(source=[frame.image for frame in frames], verbose=False, **options)
+                    if self.timings.tracing:
+                        self.trace_predict(start, results)
+                    for frame, r in zip(frames, results):
+                        detections = Detections.from_result(r, path=frame_path(video, frame.index))
+                        detections.speed['decode'] = frame.decode_ms
+                        if saving:
+                            self.write_output(r, detections, frame_name(video, frame.index), journal=False)
+                        frame_log.write(frame, detections)
+                        produced += 1
+                        if produced > planned:
+                            self.total += 1  # length unknown or under-reported by the container
+                        yield detections, False
+                self.log(f"Video {os.path.basename(video)}: {reader.summary()}; "
+                         f"{frame_log.frames} frames with timestamps in {frame_log.path}")
+            self.total -= max(0, planned - produced)  # ended before the reported length
+            if self.writer is not None:
+                self.writer.drain()  # the video only counts as done once its frames are written
+            self.journal.complete(video)
+
+    def trace_predict(self, start, results):
+        """Lay a batch's ultralytics stage times out as consecutive trace spans."""
+        # Results.speed is per image: the batch total divided by the batch size
+        n = len(results)
+        speed = results[0].speed if n else {}
+        for stage in ('preprocess', 'inference', 'postprocess'):
+            seconds = speed.get(stage, 0.0) * n / 1000
+            self.timings.span(stage, 'inference', start, seconds, batch=n)
+            start += seconds
+
+    def iter_tiled(self, model, to_infer, keys, model_digest):
+        """Like the tail of ``iter_images``, but each image is inferred tile by tile."""
+        from detections import Detections
+        from outputs import save_tiled, saves_anything
+        from tiling import DEFAULT_OVERLAP, detect_tiled, open_source
+
+        tile = self.options['tile']
+        overlap = self.options.get('tile_overlap', DEFAULT_OVERLAP)
+        saving = saves_anything(self.options)
+        options = predict_options(self.options)
+        self.log(f"Tiled inference: {tile}px tiles overlapping by {overlap:.0%}")
+        if self.processes > 1:
+            self.log("Note: tiled images are inferred in this process, not in the worker processes")
+        windowed = 0
+        for path in to_infer:
+            if self._cancelled.is_set():
+                return
+            name = os.path.basename(path)
+            start = time.perf_counter()
+            try:
+                source = open_source(path)
+            except Exception:
+                self.unreadable += 1
+                self.log(f"Warning: Could not read {path}")
+                continue
+            read_ms = (time.perf_counter() - start) * 1000
+            windowed += source.windowed
+            try:
+                boxes, speed, tiles = detect_tiled(
+                    model, source, tile, overlap, self.batch_size, options, timings=self.timings,
+                    progress=lambda done, total: self.status(f"{name}: tile {done}/{total}"))
+                speed['read'] = read_ms
+                detections = Detections.from_array(path, boxes, (source.height, source.width), speed)
+                if saving:
+                    # Inline and from windows of the source: a full-size copy would undo the memory bound
+                    start = time.perf_counter()
+                    save_tiled(detections, source, model.names, self.results_dir, self.options, name=name,
+                               packer=self.packer)
+                    elapsed = time.perf_counter() - start
+                    detections.speed['write'] = elapsed * 1000
+                    self.timings.span('write', 'pipeline', start, elapsed)
+                self.journal.complete(path)
+            finally:
+                source.close()
+            key = keys.get(path)
+            if key is not None:
+                self.result_cache.put(key, model_digest, detections)
+            yield detections, False
+        self.log(f"Tiled inference: {windowed} of {len(to_infer)} images read as memory-mapped windows, "
+                 f"the rest decoded in full")
+
+    def iter_sharded(self, to_infer, keys, model_digest):
+        """Like the tail of ``iter_detections``, but spread over worker processes."""
+        from sharded import ShardedInference
+
+        sharded = ShardedInference(self.model_name, self.options, self.results_dir,
+                                   self.processes, self.batch_size)
+        self.log(f"Running {self.processes} worker processes with {sharded.threads} threads each")
+        with contextlib.closing(sharded.run(to_infer)) as results:
+            for path, detections in results:
+                if detections is None:
+                    self.unreadable += 1
+                    self.log(f"Warning: Could not read {path}")
+                    continue
+                key = keys.get(path)
+                if key is not None:
+                    self.result_cache.put(key, model_digest, detections)
+                self.journal.complete(path)  # the worker has written the outputs already
+                yield detections, False
+
+    def model_digest(self):
+        weights = weights_file(self.model_name)
+        if self.result_cache is not None:
+            return self.result_cache.file_digest(weights)
+        return hash_file(weights)
+
+    def run_config(self, model_digest):
+        """What the journal needs to resume this run; see ``resume_arguments``."""
+        return {
+            'model': os.path.abspath(self.model_name),
+            'model_digest': model_digest,
+            'options': self.options,
+            'frame_sampling': {'every': self.frame_sampling.every, 'start': self.frame_sampling.start,
+                               'end': self.frame_sampling.end},
+            'export_format': self.export_format,
+            'save_plots': self.save_plots,
+        }
+
+    def open_journal(self):
+        """Start this run's journal, or pick up the interrupted run's when resuming."""
+        from outputs import clear_outputs, saves_anything
+
+        model_digest = self.model_digest()
+        if not self.resuming:
+            self.journal = RunJournal.start(self.results_dir, self.run_config(model_digest), self.inputs)
+            return None
+        state = read_journal(self.results_dir)
+        if state.config.get('model_digest') != model_digest:
+            raise ValueError(f"The weights in {self.model_name} changed since the run in {self.results_dir} "
+                             f"started; start a new run instead")
+        self.completed = state.completed
+        self.journal = RunJournal.reopen(self.results_dir)
+        remaining = sum(path not in self.completed for path in self.inputs)
+        self.log(f"Resuming {self.results_dir}: {len(self.inputs) - remaining} of {len(self.inputs)} inputs "
+                 f"already done, {remaining} to go")
+        # Finished videos aren't decoded again, so their frames can't be part of this run's results
+        self.skipped = sum(path in self.completed for path in self.video_paths)
+        self.video_paths = [path for path in self.video_paths if path not in self.completed]
+        if self.result_cache is None:
+            self.skipped += sum(path in self.completed for path in self.image_paths)
+            self.image_paths = [path for path in self.image_paths if path not in self.completed]
+        if saves_anything(self.options):
+            # Labels are appended to and crops numbered: what the unfinished inputs wrote goes first
+            redone = [path for path in self.inputs if path not in self.completed]
+            removed = clear_outputs(self.results_dir, redone, self.completed)
+            if removed:
+                self.log(f"Removed {removed} labels and crops of unfinished inputs before redoing them")
+        return state
+
+    def trim_exports(self, basename):
+        """Leave only finished inputs in the exports of the interrupted run, as the rest is exported again."""
+        from export import drop_rows, existing_exports
+
+        for path in existing_exports(self.results_dir, self.export_format):
+            if os.path.basename(path) == f"{basename}.{self.export_format}":
+                continue  # about to be rewritten
+            if basename == 'detections':
+                os.remove(path)  # an earlier resume's rows, all in the full export again
+                continue
+            try:
+                dropped = drop_rows(path, lambda image: image.partition(FRAME_MARKER)[0] in self.completed)
+            except Exception as e:
+                self.log(f"Warning: Could not read {path} to remove the rows of unfinished inputs: {e}")
+                continue
+            if dropped:
+                self.log(f"Removed {dropped} rows of unfinished inputs from {os.path.basename(path)}")
+
+    def run(self):
+        """Run the job to completion (or cancellation) and return its ``DetectionStats``."""
+        from detection_stats import DetectionStats, format_counts
+
+        from outputs import OutputWriter, saves_anything
+        from timings import StageTimings
+
+        sink = None
+        self.timings = StageTimings(self.results_dir, trace=self.trace, append=self.resuming)
+        try:
+            if self.model_cache.is_loaded(self.model_name):
+                self.log(f"Using cached model: {os.path.basename(self.model_name)}")
+            else:
+                self.status(f"Loading model: {os.path.basename(self.model_name)}")
+                self.log(f"Loading model: {os.path.basename(self.model_name)}")
+            model = self.model_cache.get(self.model_name)
+            names = model.names
+            if self.torch_threads and self.processes == 1:
+                if not ml_stack.set_torch_threads(*self.torch_threads):
+                    self.log("Note: tuned inter-op threads apply after restarting ModelGUI")
+
+            journal_state = self.open_journal()
+            # After the journal: resuming may first rewrite the shards the packer appends to
+            if self.options.get('pack'):
+                # Also with worker processes: cached images, videos and tiled images are written here,
+                # and the workers' shards have their own prefixes
+                from shards import PACKED_DIR, ShardWriter
+                self.packer = ShardWriter(os.path.join(self.results_dir, PACKED_DIR))
+            if saves_anything(self.options) and self.writer_threads != 0:
+                self.writer = OutputWriter(self.results_dir, self.options, threads=self.writer_threads,
+                                           timings=self.timings, packer=self.packer)
+            total_files = len(self.image_paths)
+            self.total = total_files + self.plan_videos()
+            if self.result_cache is not None:
+                cached, to_infer, keys, model_digest = self.lookup_cached()
+                self.log(f"Result cache: {len(cached)} of {total_files} images already processed, "
+                         f"{len(to_infer)} to infer")
+                self.total -= total_files - len(cached) - len(to_infer)  # finished, no longer cached
+            else:
+                cached, to_infer, keys, model_digest = [], self.image_paths, {}, None
+            if self.skipped:
+                self.log(f"Note: {self.skipped} inputs finished before the resume are videos or images not in "
+                         f"the result cache; their outputs are kept but they are left out of the statistics, "
+                         f"plots and export")
+
+            stats = DetectionStats(names)
+            if self.export_format:
+                from export import open_sink
+                # Rewritten from the results unless some are missing; then keep the earlier rows
+                basename = f"detections.resume{journal_state.resumes + 1}" if self.skipped else 'detections'
+                if self.resuming:
+                    self.trim_exports(basename)
+                sink = open_sink(self.export_format, self.results_dir, names, basename=basename)
+            start_time = time.perf_counter()
+            paused_time = 0.0
+            last_timings = 0.0
+            done = 0
+            detections_iter = self.iter_detections(model, cached, to_infer, keys, model_digest)
+            with contextlib.closing(detections_iter):
+                for detections, from_cache in detections_iter:
+                    if not self._resume.is_set():
+                        self.status(f"Paused at {done}/{self.total}")
+                        pause_start = time.perf_counter()
+                        self._resume.wait()
+                        paused_time += time.perf_counter() - pause_start
+                    if self._cancelled.is_set():
+                        break
+
+                    image_name = os.path.basename(detections.path)
+                    done += 1
+
+                    # Log detections for this image
+                    aggregate_start = time.perf_counter()
+                    counts = stats.update(detections)
+                    if sink is not None:
+                        sink.write(detections)
+                    aggregate_time = time.perf_counter() - aggregate_start
+                    self.timings.span('aggregate', 'pipeline', aggregate_start, aggregate_time)
+                    self.timings.record(detections.path, dict(detections.speed, aggregate=aggregate_time * 1000))
+                    if len(detections):
+                        summary = format_counts(names, counts)
+                        self.log(f"Found in {image_name}{' (cached)' if from_cache else ''}: {summary}")
+
+                    elapsed = time.perf_counter() - start_time - paused_time
+                    rate = done / elapsed if elapsed > 0 else 0.0
+                    total = max(self.total, done)
+                    eta = (total - done) / rate if rate > 0 else 0.0
+                    self.progress(done, total, rate, eta)
+                    now = time.perf_counter()
+                    if now - last_timings >= TIMINGS_INTERVAL or done == total:
+                        last_timings = now
+                        self.report_timings(self.timings.snapshot())
+
+            if self._cancelled.is_set():
+                self.log(f"Detection cancelled after {done}/{self.total} images; "
+                         f"resume the run to continue in {self.results_dir}")
+            elapsed = time.perf_counter() - start_time - paused_time
+            if done and elapsed > 0:
+                self.log(f"Inference: {done} images in {elapsed:.1f}s ({done / elapsed:.1f} img/s)")
+            plotter = None
+            if self.save_plots:
+                # The stats are final now: render while the writers drain
+                from plots import PlotRenderer
+                plotter = PlotRenderer(stats, self.results_dir)
+                plotter.start()
+            if self.writer is not None:
+                self.status("Waiting for output writes to finish")
+                self.writer.close()
+                if self.writer.written or self.writer.failed:
+                    self.log(self.writer.summary())
+                self.writer = None
+            if self.packer is not None:
+                self.packer.close()
+                if self.packer.members or self.processes == 1:
+                    self.log(f"Packed {self.packer.members} labels and crops "
+                             f"({self.packer.bytes_written / 1e6:.1f} MB) into {self.packer.directory}")
+                self.packer = None
+            if plotter is not None:
+                self.status("Rendering plots")
+                plotter.join()
+                if plotter.error is not None:
+                    self.log(f"Warning: Could not generate distribution plots: {plotter.error}")
+                elif plotter.files:
+                    self.log(f"Plots: {len(plotter.files)} written to {plotter.plots_dir} in {plotter.seconds:.1f}s")
+                self.timings.span('plots', 'plots', plotter.started_at, plotter.seconds)
+            self.log(stats.summary())
+            self.log(self.timings.summary())
+            if sink is not None:
+                sink.close()
+                self.log(f"Exported {sink.rows_written} detections to {sink.path}")
+                sink = None
+            if not self._cancelled.is_set():
+                self.journal.finish(images=done, unreadable=self.unreadable)
+            return stats
+        finally:
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+            if self.packer is not None:
+                self.packer.close()
+                self.packer = None
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+            trace_path = self.timings.close()
+            if trace_path is not None:
+                self.log(f"Trace written to {trace_path} (open it in chrome://tracing or ui.perfetto.dev)")
+            if sink is not None:
+                try:
+                    sink.close()
+                except Exception:
+                    pass
+            if self.result_cache is not None:
+                self.result_cache.flush()
+
@@ -0,0 +1,118 @@
+"""Distribution plots for a finished run, rendered off the GUI thread.
+
+Everything is drawn from the fixed-size accumulators in ``DetectionStats``
+(confidence histogram, per-class counts and confidence histograms, images by
+number of detections), so rendering takes the same time for a hundred or a
+million detections. Figures are built with matplotlib's object API on the Agg
+canvas rather than pyplot: no global figure state, so it's safe on a
+background thread. ``PlotRenderer`` runs it on one, so a job can render while
+its last outputs are still being written.
+"""
+import os
+import threading
+import time
+
+PLOTS_DIR = 'plots'
+MAX_CLASS_PLOTS = 16  # per-class confidence panels, most frequent classes first
+
+
+def _new_figure(figsize=(10, 6)):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def _confidence_axes(ax, edges, hist):
+    ax.bar(edges[:-1], hist, width=edges[1] - edges[0], align='edge', edgecolor='black')
+    ax.set_xlim(0, 1)
+
+
+def save_plots(stats, results_dir):
+    """Write the distribution plots into ``<results_dir>/plots``; returns the files written."""
+    plots_dir = os.path.join(results_dir, PLOTS_DIR)
+    os.makedirs(plots_dir, exist_ok=True)
+    if not stats.detections:
+        return []
+
+    import numpy as np
+
+    files = []
+
+    def save(figure, name):
+        path = os.path.join(plots_dir, name)
+        figure.savefig(path)
+        files.append(path)
+
+    # Confidence distribution
+    edges = stats.conf_bin_edges()
+    figure = _new_figure()
+    ax = figure.add_subplot()
+    _confidence_axes(ax, edges, stats.conf_hist)
+    ax.set_title('Detection Confidence Distribution')
+    ax.set_xlabel('Confidence Score')
+    ax.set_ylabel('Count')
+    save(figure, 'confidence_distribution.png')
+
+    # Class distribution
+    distribution = stats.class_distribution()
+    class_names, class_counts = zip(*distribution)
+    figure = _new_figure()
+    ax = figure.add_subplot()
+    ax.bar(class_names, class_counts)
+    ax.set_title('Detected Classes Distribution')
+    ax.set_xlabel('Class')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=45)
+    figure.tight_layout()
+    save(figure, 'class_distribution.png')
+
+    # Detections per image
+    counts = stats.per_image_counts
+    figure = _new_figure()
+    ax = figure.add_subplot()
+    ax.bar(np.arange(len(counts)), counts, width=1.0, edgecolor='black' if len(counts) <= 50 else None)
+    ax.set_title('Detections per Image')
+    ax.set_xlabel('Detections in image')
+    ax.set_ylabel('Images')
+    save(figure, 'detections_per_image.png')
+
+    # Confidence distribution of each of the most frequent classes
+    order = [int(i) for i in np.argsort(-stats.class_counts, kind='stable')[:MAX_CLASS_PLOTS]
+             if stats.class_counts[i]]
+    columns = min(4, len(order))
+    rows = -(-len(order) // columns)
+    figure = _new_figure(figsize=(3.5 * columns, 2.8 * rows))
+    for position, cls_id in enumerate(order, start=1):
+        ax = figure.add_subplot(rows, columns, position)
+        _confidence_axes(ax, edges, stats.class_conf_hist[cls_id])
+        ax.set_title(f"{stats.names.get(cls_id, str(cls_id))} ({int(stats.class_counts[cls_id])})", fontsize=10)
+        ax.tick_params(labelsize=8)
+    figure.suptitle('Confidence by Class')
+    figure.tight_layout()
+    save(figure, 'class_confidence.png')
+    return files
+
+
+class PlotRenderer(threading.Thread):
+    """Renders ``save_plots`` on its own thread; check ``files``/``error`` after ``join()``."""
+
+    def __init__(self, stats, results_dir):
+        super().__init__(name='plots', daemon=True)
+        self.stats = stats
+        self.results_dir = results_dir
+        self.plots_dir = os.path.join(results_dir, PLOTS_DIR)
+        self.files = []
+        self.error = None
+        self.started_at = None
+        self.seconds = 0.0
+
+    def run(self):
+        self.started_at = time.perf_counter()
+        try:
+            self.files = save_plots(self.stats, self.results_dir)
+        except Exception as e:
+            self.error = e
+        self.seconds = time.perf_counter() - self.started_at
@@ -0,0 +1,181 @@
+"""Parallel image decoding ahead of inference.
+
+A producer thread submits decodes to a small thread pool (OpenCV releases the
+GIL while decoding) and groups the decoded images, in their original order,
+into batches on a bounded queue. The model consumes whole batches while the
+next ones are being decoded, so decode time overlaps inference time instead
+of adding to it. Memory stays bounded by the queue and the decode window.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BATCH_SIZE = 4
+DEFAULT_QUEUE_BATCHES = 4
+_DONE = object()
+
+
+def default_decode_workers():
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+def read_image(path):
+    import numpy as np
+
+    return np.fromfile(path, dtype=np.uint8)
+
+
+def decode_buffer(data):
+    import cv2
+
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+def decode_image(path):
+    """Decode to a BGR array like ``cv2.imread``, but also for non-ASCII paths on Windows."""
+    return decode_buffer(read_image(path))
+
+
+class Prefetcher:
+    """Iterate over ``(paths, images)`` batches decoded in the background.
+
+    Images that fail to decode come back as ``None`` so the caller can report
+    them; order always matches ``paths``. Per-image read and decode times are
+    kept for ``stage_ms`` and, with a ``StageTimings``, traced.
+    """
+
+    def __init__(self, paths, batch_size=DEFAULT_BATCH_SIZE, workers=None,
+                 max_batches=DEFAULT_QUEUE_BATCHES, decode=decode_image, timings=None):
+        self.paths = paths
+        self.batch_size = max(1, batch_size)
+        self.workers = workers or default_decode_workers()
+        self.decode = decode
+        self.timings = timings
+        self._stage_ms = {}  # path -> {'read': ms, 'decode': ms}
+        self.decoded = 0
+        self.decode_time = 0.0  # summed over decode threads
+        self.wait_time = 0.0  # time the consumer spent waiting for a batch
+        self._window = self.batch_size * max_batches
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='decode')
+        self._thread = threading.Thread(target=self._produce, name='prefetch', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            start = time.perf_counter()
+            item = self._queue.get()
+            self.wait_time += time.perf_counter() - start
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self):
+        self._stop.set()
+        # Unblock a producer waiting on a full queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.is_alive():
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    def overlap(self):
+        """Fraction of decode time hidden behind inference (1.0 = fully overlapped)."""
+        if self.decode_time <= 0:
+            return 1.0
+        return max(0.0, min(1.0, 1.0 - self.wait_time / self.decode_time))
+
+    def summary(self):
+        return (f"decoded {self.decoded} images on {self.workers} threads in {self.decode_time:.1f}s of "
+                f"thread time, inference waited {self.wait_time:.1f}s for input "
+                f"({self.overlap():.0%} of decode time overlapped)")
+
+    def stage_ms(self, path):
+        """Read and decode milliseconds for an image handed out by this prefetcher."""
+        with self._lock:
+            return self._stage_ms.pop(path, {})
+
+    def _timed_decode(self, path):
+        start = time.perf_counter()
+        read_done = start
+        try:
+            if self.decode is decode_image:
+                data = read_image(path)
+                read_done = time.perf_counter()
+                image = decode_buffer(data)
+            else:
+                image = self.decode(path)
+        except Exception:
+            image = None
+        end = time.perf_counter()
+        with self._lock:
+            self.decode_time += end - start
+            self.decoded += 1
+            self._stage_ms[path] = {'read': (read_done - start) * 1000, 'decode': (end - read_done) * 1000}
+        if self.timings is not None and self.timings.tracing:
+            track = threading.current_thread().name
+            if read_done > start:
+                self.timings.span('read', track, start, read_done - start)
+            self.timings.span('decode', track, read_done, end - read_done, image=os.path.basename(path))
+        return image
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        pending = deque()
+        batch_paths, batch_images = [], []
+
+        def take_one():
+            path, future = pending.popleft()
+            batch_paths.append(path)
+            batch_images.append(future.result())
+            if len(batch_paths) == self.batch_size:
+                ok = self._put((list(batch_paths), list(batch_images)))
+                batch_paths.clear()
+                batch_images.clear()
+                return ok
+            return True
+
+        try:
+            for path in self.paths:
+                if self._stop.is_set():
+                    return
+                pending.append((path, self._pool.submit(self._timed_decode, path)))
+                # Hand over finished decodes early, block only when the window is full
+                while pending and (len(pending) >= self._window or pending[0][1].done()):
+                    if not take_one():
+                        return
+            while pending:
+                if self._stop.is_set() or not take_one():
+                    return
+            if batch_paths:
+                self._put((batch_paths, batch_images))
+        except BaseException as e:
+            self._put(e)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            self._put(_DONE)
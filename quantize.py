@@ -0,0 +1,90 @@
+"""INT8 post-training quantization for CPU inference.
+
+The model is exported to ONNX (see ``optimize``) and then statically
+quantized with onnxruntime: weights are stored as int8 per channel, and
+activation ranges are calibrated by running the float model over a sample of
+the user's own images, so the ranges match what the model will actually see.
+The box-decoding tail of the detection head stays in float, since its pixel
+coordinates don't survive 8-bit ranges.
+
+The quantized model is cached next to the other exports (backend
+``onnx_int8``) and can be compared against full precision with
+``optimize.compare_backends``.
+"""
+import os
+import re
+
+import optimize
+
+CALIBRATION_SIZE = 32
+PAD_VALUE = 114  # ultralytics letterbox padding
+
+
+def letterbox(image, imgsz):
+    """Resize and pad a BGR image the way ultralytics does; returns a 1x3xHxW float32 RGB tensor."""
+    import cv2
+    import numpy as np
+
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), PAD_VALUE, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    return np.ascontiguousarray(canvas[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def head_nodes_to_exclude(model):
+    """Nodes of the detection head outside its conv branches (DFL and box decoding)."""
+    prefixes = [m.group(1) for m in (re.match(r'(/model\.\d+/)', n.name) for n in model.graph.node) if m]
+    if not prefixes:
+        return []
+    head = max(prefixes, key=lambda p: int(p.split('.')[1].rstrip('/')))
+    return [n.name for n in model.graph.node if n.name.startswith(head) and not n.name.startswith(head + 'cv')]
+
+
+def quantize_model(model_path, imgsz, digest, images, progress=None):
+    """Statically quantize ``model_path`` to INT8, calibrating on ``images``; returns the artifact path."""
+    target = optimize.artifact_path(model_path, 'onnx_int8', imgsz, digest)
+    if os.path.exists(target):
+        return target
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    float_model = optimize.export_model(model_path, 'onnx', imgsz, digest)
+    if progress is not None:
+        progress(f"Calibrating INT8 ranges on {len(images)} images")
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.remaining = iter(images)
+
+        def get_next(self):
+            image = next(self.remaining, None)
+            return None if image is None else {self.input_name: letterbox(image, imgsz)}
+
+    prepared = target + '.prep.onnx'
+    partial = target + '.partial'
+    try:
+        quant_pre_process(float_model, prepared, skip_symbolic_shape=True)
+        model = onnx.load(prepared)
+        quantize_static(
+            prepared, partial, Reader(model.graph.input[0].name),
+            quant_format=QuantFormat.QDQ, per_channel=True,
+            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+            nodes_to_exclude=head_nodes_to_exclude(model),
+        )
+        # Keep the ultralytics metadata (class names, stride, imgsz) the quantizer drops
+        quantized = onnx.load(partial)
+        del quantized.metadata_props[:]
+        quantized.metadata_props.extend(onnx.load(float_model, load_external_data=False).metadata_props)
+        onnx.save(quantized, partial)
+        os.replace(partial, target)
+    finally:
+        for path in (prepared, partial):
+            if os.path.exists(path):
+                os.remove(path)
+    return target
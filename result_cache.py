@@ -0,0 +1,175 @@
+"""Persistent, content-addressed cache of detection results.
+
+Entries are keyed by (image content hash, model weights hash, predict options
+that affect detections), so re-running a model over a mostly unchanged folder
+only infers the new or modified images, no matter where the files live or
+which results directory they were written to. File hashes are memoized by
+path + mtime + size so unchanged files are not re-read just to be hashed.
+
+Everything lives in one SQLite database, bounded in size with least recently
+used entries evicted first.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from paths import CACHE_DIR
+
+CACHE_PATH = os.path.join(CACHE_DIR, 'results.sqlite')
+DEFAULT_MAX_BYTES = 1024 ** 3
+MAX_FILE_HASHES = 1000000
+ENTRY_OVERHEAD = 64  # rough per-row cost on top of the boxes blob
+COMMIT_EVERY = 200
+COMMIT_INTERVAL = 2.0
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# predict() options that change what gets detected; save/show options don't
+RELEVANT_OPTIONS = ('imgsz', 'conf', 'iou', 'classes', 'max_det', 'agnostic_nms', 'augment', 'half',
+                    'tile', 'tile_overlap')
+
+
+def options_key(options):
+    relevant = {k: options[k] for k in RELEVANT_OPTIONS if options.get(k) is not None}
+    return json.dumps(relevant, sort_keys=True)
+
+
+def entry_key(image_digest, model_digest, opts_key):
+    h = hashlib.blake2b(digest_size=16)
+    for part in (image_digest, model_digest, opts_key):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def hash_file(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed detection cache; safe to share between threads."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.RLock()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY, model TEXT NOT NULL, boxes BLOB NOT NULL,
+                height INTEGER, width INTEGER, size INTEGER, last_used REAL)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_model ON results(model)')
+            conn.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)')
+            conn.execute('''CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, digest TEXT)''')
+            self._conn = conn
+        return self._conn
+
+    def file_digest(self, path):
+        """Content hash of ``path``, reusing the stored one while the file is unchanged."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db().execute(
+                'SELECT mtime_ns, size, digest FROM file_hashes WHERE path = ?', (path,)).fetchone()
+        if row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return row[2]
+
+        digest = hash_file(path)
+        with self._lock:
+            self._db().execute('INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)',
+                               (path, stat.st_mtime_ns, stat.st_size, digest))
+            self._maybe_commit()
+        return digest
+
+    def get(self, key, path):
+        """Return cached ``Detections`` for ``key``, or None on a miss."""
+        from detections import Detections
+
+        with self._lock:
+            db = self._db()
+            row = db.execute('SELECT boxes, height, width FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+            self._maybe_commit()
+        return Detections.from_bytes(path, row[0], (row[1], row[2]))
+
+    def put(self, key, model_digest, detections):
+        blob = detections.to_bytes()
+        height, width = detections.orig_shape[:2]
+        with self._lock:
+            self._db().execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (key, model_digest, blob, height, width,
+                                len(blob) + ENTRY_OVERHEAD, time.time()))
+            self._maybe_commit()
+
+    def invalidate_model(self, model_path):
+        """Drop every cached result produced by the weights at ``model_path``."""
+        model_digest = self.file_digest(model_path)
+        with self._lock:
+            db = self._db()
+            removed = db.execute('DELETE FROM results WHERE model = ?', (model_digest,)).rowcount
+            db.commit()
+            self._uncommitted = 0
+        return removed
+
+    def flush(self):
+        """Commit pending writes and evict entries beyond the size bound."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._evict()
+            self._conn.commit()
+            self._uncommitted = 0
+            self._last_commit = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self.flush()
+                self._conn.close()
+                self._conn = None
+
+    def _maybe_commit(self):
+        # Committing per image would cost an fsync each time; batch instead
+        self._uncommitted += 1
+        now = time.monotonic()
+        if self._uncommitted >= COMMIT_EVERY or now - self._last_commit >= COMMIT_INTERVAL:
+            self._conn.commit()
+            self._uncommitted = 0
+            self._last_commit = now
+
+    def _evict(self):
+        db = self._conn
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total > self.max_bytes:
+            # Evict down to 90% so we don't end up evicting on every flush
+            to_free = total - int(self.max_bytes * 0.9)
+            victims = []
+            for key, size in db.execute('SELECT key, size FROM results ORDER BY last_used'):
+                victims.append((key,))
+                to_free -= size
+                if to_free <= 0:
+                    break
+            db.executemany('DELETE FROM results WHERE key = ?', victims)
+
+        hashes = db.execute('SELECT COUNT(*) FROM file_hashes').fetchone()[0]
+        if hashes > MAX_FILE_HASHES:
+            db.execute('DELETE FROM file_hashes WHERE rowid IN '
+                       '(SELECT rowid FROM file_hashes ORDER BY rowid LIMIT ?)',
+                       (hashes - MAX_FILE_HASHES,))
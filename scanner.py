@@ -0,0 +1,152 @@
+"""Single-pass folder scanner with a persistent per-directory index.
+
+The folder is walked once with ``os.scandir``, extensions are matched
+case-insensitively and matches are yielded in chunks so the caller can show
+them while the walk is still running. Each directory's listing is cached
+keyed by the directory's mtime, which only changes when entries are added,
+removed or renamed; rescanning a known dataset therefore costs one ``stat``
+per directory instead of a full listing.
+"""
+import json
+import os
+import time
+
+from paths import CACHE_DIR
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.wmv', '.mpg', '.mpeg', '.webm')
+MEDIA_EXTENSIONS = IMAGE_EXTENSIONS + VIDEO_EXTENSIONS
+INDEX_PATH = os.path.join(CACHE_DIR, 'dir_index.json')
+INDEX_VERSION = 1
+MAX_INDEXED_DIRS = 200000
+# Directories modified this recently may still change within the same mtime tick
+MTIME_SETTLE_SECONDS = 2.0
+
+
+class DirectoryIndex:
+    """Directory listings cached on disk, keyed by directory mtime."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._dirs = None  # dir -> [mtime_ns, last_used, files, subdirs]
+        self._dirty = False
+
+    def _load(self):
+        if self._dirs is not None:
+            return
+        self._dirs = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self._dirs = data['dirs']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def lookup(self, directory, mtime_ns):
+        """Return ``(files, subdirs)`` if the cached listing is still valid."""
+        self._load()
+        entry = self._dirs.get(directory)
+        if entry is None or entry[0] != mtime_ns:
+            return None
+        entry[1] = time.time()
+        self._dirty = True
+        return entry[2], entry[3]
+
+    def store(self, directory, mtime_ns, files, subdirs):
+        self._load()
+        if time.time() - mtime_ns / 1e9 < MTIME_SETTLE_SECONDS:
+            self._dirs.pop(directory, None)
+            return
+        self._dirs[directory] = [mtime_ns, time.time(), files, subdirs]
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        if len(self._dirs) > MAX_INDEXED_DIRS:
+            # Forget the directories that haven't been scanned for the longest
+            keep = sorted(self._dirs.items(), key=lambda item: item[1][1], reverse=True)
+            self._dirs = dict(keep[:MAX_INDEXED_DIRS])
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'dirs': self._dirs}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+class ScanStats:
+    def __init__(self):
+        self.files = 0
+        self.dirs_listed = 0
+        self.dirs_cached = 0
+        self.errors = 0
+
+
+def _list_directory(directory):
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+    files.sort()
+    subdirs.sort()
+    return files, subdirs
+
+
+def scan_folder(root, extensions=IMAGE_EXTENSIONS, index=None, cancel_event=None,
+                stats=None, chunk_size=500, chunk_interval=0.25):
+    """Walk ``root`` once, yielding lists of matching file paths.
+
+    A chunk is yielded when ``chunk_size`` paths have accumulated or
+    ``chunk_interval`` seconds have passed, so slow network shares still show
+    progress. Stops early when ``cancel_event`` is set.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    stats = stats if stats is not None else ScanStats()
+    chunk = []
+    last_yield = time.perf_counter()
+    stack = [root]
+
+    while stack:
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        directory = stack.pop()
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            cached = index.lookup(directory, mtime_ns) if index is not None else None
+            if cached is not None:
+                files, subdirs = cached
+                stats.dirs_cached += 1
+            else:
+                files, subdirs = _list_directory(directory)
+                stats.dirs_listed += 1
+                if index is not None:
+                    index.store(directory, mtime_ns, files, subdirs)
+        except OSError:
+            stats.errors += 1
+            continue
+
+        for name in files:
+            if name.lower().endswith(extensions):
+                chunk.append(os.path.join(directory, name))
+        # Reversed so directories are visited in sorted order
+        stack.extend(os.path.join(directory, name) for name in reversed(subdirs))
+
+        now = time.perf_counter()
+        if len(chunk) >= chunk_size or (chunk and now - last_yield >= chunk_interval):
+            stats.files += len(chunk)
+            yield chunk
+            chunk = []
+            last_yield = now
+
+    if chunk:
+        stats.files += len(chunk)
+        yield chunk
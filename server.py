@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Local inference server with dynamic micro-batching.
+
+Keeps one model warm and serves detections over HTTP on localhost (or a Unix
+socket), so other tools on the machine don't each spawn Python and load the
+weights. Requests are queued and grouped into micro-batches: a batch is run
+as soon as ``max_batch`` images are waiting or the oldest one has waited
+``max_wait_ms``, which trades a few milliseconds of latency for the
+throughput of batched inference under load.
+
+    POST /detect   body: encoded image bytes, or JSON {"path": "/abs/image.jpg"}
+    GET  /health   model, batching policy and counters
+
+The JSON form makes the server read a file itself, so it is only accepted
+from loopback or Unix socket listeners, or for files under ``--root``.
+
+Responses are JSON; see ``MicroBatcher.detect`` for the detection format.
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from model_cache import ModelCache
+from optimize import artifact_imgsz
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 8
+DEFAULT_MAX_WAIT_MS = 10.0
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+
+class _Request:
+    __slots__ = ('image', 'enqueued', 'done', 'result', 'error', 'batch_size', 'inference_ms')
+
+    def __init__(self, image):
+        self.image = image
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.batch_size = 0
+        self.inference_ms = 0.0
+
+
+class MicroBatcher:
+    """Groups concurrent requests into batches for a single model."""
+
+    def __init__(self, model, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, predict_options=None):
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.predict_options = predict_options or {}
+        self.requests_served = 0
+        self.batches_run = 0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def detect(self, image, timeout=None):
+        """Queue one BGR image and wait for its detections.
+
+        Returns ``{"detections": [{"class_id", "class_name", "conf", "xyxy"}, ...],
+        "image_size": [h, w], "timings": {...}}``.
+        """
+        request = _Request(image)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for inference")
+        if request.error is not None:
+            raise request.error
+        detections = request.result
+        names = self.model.names
+        cls_ids = detections.cls.tolist()
+        return {
+            "detections": [
+                {"class_id": c, "class_name": names.get(c, str(c)), "conf": round(conf, 4),
+                 "xyxy": [round(v, 1) for v in box]}
+                for c, conf, box in zip(cls_ids, detections.conf.tolist(), detections.xyxy.tolist())
+            ],
+            "image_size": list(detections.orig_shape),
+            "timings": {
+                "queue_ms": round((time.perf_counter() - request.enqueued) * 1000 - request.inference_ms, 2),
+                "inference_ms": round(request.inference_ms, 2),
+                "batch_size": request.batch_size,
+            },
+        }
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = first.enqueued + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Still take whatever is already waiting, without blocking
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        from detections import Detections
+
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                results = self.model.predict(source=[r.image for r in batch], verbose=False, **self.predict_options)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                for request, result in zip(batch, results):
+                    request.result = Detections.from_result(result, path='')
+                    request.batch_size = len(batch)
+                    request.inference_ms = elapsed_ms
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            self.batches_run += 1
+            self.requests_served += len(batch)
+            for request in batch:
+                request.image = None
+                request.done.set()
+
+
+def is_loopback(host):
+    import ipaddress
+
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def decode_bytes(data):
+    import cv2
+    import numpy as np
+
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+class DetectionHandler(BaseHTTPRequestHandler):
+    server_version = 'ModelGUI'
+    protocol_version = 'HTTP/1.1'  # keep-alive, so clients don't pay a connect per request
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def allowed_path(self, path):
+        """``path`` if this server may read it for a client, else None."""
+        root = self.server.path_root
+        if root is None:
+            return path if self.server.local_only else None
+        path = os.path.realpath(os.path.join(root, path))
+        try:
+            return path if os.path.commonpath([root, path]) == root else None
+        except ValueError:  # different drives
+            return None
+
+    def do_GET(self):
+        if self.path.rstrip('/') != '/health':
+            self._send_json(404, {"error": "not found"})
+            return
+        batcher = self.server.batcher
+        self._send_json(200, {
+            "model": self.server.model_path,
+            "max_batch": batcher.max_batch,
+            "max_wait_ms": batcher.max_wait * 1000,
+            "pending": batcher.pending(),
+            "requests_served": batcher.requests_served,
+            "batches_run": batcher.batches_run,
+        })
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/detect':
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._send_json(400, {"error": "missing or oversized request body"})
+            return
+        body = self.rfile.read(length)
+        try:
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                path = self.allowed_path(json.loads(body)['path'])
+                if path is None:
+                    self._send_json(403, {"error": "reading images by path is only allowed on a loopback or "
+                                                   "Unix socket listener, or under the server's --root"})
+                    return
+                with open(path, 'rb') as f:
+                    body = f.read()
+            image = decode_bytes(body)
+        except (OSError, ValueError, KeyError) as e:
+            self._send_json(400, {"error": f"could not read image: {e}"})
+            return
+        if image is None:
+            self._send_json(400, {"error": "could not decode image"})
+            return
+        try:
+            self._send_json(200, self.server.batcher.detect(image, timeout=self.server.request_timeout))
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(batcher, model_path, host='127.0.0.1', port=DEFAULT_PORT, unix_socket=None,
+                request_timeout=60.0, verbose=False, path_root=None):
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, DetectionHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), DetectionHandler)
+        server.daemon_threads = True
+    server.batcher = batcher
+    server.model_path = model_path
+    server.request_timeout = request_timeout
+    server.verbose = verbose
+    # Clients on other machines must not be able to read arbitrary local files
+    server.local_only = bool(unix_socket) or is_loopback(host)
+    server.path_root = os.path.realpath(path_root) if path_root else None
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve detections from a warm YOLO model on this machine.")
+    parser.add_argument('model', help="Path to the model weights")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind (default: localhost only)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', dest='unix_socket', help="Listen on this Unix socket instead of TCP")
+    parser.add_argument('--root', help="Only read images by path from under this folder (needed to accept "
+                                       "paths when --host isn't a loopback address)")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="Largest micro-batch")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="Longest time the first request of a batch waits for company")
+    parser.add_argument('--imgsz', type=int, help="Inference image size")
+    parser.add_argument('--conf', type=float, help="Confidence threshold")
+    parser.add_argument('--threads', type=int, help="torch intra-op threads")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    import ml_stack
+
+    imgsz = args.imgsz or artifact_imgsz(args.model)
+    predict_options = {k: v for k, v in (('imgsz', imgsz), ('conf', args.conf)) if v is not None}
+    if args.threads:
+        ml_stack.set_torch_threads(args.threads)
+    start = time.perf_counter()
+    model = ModelCache().get(args.model)
+    print(f"Loaded {args.model} in {time.perf_counter() - start:.1f}s", flush=True)
+
+    batcher = MicroBatcher(model, args.max_batch, args.max_wait_ms, predict_options)
+    batcher.start()
+    server = make_server(batcher, os.path.abspath(args.model), args.host, args.port,
+                         args.unix_socket, verbose=args.verbose, path_root=args.root)
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Serving detections on {where} (max batch {args.max_batch}, max wait {args.max_wait_ms} ms)",
+          flush=True)
+    if server.path_root is None and not server.local_only:
+        print("Requests by path are refused on this interface; pass --root to allow a folder", flush=True)
+    # Exit through the finally block on SIGTERM too, so the Unix socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.stop()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
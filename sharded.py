@@ -0,0 +1,141 @@
+"""Multi-process sharded inference across CPU cores.
+
+One PyTorch process stops scaling after a handful of threads, so for large
+machines the image list is cut into shards and handed to a pool of worker
+processes. Each worker loads the model once, decodes, infers and writes the
+outputs for its shards, and sends back only the lightweight ``Detections``.
+Shards come back through ``Pool.imap``, so results are merged in the original
+order however the shards finish. Thread counts are split so that
+``processes x threads`` never exceeds the core count.
+"""
+import multiprocessing
+import os
+import time
+
+# Per-process state, set up by _init_worker
+_model = None
+_model_path = None
+_options = None
+_results_dir = None
+_batch_size = 1
+_threads = 1
+_packer = None
+
+
+def plan_threads(processes, cpu_count=None):
+    """Intra-op threads per worker so the pool doesn't oversubscribe the cores."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(1, cpu_count // max(1, processes))
+
+
+def _init_worker(model_path, options, results_dir, batch_size, threads):
+    # Only remember the arguments: an exception in a Pool initializer makes the
+    # pool respawn the worker forever, so the model is loaded by the first shard
+    global _model_path, _options, _results_dir, _batch_size, _threads
+    _model_path = model_path
+    _options = options
+    _results_dir = results_dir
+    _batch_size = batch_size
+    _threads = threads
+
+
+def _get_model():
+    global _model
+    if _model is None:
+        import ml_stack
+        from model_cache import warmup_model
+
+        ml_stack.set_torch_threads(_threads, 1)
+        _model = ml_stack.get_yolo()(_model_path)
+        warmup_model(_model, _options.get('imgsz', 640))
+    return _model
+
+
+def _get_packer():
+    # One set of shards per worker process; they stay valid tars between
+    # appends, so nothing needs closing when the pool shuts down
+    global _packer
+    if _packer is None and _options.get('pack'):
+        from shards import PACKED_DIR, ShardWriter
+
+        _packer = ShardWriter(os.path.join(_results_dir, PACKED_DIR), prefix=f"shard-p{os.getpid()}")
+    return _packer
+
+
+def _run_shard(paths):
+    """Infer one shard; returns ``[(path, Detections or None), ...]`` in input order."""
+    from detections import Detections
+    from outputs import save_result, saves_anything
+    from pipeline import predict_options
+    from prefetch import decode_buffer, read_image
+
+    model = _get_model()
+    saving = saves_anything(_options)
+    packer = _get_packer()
+    options = predict_options(_options)
+
+    found = {}
+    readable = []
+    stage_ms = {}
+    for path in paths:
+        start = time.perf_counter()
+        read_done = start
+        try:
+            data = read_image(path)
+            read_done = time.perf_counter()
+            image = decode_buffer(data)
+        except Exception:
+            image = None
+        stage_ms[path] = {'read': (read_done - start) * 1000, 'decode': (time.perf_counter() - read_done) * 1000}
+        if image is None:
+            found[path] = None
+        else:
+            readable.append((path, image))
+
+    for start in range(0, len(readable), _batch_size):
+        batch = readable[start:start + _batch_size]
+        results = model.predict(source=[image for _, image in batch], verbose=False, **options)
+        for (path, _), r in zip(batch, results):
+            detections = Detections.from_result(r, path=path)
+            detections.speed.update(stage_ms[path])
+            if saving:
+                start = time.perf_counter()
+                save_result(r, _results_dir, _options, name=os.path.basename(path), packer=packer)
+                detections.speed['write'] = (time.perf_counter() - start) * 1000
+            found[path] = detections
+    return [(path, found[path]) for path in paths]
+
+
+class ShardedInference:
+    """Runs a model over a list of paths in ``processes`` worker processes."""
+
+    def __init__(self, model_path, options, results_dir, processes, batch_size=4, shard_size=None):
+        self.model_path = os.path.abspath(model_path)
+        self.options = options
+        self.results_dir = os.path.abspath(results_dir)
+        self.processes = processes
+        self.batch_size = max(1, batch_size)
+        # Small shards keep progress smooth and the tail of the run balanced
+        self.shard_size = shard_size or self.batch_size * 2
+        self.threads = plan_threads(processes)
+
+    def run(self, paths):
+        """Yield ``(path, Detections or None)`` in the order of ``paths``.
+
+        Closing the generator early terminates the workers.
+        """
+        # spawn, not fork: forking a process that already has torch threads running is unsafe
+        context = multiprocessing.get_context('spawn')
+        pool = context.Pool(
+            self.processes,
+            initializer=_init_worker,
+            initargs=(self.model_path, self.options, self.results_dir, self.batch_size, self.threads),
+        )
+        try:
+            shards = [paths[i:i + self.shard_size] for i in range(0, len(paths), self.shard_size)]
+            for shard in pool.imap(_run_shard, shards):
+                yield from shard
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
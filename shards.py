@@ -0,0 +1,178 @@
+"""Packed outputs: crops and labels in a few large tar shards.
+
+Instead of one file per label and per crop, ``ShardWriter`` appends them to
+``<prefix>-00000.tar``, ``<prefix>-00001.tar``, ... (a new shard every
+``max_bytes``) under the same member names the unpacked layout uses
+(``labels/<stem>.txt``, ``crops/<class>/<stem>_<n>.jpg``). The end-of-archive
+marker is rewritten after every member, so each shard is a valid tar at any
+moment, even if the run is killed, and can be streamed sequentially with
+``tar``, ``tarfile`` or webdataset-style loaders. Every member is also listed in
+``<prefix>.index.jsonl`` with its shard, byte offset and size, which is what
+``ShardReader`` uses for random access.
+
+Each writer (one per process) uses its own prefix, so worker processes never
+share a file.
+"""
+import glob
+import json
+import os
+import tarfile
+import threading
+import time
+
+PACKED_DIR = 'packed'
+DEFAULT_MAX_BYTES = 1024 ** 3
+BLOCK = tarfile.BLOCKSIZE
+END_OF_ARCHIVE = b'\0' * (2 * BLOCK)
+
+
+def _header(name, size, mtime=None):
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mtime = int(time.time()) if mtime is None else mtime
+    info.mode = 0o644
+    return info.tobuf(format=tarfile.GNU_FORMAT)
+
+
+def _read_index(path):
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # a line cut short by a crash
+    return entries
+
+
+def drop_members(directory, drop):
+    """Rewrite the shards in ``directory`` without the members whose name ``drop(name)`` is true.
+
+    Used before inputs of an interrupted run are redone, so they don't end
+    up in the shards twice. Only shards holding such members are rewritten,
+    from the index, so a member cut short by the crash goes too. Returns the
+    number of members dropped.
+    """
+    dropped = 0
+    for index_path in sorted(glob.glob(os.path.join(directory, '*.index.jsonl'))):
+        entries = _read_index(index_path)
+        affected = {entry['shard'] for entry in entries if drop(entry['name'])}
+        if not affected:
+            continue
+        offsets = {}  # position in entries -> offset in the rewritten shard
+        for shard in sorted(affected):
+            path = os.path.join(directory, shard)
+            with open(path, 'rb') as source, open(path + '.tmp', 'wb') as target:
+                end = 0
+                for i, entry in enumerate(entries):
+                    if entry['shard'] != shard:
+                        continue
+                    if drop(entry['name']):
+                        dropped += 1
+                        continue
+                    source.seek(entry['offset'])
+                    data = source.read(entry['size'])
+                    header = _header(entry['name'], len(data))
+                    padding = (-len(data)) % BLOCK
+                    target.write(header + data + b'\0' * padding)
+                    offsets[i] = end + len(header)
+                    end += len(header) + len(data) + padding
+                target.write(END_OF_ARCHIVE)
+            os.replace(path + '.tmp', path)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            for i, entry in enumerate(entries):
+                if entry['shard'] not in affected:
+                    f.write(json.dumps(entry) + "\n")
+                elif i in offsets:
+                    f.write(json.dumps(dict(entry, offset=offsets[i])) + "\n")
+        os.replace(index_path + '.tmp', index_path)
+    return dropped
+
+
+class ShardWriter:
+    """Appends members to size-bounded tar shards; safe to share between threads."""
+
+    def __init__(self, directory, prefix='shard', max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.members = 0
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        # Continue after shards already there (a resumed run) rather than overwrite them
+        existing = glob.glob(os.path.join(directory, glob.escape(prefix) + '-[0-9][0-9][0-9][0-9][0-9].tar'))
+        self._shard = max((int(path[-9:-4]) for path in existing), default=-1)
+        self._file = None
+        self._end = 0  # where the next header goes (start of the end-of-archive marker)
+        os.makedirs(directory, exist_ok=True)
+        self._index = open(os.path.join(directory, f"{prefix}.index.jsonl"), 'a', encoding='utf-8')
+
+    def _shard_name(self, number):
+        return f"{self.prefix}-{number:05d}.tar"
+
+    def _next_shard(self):
+        if self._file is not None:
+            self._file.close()
+        self._shard += 1
+        self._file = open(os.path.join(self.directory, self._shard_name(self._shard)), 'wb')
+        self._end = 0
+
+    def add(self, name, data):
+        """Append ``data`` (bytes) as member ``name``."""
+        header = _header(name, len(data))
+        padding = (-len(data)) % BLOCK
+        with self._lock:
+            if self._file is None or (self._end and self._end + len(header) + len(data) > self.max_bytes):
+                self._next_shard()
+            self._file.seek(self._end)
+            self._file.write(header)
+            offset = self._end + len(header)
+            self._file.write(data)
+            self._file.write(b'\0' * padding)
+            self._end = offset + len(data) + padding
+            self._file.write(END_OF_ARCHIVE)
+            self._file.flush()
+            self._index.write(json.dumps({"name": name, "shard": self._shard_name(self._shard),
+                                          "offset": offset, "size": len(data)}) + "\n")
+            self._index.flush()
+            self.members += 1
+            self.bytes_written += len(data)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._index.close()
+
+
+class ShardReader:
+    """Random and sequential access to the shards written into ``directory``."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = {}  # member name -> (shard, offset, size)
+        for path in sorted(glob.glob(os.path.join(directory, '*.index.jsonl'))):
+            for entry in _read_index(path):
+                self.index[entry["name"]] = (entry["shard"], entry["offset"], entry["size"])
+
+    def names(self, prefix=''):
+        return sorted(name for name in self.index if name.startswith(prefix))
+
+    def read(self, name):
+        """Bytes of one member, read straight from its offset."""
+        shard, offset, size = self.index[name]
+        with open(os.path.join(self.directory, shard), 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def shards(self):
+        return sorted(glob.glob(os.path.join(self.directory, '*.tar')))
+
+    def __iter__(self):
+        """Stream ``(name, bytes)`` for every member, shard by shard, in write order."""
+        for shard in self.shards():
+            with tarfile.open(shard, 'r') as tar:
+                for member in tar:
+                    if member.isfile():
+                        yield member.name, tar.extractfile(member).read()
@@ -0,0 +1,130 @@
+"""Resuming a run whose journal lists finished videos.
+
+Runs the real pipeline with a stand-in model (one box per image), so no
+weights are needed: a run over an image and two videos is cancelled during
+the second video, then resumed in the same folder without the result cache.
+The frames done before the interruption must not end up twice in the
+labels, crops, shards or exports.
+"""
+import csv
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+cv2 = pytest.importorskip('cv2')
+np = pytest.importorskip('numpy')
+torch = pytest.importorskip('torch')
+pytest.importorskip('ultralytics')
+
+from journal import read_journal  # noqa: E402
+from pipeline import DetectionJob, build_options, resume_arguments  # noqa: E402
+from shards import PACKED_DIR, ShardReader  # noqa: E402
+from timings import TIMINGS_FILE  # noqa: E402
+
+FRAMES = 6
+
+
+class FakeModel:
+    names = {0: 'thing'}
+
+    def predict(self, source, verbose=False, **options):
+        from ultralytics.engine.results import Results
+
+        results = []
+        for image in source:
+            r = Results(image, path='', names=self.names, boxes=torch.tensor([[2.0, 2.0, 20.0, 20.0, 0.9, 0.0]]))
+            r.speed = {'preprocess': 0.1, 'inference': 0.1, 'postprocess': 0.1}
+            results.append(r)
+        return results
+
+
+class FakeModelCache:
+    def __init__(self):
+        self.model = FakeModel()
+
+    def is_loaded(self, path):
+        return True
+
+    def get(self, path):
+        return self.model
+
+
+def write_video(path):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for i in range(FRAMES):
+        writer.write(np.full((48, 64, 3), i * 30, np.uint8))
+    writer.release()
+
+
+def export_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def run_interrupted(tmp_path, pack=False):
+    """Run over an image and two videos, cancelled during the second video; returns the results folder."""
+    weights = tmp_path / 'fake.pt'
+    weights.write_bytes(b'weights')
+    image = str(tmp_path / 'image.jpg')
+    cv2.imwrite(image, np.zeros((48, 64, 3), np.uint8))
+    for name in ('first.avi', 'second.avi'):
+        write_video(str(tmp_path / name))
+    results_dir = str(tmp_path / 'results')
+    os.makedirs(results_dir)
+
+    def cancel_in_second_video(done, total, rate, eta):
+        if done == 1 + FRAMES + 2:
+            job.cancel()
+
+    inputs = [image, str(tmp_path / 'first.avi'), str(tmp_path / 'second.avi')]
+    job = DetectionJob(FakeModelCache(), str(weights), inputs,
+                       build_options(results_dir, save_crop=True, pack=pack), results_dir, export_format='csv',
+                       batch_size=1, writer_threads=0, on_progress=cancel_in_second_video)
+    job.run()
+    return results_dir, inputs
+
+
+def test_resume_after_finished_video(tmp_path):
+    results_dir, (image, first_video, second_video) = run_interrupted(tmp_path)
+    state = read_journal(results_dir)
+    assert not state.finished
+    assert state.completed == {image, first_video}
+    first_timings = export_rows(os.path.join(results_dir, TIMINGS_FILE))
+
+    resumed = DetectionJob(FakeModelCache(), batch_size=1, writer_threads=0, **resume_arguments(results_dir))
+    stats = resumed.run()
+
+    # The finished image and video aren't redone and can't be restored, so both count as skipped
+    assert resumed.skipped == 2
+    assert stats.images == FRAMES
+    assert read_journal(results_dir).finished
+    # The first export keeps only the finished inputs; the resumed part goes next to it
+    first_rows = export_rows(os.path.join(results_dir, 'detections.csv'))
+    assert {row['image'].partition('#')[0] for row in first_rows} == {image, first_video}
+    resumed_rows = export_rows(os.path.join(results_dir, 'detections.resume1.csv'))
+    assert len(resumed_rows) == FRAMES
+    assert {row['image'] for row in first_rows}.isdisjoint(row['image'] for row in resumed_rows)
+    # The frames done before the interruption are written once, not appended to
+    for frame in range(FRAMES):
+        with open(os.path.join(results_dir, 'labels', f"second_{frame:06d}.txt"), encoding='utf-8') as f:
+            assert len(f.readlines()) == 1
+    assert sorted(os.listdir(os.path.join(results_dir, 'crops', 'thing'))) == sorted(
+        ['image.jpg'] + [f"{video}_{frame:06d}.jpg" for video in ('first', 'second') for frame in range(FRAMES)])
+    # timings.csv keeps the first session's rows under a single header
+    timings = export_rows(os.path.join(results_dir, TIMINGS_FILE))
+    assert timings[:len(first_timings)] == first_timings
+    assert len(timings) == len(first_timings) + FRAMES
+
+
+def test_resume_packed(tmp_path):
+    results_dir, _ = run_interrupted(tmp_path, pack=True)
+    DetectionJob(FakeModelCache(), batch_size=1, writer_threads=0, **resume_arguments(results_dir)).run()
+
+    reader = ShardReader(os.path.join(results_dir, PACKED_DIR))
+    members = [name for name, _ in reader]
+    assert len(members) == len(set(members)) == 2 * (1 + 2 * FRAMES)
+    assert reader.read('labels/second_000000.txt').count(b'\n') == 1
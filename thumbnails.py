@@ -0,0 +1,240 @@
+"""Thumbnails for the file list, made in the background and cached on disk.
+
+``ThumbnailLoader`` takes requests from the list model, which only asks for
+the rows being painted, and serves them on a small thread pool, newest
+request first, so the rows on screen after a fast scroll come before the
+ones scrolled past; requests beyond ``max_pending`` are dropped and asked for
+again if their rows are painted again. JPEGs are decoded at reduced size
+(PIL's ``draft`` scales in the DCT), so a thumbnail costs a fraction of a
+full decode.
+
+Thumbnails are stored in one SQLite database keyed by path + mtime + size,
+so reopening a folder shows them straight from the cache and an edited
+file gets a new one. The cache is bounded in size; least recently used
+thumbnails are evicted first.
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from paths import CACHE_DIR
+
+CACHE_PATH = os.path.join(CACHE_DIR, 'thumbnails.sqlite')
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+THUMBNAIL_SIZE = 48  # px, longest side
+JPEG_QUALITY = 85
+MAX_PENDING = 512
+COMMIT_EVERY = 200
+COMMIT_INTERVAL = 2.0
+EVICT_EVERY = 2000  # thumbnails added between size checks
+
+
+def thumbnail_key(path, stat, size=THUMBNAIL_SIZE):
+    h = hashlib.blake2b(digest_size=16)
+    for part in (os.path.abspath(path), str(stat.st_mtime_ns), str(stat.st_size), str(size)):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def make_thumbnail(path, size=THUMBNAIL_SIZE):
+    """JPEG bytes of ``path`` scaled to fit ``size`` x ``size``."""
+    from video import is_video
+
+    if is_video(path):
+        import cv2
+
+        capture = cv2.VideoCapture(path)
+        try:
+            ok, frame = capture.read()
+        finally:
+            capture.release()
+        if not ok:
+            raise ValueError(f"Could not read {path}")
+        scale = size / max(frame.shape[:2])
+        frame = cv2.resize(frame, (max(1, round(frame.shape[1] * scale)), max(1, round(frame.shape[0] * scale))),
+                           interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        return encoded.tobytes()
+
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.draft('RGB', (size, size))  # JPEG: decode at 1/2, 1/4 or 1/8 scale
+        image.thumbnail((size, size))
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+class ThumbnailCache:
+    """SQLite-backed thumbnail store; safe to share between threads."""
+
+    def __init__(self, path=CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._added = 0
+        self._last_commit = time.monotonic()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''CREATE TABLE IF NOT EXISTS thumbnails (
+                key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER, last_used REAL)''')
+            conn.execute('CREATE INDEX IF NOT EXISTS thumbnails_last_used ON thumbnails(last_used)')
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            db = self._db()
+            row = db.execute('SELECT data FROM thumbnails WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            db.execute('UPDATE thumbnails SET last_used = ? WHERE key = ?', (time.time(), key))
+            self._maybe_commit()
+        return row[0]
+
+    def put(self, key, data):
+        with self._lock:
+            self._db().execute('INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?)',
+                               (key, data, len(data), time.time()))
+            self._added += 1
+            if self._added % EVICT_EVERY == 0:
+                self._evict()
+            self._maybe_commit()
+
+    def flush(self):
+        """Commit pending writes and evict thumbnails beyond the size bound."""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._evict()
+            self._conn.commit()
+            self._uncommitted = 0
+            self._last_commit = time.monotonic()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        now = time.monotonic()
+        if self._uncommitted >= COMMIT_EVERY or now - self._last_commit >= COMMIT_INTERVAL:
+            self._conn.commit()
+            self._uncommitted = 0
+            self._last_commit = now
+
+    def _evict(self):
+        db = self._conn
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM thumbnails').fetchone()[0]
+        if total > self.max_bytes:
+            # Evict down to 90% so we don't end up evicting on every check
+            to_free = total - int(self.max_bytes * 0.9)
+            victims = []
+            for key, size in db.execute('SELECT key, size FROM thumbnails ORDER BY last_used'):
+                victims.append((key,))
+                to_free -= size
+                if to_free <= 0:
+                    break
+            db.executemany('DELETE FROM thumbnails WHERE key = ?', victims)
+
+
+def default_thumbnail_workers():
+    return max(2, min(4, (os.cpu_count() or 2) // 2))
+
+
+class ThumbnailLoader:
+    """Serves thumbnail requests on background threads, newest first.
+
+    ``on_ready(path, data)`` is called from a worker thread with the JPEG
+    bytes, or None if the file couldn't be read.
+    """
+
+    def __init__(self, on_ready, cache=None, size=THUMBNAIL_SIZE, workers=None, max_pending=MAX_PENDING):
+        self.on_ready = on_ready
+        self.cache = cache if cache is not None else ThumbnailCache()
+        self.size = size
+        self.max_pending = max_pending
+        self.hits = 0
+        self.generated = 0
+        self.failed = 0
+        self._pending = deque()  # newest on the left
+        self._queued = set()  # pending or being made
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._workers = [threading.Thread(target=self._work, name=f'thumbnail-{i}', daemon=True)
+                         for i in range(workers or default_thumbnail_workers())]
+        for worker in self._workers:
+            worker.start()
+
+    def request(self, path):
+        with self._condition:
+            if path in self._queued or self._stopped:
+                return
+            self._queued.add(path)
+            self._pending.appendleft(path)
+            if len(self._pending) > self.max_pending:
+                # Scrolled past long ago; asked for again if the row is painted again
+                self._queued.discard(self._pending.pop())
+            self._condition.notify()
+
+    def clear(self):
+        """Forget pending requests, e.g. when the list is cleared."""
+        with self._condition:
+            for path in self._pending:
+                self._queued.discard(path)
+            self._pending.clear()
+
+    def close(self):
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self.cache.close()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                path = self._pending.popleft()
+            data = self._load(path)
+            with self._condition:
+                self._queued.discard(path)
+                if self._stopped:
+                    return
+            self.on_ready(path, data)
+
+    def _load(self, path):
+        try:
+            key = thumbnail_key(path, os.stat(path), self.size)
+            data = self.cache.get(key)
+            if data is not None:
+                self.hits += 1
+                return data
+            data = make_thumbnail(path, self.size)
+            self.cache.put(key, data)
+            self.generated += 1
+            return data
+        except Exception:
+            self.failed += 1
+            return None
@@ -0,0 +1,249 @@
+"""Tiled (sliced) inference for images much larger than the model input.
+
+A 10k x 10k aerial or microscopy image passed to ``model.predict`` is shrunk
+to the model's input size and small objects disappear. In tiled mode the
+image is cut into overlapping ``tile`` x ``tile`` windows, the windows are
+sent through the model ``batch_size`` at a time at full resolution, and the
+boxes are shifted back into image coordinates and merged across tiles.
+
+Windows are read lazily where the file format allows it: uncompressed BMP,
+and uncompressed TIFF when ``tifffile`` is installed, are memory-mapped, so
+only the rows of the tiles being inferred are touched and inference memory
+scales with the tile batch rather than the image. Other formats (JPEG, PNG,
+compressed TIFF) can't be decoded partially and are decoded once in full.
+Outputs are written the same way (``outputs.save_tiled``): crops are read as
+windows around their boxes and the annotated image is a downscaled preview
+read in strips.
+
+Merging is class-aware greedy NMS measured as intersection over the smaller
+box: an object cut by a tile edge shows up as a fragment in one tile and
+whole in the overlapping one, and the fragment is absorbed by the whole box.
+"""
+import os
+import time
+
+DEFAULT_TILE = 640
+DEFAULT_OVERLAP = 0.2  # fraction of the tile shared with the neighbouring tile
+MERGE_THRESHOLD = 0.5  # intersection over the smaller box above which boxes merge
+TILE_OPTIONS = ('tile', 'tile_overlap')  # run options handled here rather than by ultralytics
+PREVIEW_SIZE = 4096  # longest side of the annotated image saved for a tiled image
+PREVIEW_BAND = 256  # preview rows made per read
+CROP_GAIN = 1.02  # the margin ultralytics' save_one_box adds around a crop
+CROP_PAD = 10
+
+
+def _starts(length, tile, stride):
+    if length <= tile:
+        return [0]
+    return list(range(0, length - tile, stride)) + [length - tile]
+
+
+def tile_windows(width, height, tile, overlap=DEFAULT_OVERLAP):
+    """``[(x0, y0, x1, y1), ...]`` covering the image, the last row/column flush with the edges."""
+    stride = max(1, tile - int(tile * overlap))
+    return [(x, y, min(x + tile, width), min(y + tile, height))
+            for y in _starts(height, tile, stride) for x in _starts(width, tile, stride)]
+
+
+class DecodedSource:
+    """Formats without random access: the whole image is decoded once."""
+    windowed = False
+
+    def __init__(self, path):
+        from prefetch import decode_image
+
+        self.image = decode_image(path)
+        if self.image is None:
+            raise ValueError(f"Could not read {path}")
+        self.height, self.width = self.image.shape[:2]
+
+    def read(self, x0, y0, x1, y1):
+        return self.image[y0:y1, x0:x1]
+
+    def full(self):
+        return self.image
+
+    def close(self):
+        self.image = None
+
+
+class BmpSource:
+    """Uncompressed 24/32-bit BMP, memory-mapped; pixels are already BGR."""
+    windowed = True
+
+    def __init__(self, path):
+        import numpy as np
+
+        with open(path, 'rb') as f:
+            header = f.read(34)
+        if len(header) < 34 or header[:2] != b'BM':
+            raise ValueError("not a BMP file")
+        offset = int.from_bytes(header[10:14], 'little')
+        width = int.from_bytes(header[18:22], 'little', signed=True)
+        height = int.from_bytes(header[22:26], 'little', signed=True)
+        bpp = int.from_bytes(header[28:30], 'little')
+        compression = int.from_bytes(header[30:34], 'little')
+        if compression != 0 or bpp not in (24, 32) or width <= 0 or height == 0:
+            raise ValueError("compressed or palette BMP")
+        self.width = width
+        self.height = abs(height)
+        self.bottom_up = height > 0
+        self.channels = bpp // 8
+        row_bytes = (bpp * width + 31) // 32 * 4
+        self._rows = np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(self.height, row_bytes))
+
+    def read(self, x0, y0, x1, y1):
+        import numpy as np
+
+        if self.bottom_up:
+            rows = self._rows[self.height - y1:self.height - y0][::-1]
+        else:
+            rows = self._rows[y0:y1]
+        pixels = rows[:, :self.width * self.channels].reshape(len(rows), self.width, self.channels)
+        return np.ascontiguousarray(pixels[:, x0:x1, :3])
+
+    def full(self):
+        return self.read(0, 0, self.width, self.height)
+
+    def close(self):
+        self._rows = None
+
+
+class TiffSource:
+    """Uncompressed TIFF, memory-mapped through tifffile (optional dependency)."""
+    windowed = True
+
+    def __init__(self, path):
+        import numpy as np
+        import tifffile
+
+        self._pixels = tifffile.memmap(path, mode='r')  # ValueError if compressed or tiled
+        if self._pixels.ndim == 3 and self._pixels.shape[0] in (3, 4) and self._pixels.shape[2] not in (3, 4):
+            raise ValueError("planar TIFF")
+        if self._pixels.dtype not in (np.uint8, np.uint16) or self._pixels.ndim not in (2, 3):
+            raise ValueError(f"unsupported TIFF layout {self._pixels.dtype} {self._pixels.shape}")
+        self.height, self.width = self._pixels.shape[:2]
+
+    def read(self, x0, y0, x1, y1):
+        import numpy as np
+
+        window = np.asarray(self._pixels[y0:y1, x0:x1])
+        if window.dtype == np.uint16:
+            window = (window >> 8).astype(np.uint8)
+        if window.ndim == 2:
+            return np.repeat(window[:, :, None], 3, axis=2)
+        return np.ascontiguousarray(window[:, :, 2::-1])  # RGB(A) -> BGR
+
+    def full(self):
+        return self.read(0, 0, self.width, self.height)
+
+    def close(self):
+        self._pixels = None
+
+
+def open_source(path):
+    """The cheapest reader for ``path``: memory-mapped when the format allows, else decoded."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.bmp':
+        try:
+            return BmpSource(path)
+        except (OSError, ValueError):
+            pass
+    elif ext in ('.tif', '.tiff'):
+        try:
+            return TiffSource(path)
+        except (ImportError, OSError, ValueError):
+            pass
+    return DecodedSource(path)
+
+
+def crop_window(xyxy, width, height, gain=CROP_GAIN, pad=CROP_PAD):
+    """The ``(x0, y0, x1, y1)`` window ``save_one_box`` would crop for box ``xyxy``."""
+    x1, y1, x2, y2 = (float(v) for v in xyxy)
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    w, h = (x2 - x1) * gain + pad, (y2 - y1) * gain + pad
+    return (min(max(int(cx - w / 2), 0), width), min(max(int(cy - h / 2), 0), height),
+            min(max(int(cx + w / 2), 0), width), min(max(int(cy + h / 2), 0), height))
+
+
+def read_preview(source, max_side=PREVIEW_SIZE, band=PREVIEW_BAND):
+    """``(image, scale)``: ``source`` shrunk to at most ``max_side`` pixels, read ``band`` rows at a time."""
+    import cv2
+    import numpy as np
+
+    scale = min(1.0, max_side / max(source.width, source.height))
+    width = max(1, round(source.width * scale))
+    height = max(1, round(source.height * scale))
+    if scale == 1.0:
+        return np.ascontiguousarray(source.full()), scale
+    preview = np.empty((height, width, 3), np.uint8)
+    for top in range(0, height, band):
+        bottom = min(top + band, height)
+        y0 = int(top / scale)
+        y1 = min(source.height, max(y0 + 1, int(bottom / scale)))
+        preview[top:bottom] = cv2.resize(source.read(0, y0, source.width, y1), (width, bottom - top),
+                                         interpolation=cv2.INTER_AREA)
+    return preview, scale
+
+
+def merge_boxes(boxes, threshold=MERGE_THRESHOLD):
+    """Class-aware greedy NMS over an (N, 6) x1, y1, x2, y2, conf, cls array, by intersection over the smaller box."""
+    import numpy as np
+
+    if len(boxes) < 2:
+        return boxes
+    boxes = boxes[np.argsort(-boxes[:, 4], kind='stable')]
+    x1, y1, x2, y2, cls = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3], boxes[:, 5]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    for i in range(len(boxes)):
+        if suppressed[i]:
+            continue
+        rest = np.flatnonzero(~suppressed[i + 1:] & (cls[i + 1:] == cls[i])) + i + 1
+        if not len(rest):
+            continue
+        w = np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])
+        h = np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])
+        inter = np.maximum(w, 0) * np.maximum(h, 0)
+        smaller = np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        suppressed[rest[inter / smaller > threshold]] = True
+    return boxes[~suppressed]
+
+
+def detect_tiled(model, source, tile=DEFAULT_TILE, overlap=DEFAULT_OVERLAP, batch_size=4,
+                 predict_options=None, timings=None, progress=None):
+    """Run ``model`` over the tiles of ``source``; returns ``(boxes, speed, tiles)``.
+
+    ``boxes`` is an (N, 6) array in full-image pixels, ``speed`` the stage
+    times in ms summed over all tiles. ``progress(done, total)`` is called
+    after every batch of tiles.
+    """
+    import numpy as np
+
+    predict_options = predict_options or {}
+    windows = tile_windows(source.width, source.height, tile, overlap)
+    speed = dict.fromkeys(('decode', 'preprocess', 'inference', 'postprocess'), 0.0)
+    found = []
+    batch_size = max(1, batch_size)
+    for first in range(0, len(windows), batch_size):
+        batch = windows[first:first + batch_size]
+        start = time.perf_counter()
+        tiles = [np.ascontiguousarray(source.read(*window)) for window in batch]
+        elapsed = time.perf_counter() - start
+        speed['decode'] += elapsed * 1000
+        if timings is not None:
+            timings.span('decode', 'tiles', start, elapsed, tiles=len(batch))
+        results = model.predict(source=tiles, verbose=False, **predict_options)
+        for (x0, y0, _, _), r in zip(batch, results):
+            for stage in ('preprocess', 'inference', 'postprocess'):
+                speed[stage] += r.speed.get(stage, 0.0)
+            if r.boxes is not None and len(r.boxes):
+                data = r.boxes.data.cpu().numpy()[:, :6].astype(np.float32)
+                data[:, [0, 2]] += x0
+                data[:, [1, 3]] += y0
+                found.append(data)
+        del tiles, results
+        if progress is not None:
+            progress(min(first + batch_size, len(windows)), len(windows))
+    boxes = np.concatenate(found) if found else np.zeros((0, 6), np.float32)
+    return merge_boxes(boxes), speed, len(windows)
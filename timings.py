@@ -0,0 +1,130 @@
+"""Per-image, per-stage latency instrumentation for detection runs.
+
+Every image passes through the same stages: file read, decode, the three
+ultralytics stages (preprocess, inference, postprocess/NMS, taken from
+``Results.speed``), our aggregation and the output writes. ``StageTimings``
+keeps a rolling window of each stage for live p50/p95 figures, streams one
+row per image into ``timings.csv`` in the results folder (stages that finish
+later, like writes done by ``outputs.OutputWriter``, only go into the live
+figures and the trace) and can record the
+spans as a Chrome trace-event JSON (``trace.json``), viewable in
+chrome://tracing or Perfetto, to show how the stages overlap across threads.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from collections import deque
+
+STAGES = ('read', 'decode', 'preprocess', 'inference', 'postprocess', 'aggregate', 'write')
+WINDOW = 500  # images kept for the rolling figures
+TIMINGS_FILE = 'timings.csv'
+TRACE_FILE = 'trace.json'
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))]
+
+
+class StageTimings:
+    """Collects stage timings for one run; safe to use from several threads.
+
+    With ``append`` (a resumed run) rows are added to an existing
+    ``timings.csv`` instead of replacing it.
+    """
+
+    def __init__(self, results_dir=None, trace=False, window=WINDOW, append=False):
+        self.results_dir = results_dir
+        self.images = 0
+        self.totals = dict.fromkeys(STAGES, 0.0)  # ms
+        self._window = {stage: deque(maxlen=window) for stage in STAGES}
+        self._finished = deque(maxlen=window)  # perf_counter when each image was done
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._events = [] if trace else None
+        self._tracks = {}  # track name -> trace thread id
+        self._csv_file = None
+        self._csv = None
+        if results_dir is not None:
+            path = os.path.join(results_dir, TIMINGS_FILE)
+            header = not (append and os.path.isfile(path) and os.path.getsize(path))
+            self._csv_file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._csv_file)
+            if header:
+                self._csv.writerow(['image', 'finished_s'] + [f"{stage}_ms" for stage in STAGES])
+
+    @property
+    def tracing(self):
+        return self._events is not None
+
+    def record(self, path, stage_ms):
+        """Add one image's ``{stage: milliseconds}``; stages it didn't go through are left out."""
+        now = time.perf_counter()
+        values = [stage_ms.get(stage) for stage in STAGES]
+        with self._lock:
+            self.images += 1
+            self._finished.append(now)
+            for stage, value in zip(STAGES, values):
+                if value is not None:
+                    self.totals[stage] += value
+                    self._window[stage].append(value)
+            if self._csv is not None:
+                self._csv.writerow([path, f"{now - self._origin:.4f}"]
+                                   + ['' if v is None else f"{v:.3f}" for v in values])
+
+    def add(self, stage, ms):
+        """Add a stage time measured after the image was recorded (asynchronous writes)."""
+        with self._lock:
+            self.totals[stage] += ms
+            self._window[stage].append(ms)
+
+    def span(self, name, track, start, seconds, **args):
+        """Record a trace span that began at ``start`` (a perf_counter value)."""
+        if self._events is None:
+            return
+        event = {"name": name, "cat": "stage", "ph": "X", "pid": 1,
+                 "ts": round((start - self._origin) * 1e6, 1), "dur": round(seconds * 1e6, 1)}
+        if args:
+            event["args"] = args
+        with self._lock:
+            if track not in self._tracks:
+                self._tracks[track] = len(self._tracks) + 1
+                self._events.append({"name": "thread_name", "ph": "M", "pid": 1,
+                                     "tid": self._tracks[track], "args": {"name": track}})
+            event["tid"] = self._tracks[track]
+            self._events.append(event)
+
+    def snapshot(self):
+        """``{"images_per_sec": float, "stages": {stage: (p50 ms, p95 ms)}}`` over the rolling window."""
+        with self._lock:
+            finished = list(self._finished)
+            windows = {stage: sorted(values) for stage, values in self._window.items()}
+        rate = 0.0
+        if len(finished) > 1 and finished[-1] > finished[0]:
+            rate = (len(finished) - 1) / (finished[-1] - finished[0])
+        stages = {stage: (_percentile(values, 50), _percentile(values, 95))
+                  for stage, values in windows.items() if values}
+        return {"images": self.images, "images_per_sec": rate, "stages": stages}
+
+    def summary(self):
+        if not self.images:
+            return "Stage timings: no images"
+        snapshot = self.snapshot()
+        parts = [f"{stage} {p50:.1f}/{p95:.1f}" for stage, (p50, p95) in snapshot["stages"].items()
+                 if self.totals[stage] > 0]
+        return f"Stage timings, p50/p95 ms per image: {', '.join(parts)}"
+
+    def close(self):
+        """Finish ``timings.csv`` and write ``trace.json``; returns the trace path, if any."""
+        with self._lock:
+            if self._csv_file is not None:
+                self._csv_file.close()
+                self._csv_file = None
+                self._csv = None
+            if self._events is None or self.results_dir is None:
+                return None
+            path = os.path.join(self.results_dir, TRACE_FILE)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, f)
+            return path
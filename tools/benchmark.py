@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Reproducible benchmark of the ModelGUI pipeline stages.
+
+Generates a synthetic image dataset (cached, so every run measures the same
+files) and times each stage on its own: folder scan (cold and with the
+directory index), file list insertion, ML stack import, model load, per-image
+inference, per-box aggregation, label/crop writing and plot generation.
+Aggregation and output stages use seeded synthetic detections, so they
+measure the same amount of work whatever the model finds on random images.
+
+Results are printed as JSON. With ``--baseline`` every stage is compared
+against a stored run and the exit status is 1 if any stage regressed by more
+than ``--threshold``. Runs headless (no display needed) on CPU-only machines:
+
+    python tools/benchmark.py --images 500 --save-baseline benchmarks/baseline.json
+    python tools/benchmark.py --images 500 --baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from paths import CACHE_DIR  # noqa: E402
+
+DATASET_ROOT = os.path.join(CACHE_DIR, 'benchmark')
+DEFAULT_MODEL = os.path.join(PROJECT_ROOT, 'models', 'yolov8n.pt')
+IMAGES_PER_DIR = 500
+NUM_CLASSES = 80
+
+EXIT_OK = 0
+EXIT_REGRESSION = 1
+EXIT_USAGE = 2
+
+
+def dataset_dir(count, width, height, seed):
+    return os.path.join(DATASET_ROOT, f"{count}x{width}x{height}-s{seed}")
+
+
+def generate_dataset(count, width, height, seed, quality=90):
+    """Write ``count`` seeded synthetic JPEGs (once) and return their folder."""
+    import cv2
+    import numpy as np
+
+    root = dataset_dir(count, width, height, seed)
+    marker = os.path.join(root, '.complete')
+    if os.path.exists(marker):
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    for i in range(count):
+        directory = os.path.join(root, f"{i // IMAGES_PER_DIR:04d}")
+        os.makedirs(directory, exist_ok=True)
+        base = rng.integers(0, 256, 3).astype(np.float32)
+        image = np.clip((gradient * 0.5 + base) % 256 + rng.normal(0, 8, (height, width, 3)), 0, 255)
+        image = image.astype(np.uint8)
+        for _ in range(rng.integers(3, 12)):
+            x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+            size = int(rng.integers(min(width, height) // 20, min(width, height) // 4))
+            color = tuple(int(c) for c in rng.integers(0, 256, 3))
+            if rng.random() < 0.5:
+                cv2.rectangle(image, (x, y), (x + size, y + size), color, -1)
+            else:
+                cv2.circle(image, (x, y), size // 2, color, -1)
+        cv2.imwrite(os.path.join(directory, f"img_{i:06d}.jpg"), image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    with open(marker, 'w') as f:
+        f.write('ok')
+    return root
+
+
+def synthetic_detections(paths, shapes, boxes_per_image, seed):
+    import numpy as np
+    from detections import Detections
+
+    rng = np.random.default_rng(seed)
+    detections = []
+    for path, (height, width) in zip(paths, shapes):
+        n = boxes_per_image
+        x1 = rng.uniform(0, width * 0.8, n)
+        y1 = rng.uniform(0, height * 0.8, n)
+        w = rng.uniform(8, width * 0.2, n)
+        h = rng.uniform(8, height * 0.2, n)
+        xyxy = np.stack([x1, y1, np.minimum(x1 + w, width), np.minimum(y1 + h, height)], axis=1)
+        detections.append(Detections(path, xyxy.astype(np.float32), rng.uniform(0.25, 1.0, n).astype(np.float32),
+                                     rng.integers(0, NUM_CLASSES, n), (height, width)))
+    return detections
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))]
+
+
+def timed(fn, repeat):
+    """Median wall time of ``fn()`` over ``repeat`` runs, and its last return value."""
+    times = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), value
+
+
+def stage(seconds, items, **extra):
+    result = {"seconds": round(seconds, 6), "items": items,
+              "per_item_ms": round(seconds * 1000 / items, 4) if items else None}
+    result.update(extra)
+    return result
+
+
+def run_benchmark(args):
+    import ml_stack
+
+    # First, so the import is measured cold (the other modules pull in numpy)
+    stages = {}
+    timings = ml_stack.import_ml_stack()
+    stages["import_ml_stack"] = stage(sum(seconds for _, seconds in timings), 1,
+                                      modules={name: round(seconds, 4) for name, seconds in timings})
+
+    from detection_stats import DetectionStats
+    from outputs import save_result
+    from plots import save_plots
+    from prefetch import decode_image
+    from scanner import DirectoryIndex, scan_folder
+
+    if args.threads:
+        ml_stack.set_torch_threads(args.threads)
+
+    root = generate_dataset(args.images, args.width, args.height, args.seed)
+    work_dir = tempfile.mkdtemp(prefix='modelgui-bench-')
+    try:
+        # Folder scan, as done by "Add Folder": cold, then with the directory index warm
+        def scan(index):
+            return [p for chunk in scan_folder(root, index=index) for p in chunk]
+
+        seconds, paths = timed(lambda: scan(DirectoryIndex(os.path.join(work_dir, 'cold.json'))), args.repeat)
+        stages["scan_cold"] = stage(seconds, len(paths))
+        index = DirectoryIndex(os.path.join(work_dir, 'warm.json'))
+        scan(index)
+        seconds, _ = timed(lambda: scan(index), args.repeat)
+        stages["scan_indexed"] = stage(seconds, len(paths))
+
+        try:
+            from file_list import FileListModel
+        except ImportError:
+            FileListModel = None
+        if FileListModel is not None:
+            def insert():
+                model = FileListModel()
+                for start in range(0, len(paths), 500):  # scan chunks arrive 500 at a time
+                    model.add_paths(paths[start:start + 500])
+                return model.count()
+            seconds, _ = timed(insert, args.repeat)
+            stages["file_list_insert"] = stage(seconds, len(paths))
+
+        seconds, images = timed(lambda: [decode_image(p) for p in paths[:args.infer_images]], args.repeat)
+        stages["decode"] = stage(seconds, len(images))
+
+        # Model load and inference
+        yolo = ml_stack.get_yolo()
+        seconds, model = timed(lambda: yolo(args.model), args.repeat)
+        stages["model_load"] = stage(seconds, 1)
+        model.predict(source=images[0], imgsz=args.imgsz, verbose=False)  # predictor setup and layer fusing
+        latencies = []
+        speed = {"preprocess": [], "inference": [], "postprocess": []}
+
+        def infer():
+            for image in images:
+                start = time.perf_counter()
+                result = model.predict(source=image, imgsz=args.imgsz, verbose=False)[0]
+                latencies.append(time.perf_counter() - start)
+                for key in speed:
+                    speed[key].append(result.speed.get(key, 0.0))
+        seconds, _ = timed(infer, args.repeat)
+        latencies.sort()
+        stages["inference"] = stage(
+            seconds, len(images),
+            p50_ms=round(percentile(latencies, 50) * 1000, 3),
+            p95_ms=round(percentile(latencies, 95) * 1000, 3),
+            **{f"{key}_ms": round(statistics.mean(values), 3) for key, values in speed.items()})
+
+        # Aggregation and outputs on seeded synthetic detections
+        detections = synthetic_detections(paths[:len(images)], [im.shape[:2] for im in images],
+                                          args.boxes, args.seed)
+        names = {i: f"class{i}" for i in range(NUM_CLASSES)}
+
+        def aggregate():
+            stats = DetectionStats(names)
+            for _ in range(args.aggregate_passes):
+                for d in detections:
+                    stats.update(d)
+            return stats
+        seconds, stats = timed(aggregate, args.repeat)
+        boxes = args.boxes * len(detections) * args.aggregate_passes
+        stages["aggregation"] = stage(seconds, boxes)
+
+        results = [d.to_result(image, names) for d, image in zip(detections, images)]
+        for option, name in (('save_txt', 'write_labels'), ('save_crop', 'write_crops'), ('save', 'write_images')):
+            out_dir = os.path.join(work_dir, name)
+
+            def write():
+                shutil.rmtree(out_dir, ignore_errors=True)
+                for r, d in zip(results, detections):
+                    save_result(r, out_dir, {option: True}, name=os.path.basename(d.path))
+            seconds, _ = timed(write, args.repeat)
+            stages[name] = stage(seconds, len(results))
+
+        seconds, _ = timed(lambda: save_plots(stats, os.path.join(work_dir, 'plots')), args.repeat)
+        stages["plots"] = stage(seconds, 1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return stages
+
+
+def environment():
+    import torch
+    import ultralytics
+
+    return {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "ultralytics": ultralytics.__version__,
+    }
+
+
+def compare(stages, baseline, threshold, min_delta):
+    """Per-stage comparison against a baseline run; returns (rows, regressed stage names)."""
+    rows = []
+    regressed = []
+    for name, current in stages.items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous is None:
+            rows.append((name, None, current["seconds"], None, "new"))
+            continue
+        before, after = previous["seconds"], current["seconds"]
+        change = (after - before) / before if before > 0 else 0.0
+        # Small absolute differences are timer noise, not regressions
+        if change > threshold and after - before > min_delta:
+            status = "REGRESSION"
+            regressed.append(name)
+        elif change < -threshold and before - after > min_delta:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, before, after, change, status))
+    return rows, regressed
+
+
+def print_comparison(rows, file=sys.stderr):
+    print(f"{'stage':<18} {'baseline s':>11} {'current s':>11} {'change':>8}  status", file=file)
+    for name, before, after, change, status in rows:
+        before_text = f"{before:>11.4f}" if before is not None else f"{'-':>11}"
+        change_text = f"{change:>+8.1%}" if change is not None else f"{'-':>8}"
+        print(f"{name:<18} {before_text} {after:>11.4f} {change_text}  {status}", file=file)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ModelGUI pipeline stage by stage.")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="Weights to benchmark (default: models/yolov8n.pt)")
+    parser.add_argument('--images', type=int, default=200, help="Synthetic dataset size (default: 200)")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--infer-images', type=int, default=32,
+                        help="Images used for decode, inference and output stages (default: 32)")
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--boxes', type=int, default=20, help="Synthetic detections per image (default: 20)")
+    parser.add_argument('--aggregate-passes', type=int, default=50,
+                        help="Times the aggregation stage folds in every image (default: 50)")
+    parser.add_argument('--threads', type=int, help="torch intra-op threads (pin for comparable runs)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per stage; the median is kept (default: 3)")
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="Compare against this earlier JSON result")
+    parser.add_argument('--save-baseline', help="Also store the results as a baseline at this path")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="Relative slowdown counted as a regression (default: 0.15)")
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help="Ignore differences smaller than this many seconds (default: 0.005)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.isfile(args.model):
+        print(f"Model not found: {args.model}", file=sys.stderr)
+        return EXIT_USAGE
+    args.infer_images = max(1, min(args.infer_images, args.images))
+
+    stages = run_benchmark(args)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "config": {k: v for k, v in vars(args).items()
+                   if k not in ('output', 'baseline', 'save_baseline', 'threshold', 'min_delta')},
+        "stages": stages,
+    }
+
+    status = EXIT_OK
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Warning: baseline was recorded with a different configuration", file=sys.stderr)
+        rows, regressed = compare(stages, baseline, args.threshold, args.min_delta)
+        print_comparison(rows)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.threshold, "regressed": regressed}
+        if regressed:
+            status = EXIT_REGRESSION
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
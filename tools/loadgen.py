@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Load generator for the local inference server (server.py).
+
+Sends images to POST /detect from N concurrent clients and reports latency
+percentiles and throughput for each concurrency level:
+
+    python tools/loadgen.py images/ --concurrency 1 2 4 8 --requests 200
+    python tools/loadgen.py images/ --unix /tmp/modelgui.sock --json
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def connect(args):
+    if args.unix:
+        return UnixHTTPConnection(args.unix, timeout=args.timeout)
+    return http.client.HTTPConnection(args.host, args.port, timeout=args.timeout)
+
+
+def load_images(inputs, limit):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths.append(item)
+    images = []
+    for path in paths[:limit]:
+        with open(path, 'rb') as f:
+            images.append(f.read())
+    return images
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))]
+
+
+def run_level(args, images, concurrency):
+    """Send ``args.requests`` requests from ``concurrency`` clients; returns a result dict."""
+    latencies = []
+    batch_sizes = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = [0]
+
+    def client():
+        conn = connect(args)
+        while True:
+            with lock:
+                i = counter[0]
+                counter[0] += 1
+            if i >= args.requests:
+                break
+            body = images[i % len(images)]
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/detect', body=body, headers={'Content-Type': 'application/octet-stream'})
+                response = conn.getresponse()
+                payload = response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = connect(args)
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed * 1000)
+                    batch_sizes.append(json.loads(payload)['timings']['batch_size'])
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": round(wall, 3),
+        "throughput": round(len(latencies) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_batch": round(sum(batch_sizes) / len(batch_sizes), 2) if batch_sizes else 0.0,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure latency and throughput of the ModelGUI server.")
+    parser.add_argument('inputs', nargs='+', help="Image files or folders to send")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Connect to this Unix socket instead of TCP")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help="Concurrency levels to test (default: 1 2 4 8)")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per level (default: 100)")
+    parser.add_argument('--warmup', type=int, default=5, help="Untimed requests before the first level")
+    parser.add_argument('--max-images', type=int, default=64, help="Distinct images kept in memory")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    images = load_images(args.inputs, args.max_images)
+    if not images:
+        print("No images found", file=sys.stderr)
+        return 2
+
+    if args.warmup:
+        run_level(argparse.Namespace(**{**vars(args), 'requests': args.warmup}), images, 1)
+    results = [run_level(args, images, level) for level in args.concurrency]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6} {'errors':>6}")
+        for r in results:
+            print(f"{r['concurrency']:>7} {r['throughput']:>8.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+                  f"{r['mean_batch']:>6.2f} {r['errors']:>6}")
+    return 0 if all(r['errors'] == 0 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
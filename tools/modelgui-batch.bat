@@ -0,0 +1,3 @@
+@echo off
+rem Relative paths in the arguments stay relative to the caller's directory
+"%~dp0..\venv\Scripts\python" "%~dp0..\batch.py" %*
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Read labels and crops packed into tar shards by a detection run.
+
+Point it at a results folder (or its ``packed`` folder):
+
+    python tools/read_shards.py results/detection_20240101_120000 list --prefix labels/
+    python tools/read_shards.py results/detection_20240101_120000 cat labels/img001.txt
+    python tools/read_shards.py results/detection_20240101_120000 stream
+    python tools/read_shards.py results/detection_20240101_120000 extract out/
+
+``cat`` reads one member through the index without scanning the shards;
+``stream`` reads them sequentially, the way a training loader would, and
+reports the throughput; ``extract`` recreates the unpacked labels/ and
+crops/ layout.
+"""
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from shards import PACKED_DIR, ShardReader  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="List, read, stream or extract packed labels and crops.")
+    parser.add_argument('folder', help="Results folder or its packed/ folder")
+    commands = parser.add_subparsers(dest='command', required=True)
+    listing = commands.add_parser('list', help="List members from the index")
+    listing.add_argument('--prefix', default='', help="Only names starting with this (e.g. labels/)")
+    cat = commands.add_parser('cat', help="Write one member to stdout")
+    cat.add_argument('name')
+    commands.add_parser('stream', help="Read every member sequentially and report the throughput")
+    extract = commands.add_parser('extract', help="Write every member out as a file")
+    extract.add_argument('output', help="Destination folder")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    folder = args.folder
+    if os.path.isdir(os.path.join(folder, PACKED_DIR)):
+        folder = os.path.join(folder, PACKED_DIR)
+    reader = ShardReader(folder)
+    if not reader.shards():
+        print(f"No shards found in {folder}", file=sys.stderr)
+        return 2
+
+    if args.command == 'list':
+        for name in reader.names(args.prefix):
+            shard, offset, size = reader.index[name]
+            print(f"{name}\t{shard}\t{offset}\t{size}")
+    elif args.command == 'cat':
+        if args.name not in reader.index:
+            print(f"Not in the index: {args.name}", file=sys.stderr)
+            return 1
+        sys.stdout.buffer.write(reader.read(args.name))
+    elif args.command == 'stream':
+        start = time.perf_counter()
+        members = total = 0
+        for _, data in reader:
+            members += 1
+            total += len(data)
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(f"{members} members, {total / 1e6:.1f} MB from {len(reader.shards())} shards "
+              f"in {elapsed:.2f}s ({members / elapsed:.0f} members/s, {total / 1e6 / elapsed:.1f} MB/s)")
+    elif args.command == 'extract':
+        output = os.path.abspath(args.output)
+        written = 0
+        for name, data in reader:
+            path = os.path.abspath(os.path.join(output, name))
+            if not path.startswith(output + os.sep):
+                continue  # never write outside the destination
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            written += 1
+        print(f"Extracted {written} members to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
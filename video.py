@@ -0,0 +1,232 @@
+"""Video ingestion: frames are decoded straight from the file, never extracted to disk.
+
+``FrameSampling`` picks which frames to run the model on (every Nth frame,
+optionally within a time range). ``FrameReader`` decodes a video on its own
+thread, skipping the unsampled frames with ``grab()`` (no colour conversion
+or copy), and groups the sampled ones into batches on a bounded queue, the
+same way ``prefetch.Prefetcher`` does for images, so decoding overlaps
+inference and memory stays bounded.
+
+Each frame becomes a ``Detections`` whose path is ``<video>#frame=<n>``, so
+logs, exports and statistics treat it like an image. ``FrameLog`` writes
+every sampled frame, with its timestamp, into ``<video stem>.frames.jsonl``
+in the results folder.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from scanner import VIDEO_EXTENSIONS
+
+DEFAULT_FPS = 30.0  # for containers that don't report a frame rate
+FRAME_MARKER = '#frame='
+_DONE = object()
+
+
+def is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def frame_path(video, index):
+    return f"{video}{FRAME_MARKER}{index}"
+
+
+def frame_name(video, index, ext='.jpg'):
+    """File name for a frame's annotated image and labels: ``<stem>_<frame>.jpg``."""
+    return f"{os.path.splitext(os.path.basename(video))[0]}_{index:06d}{ext}"
+
+
+def probe(path):
+    """``(frame count, fps)`` from the container; the count is 0 when unknown."""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Could not open video {path}")
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        return max(0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT))), fps if fps > 0 else DEFAULT_FPS
+    finally:
+        capture.release()
+
+
+class FrameSampling:
+    """Which frames of a video to infer: every ``every``-th one from ``start`` to ``end`` seconds."""
+
+    def __init__(self, every=1, start=None, end=None):
+        self.every = max(1, int(every))
+        self.start = start or None
+        self.end = end or None
+
+    def frames(self, frame_count, fps):
+        """``range`` of frame indices; ``frame_count`` 0 means read to the end of the file."""
+        first = int(round(self.start * fps)) if self.start else 0
+        last = frame_count or None
+        if self.end:
+            end_frame = int(round(self.end * fps))
+            last = min(last, end_frame) if last is not None else end_frame
+        return range(first, max(first, last if last is not None else 2 ** 62), self.every)
+
+    def count(self, frame_count, fps):
+        """Frames that will be inferred, or 0 if the video doesn't report its length."""
+        if not frame_count and not self.end:
+            return 0
+        return len(self.frames(frame_count, fps))
+
+    def describe(self):
+        parts = ["every frame" if self.every == 1 else f"every {self.every} frames"]
+        if self.start or self.end:
+            parts.append(f"from {self.start or 0:g}s to {f'{self.end:g}s' if self.end else 'the end'}")
+        return " ".join(parts)
+
+
+class Frame:
+    __slots__ = ('index', 'time', 'image', 'decode_ms')
+
+    def __init__(self, index, time, image, decode_ms):
+        self.index = index
+        self.time = time  # seconds from the start of the video
+        self.image = image
+        self.decode_ms = decode_ms  # including the skipped frames grabbed since the previous one
+
+
+class FrameReader:
+    """Iterate over batches of sampled ``Frame``s decoded on a background thread."""
+
+    def __init__(self, path, batch_size=4, sampling=None, max_batches=4, timings=None):
+        import cv2
+
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.sampling = sampling or FrameSampling()
+        self.timings = timings
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video {path}")
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps > 0 else DEFAULT_FPS
+        self.frame_count = max(0, int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self.planned = self.sampling.count(self.frame_count, self.fps)
+        self.decoded = 0
+        self.decode_time = 0.0
+        self.wait_time = 0.0  # time the consumer spent waiting for a batch
+        self._queue = queue.Queue(maxsize=max(1, max_batches))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name='video-decode', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            start = time.perf_counter()
+            item = self._queue.get()
+            self.wait_time += time.perf_counter() - start
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self):
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.is_alive():
+            self._thread.join()
+        self.capture.release()
+
+    def summary(self):
+        return (f"decoded {self.decoded} frames in {self.decode_time:.1f}s, "
+                f"inference waited {self.wait_time:.1f}s for frames")
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        import cv2
+
+        frames = self.sampling.frames(self.frame_count, self.fps)
+        batch = []
+        try:
+            position = 0
+            if frames.start > 0:
+                # Seeking lands on the nearest keyframe; decode forward from wherever it landed
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, frames.start)
+                position = int(self.capture.get(cv2.CAP_PROP_POS_FRAMES))
+                if position > frames.start:
+                    self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    position = 0
+            track = threading.current_thread().name
+            start = time.perf_counter()
+            for index in frames:
+                if self._stop.is_set():
+                    return
+                while position < index:
+                    if not self.capture.grab():
+                        return
+                    position += 1
+                ok, image = self.capture.read()
+                position += 1
+                if not ok:
+                    return
+                end = time.perf_counter()
+                self.decode_time += end - start
+                self.decoded += 1
+                if self.timings is not None:
+                    self.timings.span('decode', track, start, end - start, frame=index)
+                batch.append(Frame(index, index / self.fps, image, (end - start) * 1000))
+                start = end
+                if len(batch) == self.batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+        except BaseException as e:
+            self._put(e)
+        finally:
+            if batch and not self._stop.is_set():
+                self._put(batch)
+            self._put(_DONE)
+
+
+class FrameLog:
+    """Per-frame detections with timestamps, one JSON line per sampled frame."""
+
+    def __init__(self, results_dir, video, names):
+        stem = os.path.splitext(os.path.basename(video))[0]
+        self.path = os.path.join(results_dir, f"{stem}.frames.jsonl")
+        self.names = dict(names)
+        self.frames = 0
+        self._file = open(self.path, 'w', encoding='utf-8', buffering=1024 * 1024)
+
+    def write(self, frame, detections):
+        boxes = [{"class_id": int(c), "class_name": self.names.get(int(c), str(int(c))),
+                  "conf": round(float(conf), 4), "xyxy": [round(float(v), 1) for v in xyxy]}
+                 for xyxy, conf, c in zip(detections.xyxy, detections.conf, detections.cls)]
+        self._file.write(json.dumps({"frame": frame.index, "time_s": round(frame.time, 3),
+                                     "detections": boxes}) + "\n")
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()